@@ -1,10 +1,14 @@
 # Load modules
+import argparse
 import logging
 import time
 
 from src.logger_config import setup_logging
-from src.modules import romm_library_cleanup, torrents, library_cleanup
-from src.modules.config_parse import LOG_FILE_PATH, ON_STARTUP, WAIT_TIME, TESTING
+from src.modules import romm_library_cleanup, torrents, library_cleanup, dedupe
+from src.modules.config_parse import (
+    LOG_FILE_PATH, ON_STARTUP, WAIT_TIME, TESTING, QBIT_ENABLE, WATCH_MODE, LIBRARY_WATCH
+)
+from src.modules.library_watch import LibraryWatcher
 from src.tests.romm import RommTestAPI
 
 # Configure logging before importing other modules
@@ -23,6 +27,18 @@ def run():
 
 def main():
     """Main application loop that runs on schedule."""
+    parser = argparse.ArgumentParser(description="Game Library Manager Scripts")
+    parser.add_argument('command', nargs='?', default='run', choices=['run', 'dedupe'],
+                        help="run: the scheduled import and cleanup loop (default), "
+                             "dedupe: find duplicate files in the game library once and exit")
+    parser.add_argument('--action', choices=dedupe.ACTIONS,
+                        help="dedupe only: override the configured dedupe action")
+    args = parser.parse_args()
+
+    if args.command == 'dedupe':
+        dedupe.run(args.action or dedupe.DEDUPE_ACTION)
+        return
+
     logger.info("Starting the application...")
 
     if TESTING:
@@ -34,10 +50,18 @@ def main():
         logger.info("Running torrent manager on startup...")
         run()
 
+    # Clean up changed game folders between cycles
+    if LIBRARY_WATCH:
+        LibraryWatcher().start()
+
     while True:
         wait_seconds = WAIT_TIME * 3600
-        logger.info(f"Waiting {WAIT_TIME} hours for the next cycle...")
-        time.sleep(wait_seconds)
+        if QBIT_ENABLE and WATCH_MODE:
+            logger.info(f"Watching qBittorrent for {WAIT_TIME} hours until the next cycle...")
+            torrents.watch(wait_seconds)
+        else:
+            logger.info(f"Waiting {WAIT_TIME} hours for the next cycle...")
+            time.sleep(wait_seconds)
         run()
 
 
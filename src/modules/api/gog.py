@@ -1,4 +1,655 @@
-# Torrent handling module
+# GOG catalog module
+import json
 import logging
+import bisect
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from src.modules.helpers import atomic_write
 
 logger = logging.getLogger(__name__)
+
+# Partial matches may be at most this many characters longer than the searched name.
+# This helps avoid matching with DLCs or similar named games.
+PARTIAL_MATCH_SLACK = 10
+
+# Binary index layout (little-endian):
+#   header:      magic, entry count, number of length buckets, source JSON size, source JSON mtime_ns
+#   entries:     count x (slug offset, slug length, title offset, title length), sorted by slug bytes
+#   by length:   count x (entry number, offset into the slug list), ordered by slug length then catalog order
+#   length dir:  buckets x (start position into the by-length table, start offset into the slug list)
+#   slug list:   newline terminated slugs in by-length order, so a bucket can be searched with one find()
+#   strings:     UTF-8 blob the entry offsets point into
+INDEX_MAGIC = b'GLMCAT01'
+INDEX_HEADER = struct.Struct('<8sIIqq')
+INDEX_ENTRY = struct.Struct('<IIII')
+INDEX_PAIR = struct.Struct('<II')
+
+# How a name was resolved by GogCatalog.resolve()
+EXACT_MATCH = 'exact'
+PARTIAL_MATCH = 'partial'
+FUZZY_MATCH = 'fuzzy'
+
+# Slugs, titles and torrent names are split into lowercase alphanumeric tokens for fuzzy matching
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Trigram index of the last catalog file, reused by every catalog opened from the same file, see _catalog_trigrams()
+_trigram_cache: Optional[Tuple[Tuple[int, int, int], 'TrigramIndex']] = None
+_trigram_lock = threading.Lock()
+
+def catalog_items(data) -> List[Dict]:
+    """
+    Extract the list of games from a catalog or feed response.
+
+    Args:
+        data: Parsed JSON, either a list of games or an object wrapping one
+
+    Returns:
+        List[Dict]: The games, or an empty list if none were found
+    """
+    if isinstance(data, dict):
+        for key in ('items', 'data', 'games', 'torrents'):
+            if isinstance(data.get(key), list):
+                return data[key]
+        return []
+    if isinstance(data, list):
+        return [item for item in data if isinstance(item, dict)]
+    return []
+
+
+def _scan_buckets(buckets: Dict[int, List[str]], joined: Dict[int, Tuple[str, List[int]]],
+                  name: str) -> Optional[str]:
+    """
+    Return the first slug containing name, scanning only the lengths inside the match window.
+
+    A slug shorter than the name cannot contain it, so shorter buckets are never visited. Each bucket
+    is searched as one newline-joined string (cached in joined), and the hit is mapped back to its slug.
+    """
+    if '\n' in name:
+        return None
+
+    for length in range(len(name), len(name) + PARTIAL_MATCH_SLACK + 1):
+        bucket = buckets.get(length)
+        if not bucket:
+            continue
+        if length not in joined:
+            joined[length] = ('\n'.join(bucket), [i * (length + 1) for i in range(len(bucket))])
+        text, starts = joined[length]
+        found = text.find(name)
+        if found >= 0:
+            return bucket[bisect.bisect_right(starts, found) - 1]
+    return None
+
+
+def _catalog_trigrams(catalog: 'GogCatalog') -> 'TrigramIndex':
+    """
+    Get the trigram index over the slugs of a catalog file, without its recent-games delta.
+
+    Catalogs are reopened for every import batch, so the index is kept for as long as the catalog file
+    does not change. Catalogs not opened from a file get an index of their own.
+    """
+    global _trigram_cache
+
+    key = (catalog.source_size, catalog.source_mtime_ns, len(catalog) - len(catalog._delta))
+    with _trigram_lock:
+        if key[:2] != (0, 0) and _trigram_cache is not None and _trigram_cache[0] == key:
+            return _trigram_cache[1]
+        index = TrigramIndex(catalog._catalog_slugs())
+        logger.info(f"Built trigram index over {len(index)} slugs")
+        if key[:2] != (0, 0):
+            _trigram_cache = (key, index)
+        return index
+
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Return the set of padded character trigrams of every token in text.
+
+    Trigrams are built per token, so names with reordered tokens produce the same set.
+    """
+    grams = set()
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        padded = f" {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _numbers(text: str) -> Set[str]:
+    """Return the numeric tokens of text."""
+    return {token for token in TOKEN_PATTERN.findall(text.lower()) if token.isdigit()}
+
+
+class TrigramIndex:
+    """
+    Inverted trigram index over catalog slugs, scored with the Dice coefficient.
+
+    Shared trigram counts come straight from the posting lists, so candidates are scored
+    without re-tokenising their slugs.
+    """
+
+    def __init__(self, slugs: Iterable[str]):
+        self._slugs: List[str] = []
+        self._sizes = array('H')
+        self._postings: Dict[str, array] = {}
+
+        for slug in slugs:
+            grams = trigrams(slug)
+            if not grams:
+                continue
+            number = len(self._slugs)
+            self._slugs.append(slug)
+            self._sizes.append(min(len(grams), 0xFFFF))
+            for gram in grams:
+                posting = self._postings.get(gram)
+                if posting is None:
+                    posting = self._postings[gram] = array('I')
+                posting.append(number)
+
+    def __len__(self) -> int:
+        return len(self._slugs)
+
+    def search(self, name: str, threshold: float) -> Optional[Tuple[str, float]]:
+        """
+        Find the slug most similar to name.
+
+        Args:
+            name: The cleaned torrent name
+            threshold: Minimum Dice similarity (0-1) for a slug to be returned
+
+        Returns:
+            Optional[Tuple[str, float]]: The best slug and its score, or None if nothing reached the threshold
+        """
+        query = trigrams(name)
+        if not query or threshold <= 0:
+            return None
+
+        # Count shared trigrams per slug; Counter.update() walks the posting arrays in C
+        shared = Counter()
+        for gram in query:
+            posting = self._postings.get(gram)
+            if posting is not None:
+                shared.update(posting)
+
+        # Dice = 2c / (|q| + |d|) and |d| >= c, so a match needs at least this many shared trigrams
+        min_shared = max(1, math.ceil(threshold * len(query) / (2 - threshold)))
+        numbers = _numbers(name)
+
+        best = None
+        for number, count in shared.items():
+            if count < min_shared:
+                continue
+            score = 2 * count / (len(query) + self._sizes[number])
+            if score < threshold:
+                continue
+            slug = self._slugs[number]
+            # Numbers usually tell sequels and episodes apart, so they must match exactly
+            if _numbers(slug) != numbers:
+                continue
+            # Prefer the higher score, then the shorter slug (avoids DLCs and bundles)
+            if best is None or (score, -len(slug)) > (best[1], -len(best[0])):
+                best = (slug, score)
+        return best
+
+
+class GogCatalog:
+    """
+    In-memory index over the GOG games catalog.
+
+    The catalog is loaded once per run and exposes:
+    - an exact slug -> title hash index
+    - slugs bucketed by length (in catalog order), so partial matches only scan
+      the handful of lengths that can satisfy the match window
+    - a small delta of games merged from the recent-torrents feed between full refreshes
+    """
+
+    def __init__(self, items: Iterable[Dict]):
+        self._by_slug: Dict[str, str] = {}
+        self._by_length: Dict[int, List[str]] = {}
+        self._delta: Dict[str, str] = {}
+        self._delta_by_length: Dict[int, List[str]] = {}
+        self._joined: Dict[int, Tuple[str, List[int]]] = {}
+        self._delta_joined: Dict[int, Tuple[str, List[int]]] = {}
+        self._trigrams: Optional[TrigramIndex] = None
+        self._delta_trigrams: Optional[TrigramIndex] = None
+        # Identity of the JSON file the catalog was loaded from, 0 if unknown
+        self.source_size = 0
+        self.source_mtime_ns = 0
+
+        for item in items:
+            slug = item.get('slug')
+            title = item.get('title')
+            if not slug or not title or slug in self._by_slug:
+                continue
+            self._by_slug[slug] = title
+            self._by_length.setdefault(len(slug), []).append(slug)
+
+    def __len__(self) -> int:
+        return len(self._by_slug) + len(self._delta)
+
+    def close(self):
+        """Release any resources held by the catalog."""
+
+    @classmethod
+    def open(cls, filename: str, index_filename: str) -> 'GogCatalog':
+        """
+        Open the catalog, preferring the memory-mapped binary index.
+
+        The index is used when it was built from the current JSON file. Otherwise the JSON
+        is parsed and the index is rebuilt next to it for the following runs.
+
+        Args:
+            filename: Path to the cached GOG games JSON file
+            index_filename: Path to the binary index file
+
+        Returns:
+            GogCatalog: The loaded catalog
+
+        Raises:
+            OSError: If the JSON file cannot be read
+            json.JSONDecodeError: If the JSON file is not valid JSON
+        """
+        source = os.stat(filename)
+
+        try:
+            catalog = MappedGogCatalog(index_filename)
+            if catalog.source_size == source.st_size and catalog.source_mtime_ns == source.st_mtime_ns:
+                logger.info(f"Loaded {index_filename} with {len(catalog)} games.")
+                return catalog
+            logger.info(f"{index_filename} is out of date. Rebuilding from {filename}...")
+            catalog.close()
+        except FileNotFoundError:
+            logger.info(f"{index_filename} not found. Building from {filename}...")
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"Ignoring unreadable index {index_filename}: {e}")
+
+        catalog = cls.load(filename)
+        catalog.source_size = source.st_size
+        catalog.source_mtime_ns = source.st_mtime_ns
+        try:
+            catalog.save_index(index_filename, source.st_size, source.st_mtime_ns)
+        except OSError as e:
+            logger.error(f"Error writing {index_filename}: {e}")
+        return catalog
+
+    @classmethod
+    def load(cls, filename: str) -> 'GogCatalog':
+        """
+        Load the catalog from a JSON file.
+
+        Args:
+            filename: Path to the cached GOG games JSON file
+
+        Returns:
+            GogCatalog: The loaded catalog
+
+        Raises:
+            OSError: If the file cannot be read
+            json.JSONDecodeError: If the file is not valid JSON
+        """
+        with open(filename, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        catalog = cls(catalog_items(data))
+        logger.info(f"Loaded {filename} with {len(catalog)} games.")
+        return catalog
+
+    def merge(self, items: Iterable[Dict]) -> int:
+        """
+        Merge games that are missing from the catalog, e.g. from the recent-torrents feed.
+
+        Args:
+            items: Catalog items with 'slug' and 'title' keys
+
+        Returns:
+            int: Number of games added
+        """
+        added = 0
+        for item in items:
+            slug = item.get('slug')
+            title = item.get('title')
+            if not slug or not title or self.get(slug) is not None:
+                continue
+            self._delta[slug] = title
+            self._delta_by_length.setdefault(len(slug), []).append(slug)
+            self._delta_joined.pop(len(slug), None)
+            added += 1
+
+        if added:
+            # Rebuilt lazily on the next fuzzy lookup
+            self._delta_trigrams = None
+        return added
+
+    def save_index(self, filename: str, source_size: int = 0, source_mtime_ns: int = 0):
+        """
+        Atomically write the catalog as a binary index that MappedGogCatalog can query.
+
+        Args:
+            filename: Path to the index file
+            source_size: Size of the JSON file the catalog was loaded from
+            source_mtime_ns: Modification time of the JSON file the catalog was loaded from
+
+        Raises:
+            OSError: If the index cannot be written
+        """
+        slugs = list(self._by_slug)
+        encoded = {slug: (slug.encode('utf-8'), self._by_slug[slug].encode('utf-8')) for slug in slugs}
+        sorted_slugs = sorted(slugs, key=lambda slug: encoded[slug][0])
+        position = {slug: i for i, slug in enumerate(sorted_slugs)}
+
+        blob = bytearray()
+        entries = bytearray()
+        for slug in sorted_slugs:
+            slug_bytes, title_bytes = encoded[slug]
+            slug_offset = len(blob)
+            blob += slug_bytes
+            title_offset = len(blob)
+            blob += title_bytes
+            entries += INDEX_ENTRY.pack(slug_offset, len(slug_bytes), title_offset, len(title_bytes))
+
+        max_length = max(self._by_length, default=0)
+        by_length = bytearray()
+        length_dir = bytearray()
+        slug_list = bytearray()
+        count = 0
+        for length in range(max_length + 1):
+            length_dir += INDEX_PAIR.pack(count, len(slug_list))
+            for slug in self._by_length.get(length, ()):
+                by_length += INDEX_PAIR.pack(position[slug], len(slug_list))
+                slug_list += encoded[slug][0] + b'\n'
+                count += 1
+        length_dir += INDEX_PAIR.pack(count, len(slug_list))
+
+        header = INDEX_HEADER.pack(INDEX_MAGIC, len(sorted_slugs), max_length + 2, source_size, source_mtime_ns)
+
+        with atomic_write(filename) as f:
+            for chunk in (header, entries, by_length, length_dir, slug_list, blob):
+                f.write(chunk)
+
+        logger.info(f"Saved index to {filename}")
+
+    def get(self, slug: str) -> Optional[str]:
+        """
+        Return the title for an exact slug match.
+
+        Args:
+            slug: The slug to look up
+
+        Returns:
+            Optional[str]: The title, or None if the slug is unknown
+        """
+        title = self._get(slug)
+        if title is None:
+            title = self._delta.get(slug)
+        return title
+
+    def partial_match(self, name: str) -> Optional[str]:
+        """
+        Find the shortest slug containing the name, within the allowed length window.
+
+        Args:
+            name: The cleaned torrent name
+
+        Returns:
+            Optional[str]: The matching slug, or None if nothing matched
+        """
+        if not name:
+            return None
+
+        slug = self._partial(name)
+        delta_slug = _scan_buckets(self._delta_by_length, self._delta_joined, name)
+        if delta_slug is not None and (slug is None or len(delta_slug) < len(slug)):
+            return delta_slug
+        return slug
+
+    def has_match(self, name: str) -> bool:
+        """
+        Check whether a cleaned torrent name resolves to a title, without logging the match.
+
+        Only exact and partial matches count; a name that would only resolve fuzzily is a miss.
+
+        Args:
+            name: The cleaned torrent name
+
+        Returns:
+            bool: True if an exact or partial match exists
+        """
+        return self.get(name) is not None or self.partial_match(name) is not None
+
+    def fuzzy_match(self, name: str, threshold: float) -> Optional[str]:
+        """
+        Find the most similar slug using the trigram index.
+
+        The index over the catalog file is built on first use and shared with later catalogs opened
+        from the same file; the small recent-games delta gets its own index.
+
+        Args:
+            name: The cleaned torrent name
+            threshold: Minimum Dice similarity (0-1), 0 disables fuzzy matching
+
+        Returns:
+            Optional[str]: The matching slug, or None if nothing reached the threshold
+        """
+        if threshold <= 0 or not name:
+            return None
+
+        if self._trigrams is None:
+            self._trigrams = _catalog_trigrams(self)
+        if self._delta_trigrams is None:
+            self._delta_trigrams = TrigramIndex(self._delta)
+
+        # Same preference as within an index: higher score, then shorter slug
+        matches = [match for match in (self._trigrams.search(name, threshold),
+                                        self._delta_trigrams.search(name, threshold)) if match is not None]
+        if not matches:
+            return None
+        match = max(matches, key=lambda match: (match[1], -len(match[0])))
+        logger.debug(f"Fuzzy match for {name}: {match[0]} (score {match[1]:.2f})")
+        return match[0]
+
+    def slugs(self) -> Iterator[str]:
+        """Iterate over every slug in the catalog, including the recent-games delta."""
+        yield from self._catalog_slugs()
+        yield from self._delta
+
+    def _catalog_slugs(self) -> Iterator[str]:
+        return iter(self._by_slug)
+
+    def _get(self, slug: str) -> Optional[str]:
+        return self._by_slug.get(slug)
+
+    def _partial(self, name: str) -> Optional[str]:
+        return _scan_buckets(self._by_length, self._joined, name)
+
+    def resolve(self, name: str, fuzzy_threshold: float = 0.0) -> Optional[Tuple[str, str]]:
+        """
+        Resolve a cleaned torrent name to a GOG title, reporting how it matched.
+
+        Exact slug matches are preferred, falling back to the shortest partial match and
+        then to the most similar slug by trigram similarity.
+
+        Args:
+            name: The cleaned torrent name
+            fuzzy_threshold: Minimum similarity for fuzzy matches (0 disables fuzzy matching)
+
+        Returns:
+            Optional[Tuple[str, str]]: The title and the kind of match (EXACT_MATCH, PARTIAL_MATCH
+            or FUZZY_MATCH), or None if no match was found
+        """
+        title = self.get(name)
+        if title is not None:
+            logger.info(f'Found exact match: {name} for title: {title}')
+            return title, EXACT_MATCH
+
+        slug = self.partial_match(name)
+        if slug is not None:
+            title = self.get(slug)
+            logger.info(f'Found partial match: {slug} for title: {title}')
+            return title, PARTIAL_MATCH
+
+        slug = self.fuzzy_match(name, fuzzy_threshold)
+        if slug is not None:
+            title = self.get(slug)
+            logger.info(f'Found fuzzy match: {slug} for title: {title}')
+            return title, FUZZY_MATCH
+
+        return None
+
+    def lookup(self, name: str, fuzzy_threshold: float = 0.0) -> Optional[str]:
+        """
+        Resolve a cleaned torrent name to a GOG title, see resolve().
+
+        Args:
+            name: The cleaned torrent name
+            fuzzy_threshold: Minimum similarity for fuzzy matches (0 disables fuzzy matching)
+
+        Returns:
+            Optional[str]: The title, or None if no match was found
+        """
+        match = self.resolve(name, fuzzy_threshold)
+        return match[0] if match is not None else None
+
+    def resolve_many(self, names: Iterable[str],
+                     fuzzy_threshold: float = 0.0) -> Dict[str, Optional[Tuple[str, str]]]:
+        """
+        Resolve a batch of cleaned torrent names in one call, see resolve().
+
+        Each distinct name is resolved once, and the trigram index is built at most once for the
+        batch and kept for the following batches over the same catalog file.
+
+        Args:
+            names: The cleaned torrent names
+            fuzzy_threshold: Minimum similarity for fuzzy matches (0 disables fuzzy matching)
+
+        Returns:
+            Dict[str, Optional[Tuple[str, str]]]: Title and kind of match for each name, or None where
+            no match was found
+        """
+        resolved = {}
+        for name in names:
+            if name not in resolved:
+                resolved[name] = self.resolve(name, fuzzy_threshold)
+        return resolved
+
+    def lookup_many(self, names: Iterable[str], fuzzy_threshold: float = 0.0) -> Dict[str, Optional[str]]:
+        """
+        Resolve a batch of cleaned torrent names in one call, see resolve_many().
+
+        Args:
+            names: The cleaned torrent names
+            fuzzy_threshold: Minimum similarity for fuzzy matches (0 disables fuzzy matching)
+
+        Returns:
+            Dict[str, Optional[str]]: Title for each name, or None where no match was found
+        """
+        return {name: match[0] if match is not None else None
+                for name, match in self.resolve_many(names, fuzzy_threshold).items()}
+
+
+class MappedGogCatalog(GogCatalog):
+    """
+    GOG catalog backed by a memory-mapped binary index written by GogCatalog.save_index().
+
+    Lookups binary search the sorted entry table and only touch the pages they need,
+    so opening the catalog does not depend on the catalog size.
+    """
+
+    def __init__(self, filename: str):
+        super().__init__(())
+
+        with open(filename, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, count, buckets, source_size, source_mtime_ns = INDEX_HEADER.unpack_from(self._map, 0)
+            if magic != INDEX_MAGIC:
+                raise ValueError(f"Not a GOG catalog index: {filename}")
+
+            self._count = count
+            self._buckets = buckets
+            self.source_size = source_size
+            self.source_mtime_ns = source_mtime_ns
+
+            self._entries_offset = INDEX_HEADER.size
+            self._by_length_offset = self._entries_offset + count * INDEX_ENTRY.size
+            self._length_dir_offset = self._by_length_offset + count * INDEX_PAIR.size
+            self._slug_list_offset = self._length_dir_offset + buckets * INDEX_PAIR.size
+            self._blob_offset = self._slug_list_offset + self._length_dir(buckets - 1)[1]
+
+            if self._blob_offset > len(self._map):
+                raise ValueError(f"Truncated GOG catalog index: {filename}")
+        except Exception:
+            self._map.close()
+            raise
+
+    def __len__(self) -> int:
+        return self._count + len(self._delta)
+
+    def close(self):
+        """Release the memory map."""
+        self._map.close()
+
+    def _catalog_slugs(self) -> Iterator[str]:
+        for number in range(self._count):
+            slug_offset, slug_length, _, _ = self._entry(number)
+            yield self._string(slug_offset, slug_length).decode('utf-8')
+
+    def _entry(self, number: int):
+        return INDEX_ENTRY.unpack_from(self._map, self._entries_offset + number * INDEX_ENTRY.size)
+
+    def _length_entry(self, position: int):
+        return INDEX_PAIR.unpack_from(self._map, self._by_length_offset + position * INDEX_PAIR.size)
+
+    def _length_dir(self, length: int):
+        return INDEX_PAIR.unpack_from(self._map, self._length_dir_offset + length * INDEX_PAIR.size)
+
+    def _string(self, offset: int, length: int) -> bytes:
+        start = self._blob_offset + offset
+        return self._map[start:start + length]
+
+    def _get(self, slug: str) -> Optional[str]:
+        key = slug.encode('utf-8')
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            slug_offset, slug_length, title_offset, title_length = self._entry(middle)
+            current = self._string(slug_offset, slug_length)
+            if current < key:
+                low = middle + 1
+            elif current > key:
+                high = middle
+            else:
+                return self._string(title_offset, title_length).decode('utf-8')
+        return None
+
+    def _partial(self, name: str) -> Optional[str]:
+        if '\n' in name:
+            return None
+
+        key = name.encode('utf-8')
+        last_bucket = min(len(name) + PARTIAL_MATCH_SLACK, self._buckets - 2)
+        for length in range(len(name), last_bucket + 1):
+            first, start = self._length_dir(length)
+            last, end = self._length_dir(length + 1)
+            found = self._map.find(key, self._slug_list_offset + start, self._slug_list_offset + end)
+            if found < 0:
+                continue
+
+            # Map the hit back to the slug containing it: the last slug starting at or before it.
+            found -= self._slug_list_offset
+            low, high = first, last
+            while high - low > 1:
+                middle = (low + high) // 2
+                if self._length_entry(middle)[1] <= found:
+                    low = middle
+                else:
+                    high = middle
+            slug_offset, slug_length, _, _ = self._entry(self._length_entry(low)[0])
+            return self._string(slug_offset, slug_length).decode('utf-8')
+        return None
@@ -1,25 +1,69 @@
 import base64
 import logging
-from typing import Dict, List, Optional
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import requests
 from requests.adapters import HTTPAdapter
 from requests.exceptions import ConnectionError, Timeout, RequestException
 from urllib3.util.retry import Retry
 
-from src.modules.config_parse import ROMM_API_PASSWORD, ROMM_API_USERNAME, ROMM_API_URL, ROMM_PLATFORM_SLUG
+from src.modules.config_parse import (
+    ROMM_API_PASSWORD, ROMM_API_USERNAME, ROMM_API_URL, ROMM_PLATFORM_SLUG, ROMM_PAGE_SIZE,
+    ROMM_PAGE_WORKERS, ROMM_POOL_SIZE, ROMM_DELETE_CHUNK_SIZE, ROMM_DELETE_WORKERS, ROMM_DELETE_RETRIES,
+    ROMM_CACHE_TTL
+)
 
 logger = logging.getLogger(__name__)
 
+# Seconds to wait before retrying a failed delete chunk, multiplied by the attempt number
+DELETE_RETRY_DELAY = 5
+# Games of each successfully deleted chunk checked afterwards; if one still exists, the whole chunk is checked
+DELETE_VERIFY_SAMPLE = 3
+
+
+# Shared ROMM API client, see get_romm_api()
+_shared_api: Optional['RommAPI'] = None
+_shared_api_lock = threading.Lock()
+
+
+class RommAPIError(Exception):
+    """Raised when a page of a paginated listing cannot be retrieved."""
+
+
+def get_romm_api() -> 'RommAPI':
+    """
+    Get the process-wide ROMM API client, creating it on first use.
+
+    Sharing one client keeps its pooled keep-alive connections and its cache of
+    slow-changing endpoints across cleanup checks and cycles.
+
+    Returns:
+        RommAPI: The shared client
+    """
+    global _shared_api
+    with _shared_api_lock:
+        if _shared_api is None:
+            _shared_api = RommAPI()
+        return _shared_api
+
 
 class RommAPI:
-    def __init__(self):
+    def __init__(self, cache_ttl: float = ROMM_CACHE_TTL):
         self.session = requests.Session()
+        # Deletes are retried by delete_games() once it knows which games are left, never blindly
+        self.delete_session = requests.Session()
         self.username = ROMM_API_USERNAME
         self.password = ROMM_API_PASSWORD
         self.slug = ROMM_PLATFORM_SLUG
         self.base_url = ROMM_API_URL
         self.headers = self._create_auth_headers()
+        self.cache_ttl = cache_ttl
+        self._cache = {}
+        self._cache_lock = threading.Lock()
         self._setup_session()
 
     def _setup_session(self):
@@ -30,11 +74,18 @@ class RommAPI:
             status_forcelist=[429, 500, 502, 503, 504],
             allowed_methods=["HEAD", "GET", "OPTIONS", "POST", "DELETE"]
         )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        # Keep enough pooled connections for concurrent page requests
+        adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=ROMM_POOL_SIZE,
+                              pool_maxsize=max(ROMM_POOL_SIZE, ROMM_PAGE_WORKERS))
         self.session.mount("http://", adapter)
         self.session.mount("https://", adapter)
         self.session.timeout = 30
 
+        delete_adapter = HTTPAdapter(max_retries=0, pool_connections=1,
+                                     pool_maxsize=max(1, ROMM_DELETE_WORKERS))
+        self.delete_session.mount("http://", delete_adapter)
+        self.delete_session.mount("https://", delete_adapter)
+
     def _create_auth_headers(self) -> Dict[str, str]:
         """Create authentication headers using Basic Auth."""
         if self.username and self.password:
@@ -43,13 +94,14 @@ class RommAPI:
             return {"Authorization": f"Basic {auth_token}"}
         return {}
 
-    def _request(self, method, endpoint, **kwargs):
+    def _request(self, method, endpoint, session: Optional[requests.Session] = None, **kwargs):
         """
         Send a request to the ROMM API with comprehensive error handling.
 
         Args:
             method: HTTP method to use
             endpoint: API endpoint path
+            session: Session to send the request on, the shared session with retries if None
             **kwargs: Additional arguments to pass to requests.request
 
         Returns:
@@ -71,7 +123,7 @@ class RommAPI:
             if 'timeout' not in kwargs:
                 kwargs['timeout'] = 30
 
-            resp = self.session.request(method, url, **kwargs)
+            resp = (session or self.session).request(method, url, **kwargs)
             resp.raise_for_status()
             if resp.content:
                 return resp.json()
@@ -90,19 +142,150 @@ class RommAPI:
             logger.error(f"Unexpected error during API request: {e}")
             return None
 
-    def delete_games(self, game_ids: List[int]) -> Optional[Dict]:
+    def _cached_get(self, endpoint: str):
         """
-        Delete games from ROMM.
+        GET an endpoint whose data rarely changes, reusing the previous response for cache_ttl seconds.
+        Failed requests are not cached.
+
+        Args:
+            endpoint: API endpoint path
+
+        Returns:
+            JSON response data or None if no content or error
+        """
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._cache.get(endpoint)
+            if cached is not None and now - cached[0] < self.cache_ttl:
+                return cached[1]
+
+        data = self._request("GET", endpoint)
+        if data is not None and self.cache_ttl > 0:
+            with self._cache_lock:
+                self._cache[endpoint] = (now, data)
+        return data
+
+    def clear_cache(self):
+        """Forget all cached responses."""
+        with self._cache_lock:
+            self._cache.clear()
+
+    def delete_games(self, game_ids: List[int], chunk_size: int = ROMM_DELETE_CHUNK_SIZE,
+                     workers: int = ROMM_DELETE_WORKERS, retries: int = ROMM_DELETE_RETRIES) -> Optional[Dict]:
+        """
+        Delete games from ROMM, in chunks sent a few at a time.
+
+        Delete requests are never retried blindly. After a chunk is sent, a sample of its games is
+        checked; if the request failed or a sampled game still exists, every game of the chunk is
+        checked and only the ones left are retried. The final count is reconciled against the
+        library total before and after.
 
         Args:
             game_ids: List of game IDs to delete
+            chunk_size: Maximum number of games per delete request
+            workers: Number of delete requests in flight at once
+            retries: Number of times the remaining games of a failed chunk are retried
 
         Returns:
-            API response
+            Dict with the 'deleted' and 'failed' game IDs, or None if no game could be deleted
         """
-        data = {"roms": game_ids, "delete_from_fs": []}
-        logger.info(f"Deleting {len(game_ids)} empty ROMMs...")
-        return self._request("POST", "/api/roms/delete", json=data)
+        chunk_size = max(1, chunk_size)
+        chunks = [game_ids[start:start + chunk_size] for start in range(0, len(game_ids), chunk_size)]
+        if not chunks:
+            return {"deleted": [], "failed": []}
+        logger.info(f"Deleting {len(game_ids)} ROMMs in {len(chunks)} chunk(s)...")
+        total_before = self.count_games()
+
+        def delete_chunk(number: int, chunk: List[int]) -> Tuple[List[int], List[int]]:
+            remaining = list(chunk)
+            for attempt in range(max(0, retries) + 1):
+                if attempt:
+                    time.sleep(DELETE_RETRY_DELAY * attempt)
+                    logger.info(f"Retrying {len(remaining)} ROMMs of chunk {number}/{len(chunks)} "
+                                f"(attempt {attempt + 1}/{retries + 1})")
+                sent = self._request("POST", "/api/roms/delete", session=self.delete_session,
+                                     json={"roms": remaining, "delete_from_fs": []}) is not None
+                if sent:
+                    sample = remaining[::max(1, len(remaining) // DELETE_VERIFY_SAMPLE)][:DELETE_VERIFY_SAMPLE]
+                    if not self.existing_games(sample):
+                        remaining = []
+                        break
+                    logger.warning(f"Chunk {number}/{len(chunks)}: delete request succeeded but ROMMs still exist")
+                # The request may have failed after the server deleted some or all of the games
+                remaining = self.existing_games(remaining)
+                if not remaining:
+                    break
+
+            failed = set(remaining)
+            deleted = [game_id for game_id in chunk if game_id not in failed]
+            if remaining:
+                logger.error(f"Chunk {number}/{len(chunks)}: deleted {len(deleted)} of {len(chunk)} ROMMs, "
+                             f"failed: {remaining}")
+            else:
+                logger.info(f"Chunk {number}/{len(chunks)}: deleted {len(chunk)} ROMMs")
+            return deleted, remaining
+
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks))), thread_name_prefix='romm') as executor:
+            results = list(executor.map(delete_chunk, range(1, len(chunks) + 1), chunks))
+
+        deleted = [game_id for chunk_deleted, _ in results for game_id in chunk_deleted]
+        failed = [game_id for _, chunk_failed in results for game_id in chunk_failed]
+        logger.info(f"Deleted {len(deleted)} of {len(game_ids)} ROMMs" + (f", {len(failed)} failed" if failed else ""))
+
+        total_after = self.count_games()
+        if total_before is not None and total_after is not None and total_before - total_after != len(deleted):
+            logger.warning(f"ROMM library went from {total_before} to {total_after} games while {len(deleted)} "
+                           f"were deleted, games may have been added or removed meanwhile")
+        if not deleted:
+            return None
+        return {"deleted": deleted, "failed": failed}
+
+    def existing_games(self, game_ids: List[int]) -> List[int]:
+        """
+        Check which games still exist, several at a time.
+
+        Args:
+            game_ids: IDs of the games
+
+        Returns:
+            The IDs of the games that exist or could not be checked, in the given order
+        """
+        if not game_ids:
+            return []
+        with ThreadPoolExecutor(max_workers=max(1, min(ROMM_POOL_SIZE, len(game_ids))),
+                                thread_name_prefix='romm-check') as executor:
+            exists = list(executor.map(self.game_exists, game_ids))
+        return [game_id for game_id, found in zip(game_ids, exists) if found is not False]
+
+    def count_games(self) -> Optional[int]:
+        """
+        Get the number of games in the library.
+
+        Returns:
+            The number of games, or None if the server did not report it
+        """
+        data = self.filter_games(limit=1, offset=0)
+        return data.get('total') if isinstance(data, dict) else None
+
+    def game_exists(self, game_id: int) -> Optional[bool]:
+        """
+        Check whether a game still exists.
+
+        Args:
+            game_id: ID of the game
+
+        Returns:
+            True or False, or None if it could not be determined
+        """
+        try:
+            resp = self.session.get(f"{self.base_url}/api/roms/{game_id}", headers=self.headers, timeout=30)
+            if resp.status_code == 404:
+                return False
+            resp.raise_for_status()
+            return True
+        except RequestException as e:
+            logger.error(f"Unable to check ROMM {game_id}: {e}")
+            return None
 
     # Get Game Endpoint GET: /api/roms/{game_id}
     def get_game_by_id(self, game_id: int) -> Optional[Dict]:
@@ -140,9 +323,9 @@ class RommAPI:
         Retrieve ROMM configuration settings.
 
         Returns:
-            Configuration settings
+            Configuration settings (cached for cache_ttl seconds)
         """
-        return self._request("GET", "/api/config")
+        return self._cached_get("/api/config")
 
     # Get Platforms Endpoint GET: /api/platforms
     def get_platforms(self) -> Optional[List[Dict]]:
@@ -150,27 +333,27 @@ class RommAPI:
         Retrieve list of platforms from ROMM.
 
         Returns:
-            List of platforms
+            List of platforms (cached for cache_ttl seconds)
         """
-        return self._request("GET", "/api/platforms")
+        return self._cached_get("/api/platforms")
 
     def get_collections(self) -> Optional[List[Dict]]:
         """
         Retrieve manually created collections.
 
         Returns:
-            List of collections
+            List of collections (cached for cache_ttl seconds)
         """
-        return self._request("GET", "/api/collections")
+        return self._cached_get("/api/collections")
 
     def get_virtual_collections(self) -> Optional[List[Dict]]:
         """
         Retrieve virtual collections.
 
         Returns:
-            List of virtual collections
+            List of virtual collections (cached for cache_ttl seconds)
         """
-        return self._request("GET", "/api/collections/virtual?type=collection")
+        return self._cached_get("/api/collections/virtual?type=collection")
 
     def get_platform_by_slug(self) -> Optional[int]:
         """
@@ -230,3 +413,98 @@ class RommAPI:
         params.update(kwargs)
 
         return self._request("GET", "/api/roms", params=params)
+
+    def _get_page(self, offset: int, page_size: int, filters: Dict) -> Tuple[List[Dict], Optional[int]]:
+        """
+        Retrieve one page of the games listing.
+
+        Returns:
+            Tuple: (games, total number of games if the server reports it)
+
+        Raises:
+            RommAPIError: If the page cannot be retrieved
+        """
+        data = self.filter_games(limit=page_size, offset=offset, **filters)
+        if data is None:
+            raise RommAPIError(f"Failed to retrieve games {offset}-{offset + page_size} from ROMM API")
+        if isinstance(data, dict):
+            return data.get('items', []), data.get('total')
+        return data, None
+
+    def iter_games(self, page_size: int = ROMM_PAGE_SIZE, workers: int = ROMM_PAGE_WORKERS,
+                   **filters) -> Iterator[Dict]:
+        """
+        Iterate over every game matching the filters, requesting the listing page by page.
+
+        The first page reports the total number of games; the remaining pages are then requested
+        several at a time on the shared session and yielded in order. At most a few pages are held
+        in memory, and the whole listing is covered regardless of the server's default page size.
+        Games are yielded once even if the library changes while the pages are fetched.
+
+        Args:
+            page_size: Number of games requested per page
+            workers: Number of pages requested concurrently (1 = one at a time)
+            **filters: Filter parameters, see filter_games()
+
+        Yields:
+            Game details, in the requested order
+
+        Raises:
+            RommAPIError: If a page cannot be retrieved
+        """
+        page_size = max(1, page_size)
+        items, total = self._get_page(0, page_size, filters)
+        yield from items
+        offset = len(items)
+        if len(items) > page_size:
+            logger.warning(f"ROMM API ignored the page size, listing stopped after the first {offset} games")
+            return
+        if len(items) < page_size:
+            return
+
+        # Without a total the number of pages is unknown, so walk them one at a time
+        if total is None or workers <= 1:
+            first_id = items[0].get('id')
+            while True:
+                items, total = self._get_page(offset, page_size, filters)
+                # A server that ignores the paging parameters would otherwise send the same games forever
+                if len(items) > page_size or (items and first_id is not None and items[0].get('id') == first_id):
+                    logger.warning(f"ROMM API ignored the requested page, listing stopped after {offset} games")
+                    return
+                yield from items
+                offset += len(items)
+                if len(items) < page_size or (total is not None and offset >= total):
+                    return
+                first_id = items[0].get('id')
+
+        # Games added or removed while the pages are fetched shift the later pages: a shifted game shows up
+        # twice (skipped here) or not at all (only reported, it is picked up by the next listing)
+        seen = {item.get('id') for item in items}
+        duplicates = 0
+        changed = False
+        offsets = iter(range(offset, total, page_size))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='romm') as executor:
+            pending = deque()
+            for page_offset in offsets:
+                pending.append(executor.submit(self._get_page, page_offset, page_size, filters))
+                if len(pending) >= workers:
+                    break
+
+            while pending:
+                items, page_total = pending.popleft().result()
+                next_offset = next(offsets, None)
+                if next_offset is not None:
+                    pending.append(executor.submit(self._get_page, next_offset, page_size, filters))
+                changed = changed or (page_total is not None and page_total != total)
+                for item in items:
+                    game_id = item.get('id')
+                    if game_id is not None:
+                        if game_id in seen:
+                            duplicates += 1
+                            continue
+                        seen.add(game_id)
+                    yield item
+
+        if changed or duplicates:
+            logger.warning(f"ROMM library changed during the listing ({duplicates} duplicate games skipped), "
+                           f"some games may be missing until the next run")
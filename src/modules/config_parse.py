@@ -116,15 +116,30 @@ conn_info = {
 QBIT_CATEGORY = get_config_value(config_parser, "qbittorrent", "category", "gog")
 MAX_TORRENTS_PER_RUN = get_config_value(config_parser, "qbittorrent", "max_torrents_per_run", 0, "int")
 DELETE_AFTER_PROCESSING = get_config_value(config_parser, "qbittorrent", "delete_after_processing", True, "bool")
+IMPORT_WORKERS = get_config_value(config_parser, "qbittorrent", "import_workers", 1, "int")
+IMPORT_WORKERS_PER_FILESYSTEM = get_config_value(config_parser, "qbittorrent", "import_workers_per_filesystem", 1,
+                                                 "int")
+FILESYSTEM_CONCURRENCY = get_config_value(config_parser, "qbittorrent", "filesystem_concurrency", [], "list")
+COPY_WORKERS = get_config_value(config_parser, "qbittorrent", "copy_workers", 4, "int")
+COPY_VERIFY = get_config_value(config_parser, "qbittorrent", "copy_verify", "size")
+STAGED_REPLACE = get_config_value(config_parser, "qbittorrent", "staged_replace", True, "bool")
+JOURNAL_FILE = get_config_value(config_parser, "qbittorrent", "journal_file", "cache/torrents.db")
+MAX_IMPORT_FAILURES = get_config_value(config_parser, "qbittorrent", "max_import_failures", 3, "int")
+WATCH_MODE = get_config_value(config_parser, "qbittorrent", "watch", False, "bool")
+WATCH_INTERVAL = get_config_value(config_parser, "qbittorrent", "watch_interval_seconds", 10, "int")
+VALIDATE_BEFORE_IMPORT = get_config_value(config_parser, "qbittorrent", "validate_before_import", True, "bool")
+QUARANTINE_CATEGORY = get_config_value(config_parser, "qbittorrent", "quarantine_category", "")
 
 # GOG section
 GOG_ALL_GAMES_FILE = get_config_value(config_parser, "gog", "gog_all_games_file", "cache/gog_all_games.json")
+GOG_ALL_GAMES_INDEX = get_config_value(config_parser, "gog", "gog_all_games_index", "cache/gog_all_games.idx")
 GOG_RECENT_GAMES_FILE = get_config_value(config_parser, "gog", "gog_recent_games_file", "cache/gog_recent_games.json")
 GOG_ALL_GAMES_URL = get_config_value(config_parser, "gog", "gog_all_games_url",
                                      "https://gog-games.to/api/web/all-games")
 GOG_RECENT_GAMES_URL = get_config_value(config_parser, "gog", "gog_recent_games_url",
                                         "https://gog-games.to/api/web/recent-torrents")
 CACHE_REFRESH_HOURS = get_config_value(config_parser, "gog", "cache_refresh_hours", 24, "int")
+GOG_FUZZY_MATCH_THRESHOLD = get_config_value(config_parser, "gog", "fuzzy_match_threshold", 0.0, "float")
 
 # Romm section
 ROMM_ENABLE = get_config_value(config_parser, "romm", "enable", False, "bool")
@@ -138,14 +153,39 @@ ROMM_SCAN_DANGEROUS_FILETYPES = get_config_value(config_parser, "romm", "scan_da
 ROMM_MISSING_EXE = get_config_value(config_parser, "romm", "missing_exe", True, "bool")
 ROMM_DELETE_AFTER_IMPORT = get_config_value(config_parser, "romm", "delete_old_after_import", True, "bool")
 ROMM_SCAN_AFTER_IMPORT = get_config_value(config_parser, "romm", "scan_after_import", True, "bool")
+ROMM_PAGE_SIZE = get_config_value(config_parser, "romm", "page_size", 500, "int")
+ROMM_PAGE_WORKERS = get_config_value(config_parser, "romm", "page_workers", 4, "int")
+ROMM_POOL_SIZE = get_config_value(config_parser, "romm", "pool_size", 10, "int")
+ROMM_DELETE_CHUNK_SIZE = get_config_value(config_parser, "romm", "delete_chunk_size", 100, "int")
+ROMM_DELETE_WORKERS = get_config_value(config_parser, "romm", "delete_workers", 2, "int")
+ROMM_DELETE_RETRIES = get_config_value(config_parser, "romm", "delete_retries", 2, "int")
+ROMM_CACHE_TTL = get_config_value(config_parser, "romm", "cache_ttl_seconds", 300, "int")
 
 
 # Cleanup section
 REMOVE_EXTRAS = get_config_value(config_parser, "cleanup", "remove_extras", True, "bool")
 EXTRAS_PATTERNS = get_config_value(config_parser, "cleanup", "extras_patterns",
-                                   "soundtrack,ost,flac,wav,mp3,artbook,booklet,wallpaper", "list")
+                                   ["soundtrack", "ost", "flac", "wav", "mp3", "artbook", "booklet", "wallpaper"],
+                                   "list")
+EXTRAS_EXTENSIONS = get_config_value(config_parser, "cleanup", "extras_extensions", [".zip"], "list")
+EXTRAS_GLOBS = get_config_value(config_parser, "cleanup", "extras_globs", [], "list")
+EXTRAS_WHOLE_WORDS = get_config_value(config_parser, "cleanup", "extras_whole_words", False, "bool")
 REMOVE_EMPTY_DIRS = get_config_value(config_parser, "cleanup", "remove_empty_dirs", True, "bool")
 REMOVE_TEXT_FILES = get_config_value(config_parser, "cleanup", "remove_text_files", True, "bool")
+INCREMENTAL_CLEANUP = get_config_value(config_parser, "cleanup", "incremental", True, "bool")
+LIBRARY_INDEX_FILE = get_config_value(config_parser, "cleanup", "index_file", "cache/library.db")
+SCAN_WORKERS = get_config_value(config_parser, "cleanup", "scan_workers", 4, "int")
+LIBRARY_WATCH = get_config_value(config_parser, "cleanup", "watch", False, "bool")
+LIBRARY_WATCH_DEBOUNCE = get_config_value(config_parser, "cleanup", "watch_debounce_seconds", 5, "int")
+MANIFEST_ENABLED = get_config_value(config_parser, "cleanup", "manifest", False, "bool")
+MANIFEST_WORKERS = get_config_value(config_parser, "cleanup", "manifest_workers", 4, "int")
+MANIFEST_FULL_VERIFY_DAYS = get_config_value(config_parser, "cleanup", "manifest_full_verify_days", 30, "int")
+
+# Dedupe section
+DEDUPE_ACTION = get_config_value(config_parser, "dedupe", "action", "report")
+DEDUPE_MIN_SIZE = get_config_value(config_parser, "dedupe", "min_size_bytes", 1048576, "int")
+DEDUPE_WORKERS = get_config_value(config_parser, "dedupe", "hash_workers", 4, "int")
+DEDUPE_HASH_CACHE_FILE = get_config_value(config_parser, "dedupe", "hash_cache_file", "cache/hashes.db")
 
 # Export all variables and functions that should be available when importing this module
 __all__ = [
@@ -164,13 +204,27 @@ __all__ = [
     "MAX_TORRENTS_PER_RUN",
     "DELETE_AFTER_PROCESSING",
     "QBIT_ENABLE",
+    "IMPORT_WORKERS",
+    "IMPORT_WORKERS_PER_FILESYSTEM",
+    "FILESYSTEM_CONCURRENCY",
+    "COPY_WORKERS",
+    "COPY_VERIFY",
+    "STAGED_REPLACE",
+    "JOURNAL_FILE",
+    "MAX_IMPORT_FAILURES",
+    "WATCH_MODE",
+    "WATCH_INTERVAL",
+    "VALIDATE_BEFORE_IMPORT",
+    "QUARANTINE_CATEGORY",
 
     # GOG section
     "GOG_ALL_GAMES_FILE",
+    "GOG_ALL_GAMES_INDEX",
     "GOG_RECENT_GAMES_FILE",
     "GOG_ALL_GAMES_URL",
     "GOG_RECENT_GAMES_URL",
     "CACHE_REFRESH_HOURS",
+    "GOG_FUZZY_MATCH_THRESHOLD",
 
     # Romm section
     "ROMM_ENABLE",
@@ -185,12 +239,36 @@ __all__ = [
     "ROMM_MISSING_EXE",
     "ROMM_DELETE_AFTER_IMPORT",
     "ROMM_SCAN_AFTER_IMPORT",
+    "ROMM_PAGE_SIZE",
+    "ROMM_PAGE_WORKERS",
+    "ROMM_POOL_SIZE",
+    "ROMM_DELETE_CHUNK_SIZE",
+    "ROMM_DELETE_WORKERS",
+    "ROMM_DELETE_RETRIES",
+    "ROMM_CACHE_TTL",
     "ROMM_EMPTY_DIRS_LIBRARY_SPECIFIC",
 
 
     # Cleanup section
     "REMOVE_EXTRAS",
     "EXTRAS_PATTERNS",
+    "EXTRAS_EXTENSIONS",
+    "EXTRAS_GLOBS",
+    "EXTRAS_WHOLE_WORDS",
     "REMOVE_EMPTY_DIRS",
-    "REMOVE_TEXT_FILES"
+    "REMOVE_TEXT_FILES",
+    "INCREMENTAL_CLEANUP",
+    "LIBRARY_INDEX_FILE",
+    "SCAN_WORKERS",
+    "LIBRARY_WATCH",
+    "LIBRARY_WATCH_DEBOUNCE",
+    "MANIFEST_ENABLED",
+    "MANIFEST_WORKERS",
+    "MANIFEST_FULL_VERIFY_DAYS",
+
+    # Dedupe section
+    "DEDUPE_ACTION",
+    "DEDUPE_MIN_SIZE",
+    "DEDUPE_WORKERS",
+    "DEDUPE_HASH_CACHE_FILE",
 ]
\ No newline at end of file
@@ -0,0 +1,306 @@
+"""
+Duplicate file detection for Game Library Manager Scripts.
+
+Finds files with identical contents across game folders (installer parts and extras shared by
+several versions or re-imports) without hashing the whole library:
+1. Files are grouped by size; a file with a unique size has no duplicate
+2. Same-size files are grouped by a hash of their first bytes
+3. Only files that still collide are fully hashed, in a process pool using memory-mapped reads
+
+Hashes are cached by (device, inode, size, mtime), so repeat runs only hash new or changed files.
+Duplicates can be reported only, or replaced with hardlinks or reflinks to a single copy.
+
+Run with: python app.py dedupe
+"""
+import hashlib
+import logging
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from src.modules.config_parse import (
+    DEDUPE_ACTION, DEDUPE_HASH_CACHE_FILE, DEDUPE_MIN_SIZE, DEDUPE_WORKERS, SCAN_WORKERS
+)
+from src.modules.helpers import SQLiteStore, file_digest, format_size
+from src.modules.library_cleanup import library_folders, map_folders, walk_files
+from src.modules.transfer import reflink
+
+logger = logging.getLogger(__name__)
+
+# Number of bytes hashed from the start of each same-size file before deciding to hash it fully
+PARTIAL_HASH_SIZE = 64 * 1024
+# Supported actions for duplicates
+ACTIONS = ('report', 'hardlink', 'reflink')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    device INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    partial TEXT,
+    full TEXT,
+    PRIMARY KEY (device, inode)
+)
+"""
+
+
+class LibraryFile:
+    """A regular file in the library, with the stat fields used to identify it."""
+    __slots__ = ('path', 'device', 'inode', 'size', 'mtime_ns')
+
+    def __init__(self, path: str, stat: os.stat_result):
+        self.path = path
+        self.device = stat.st_dev
+        self.inode = stat.st_ino
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+
+    @property
+    def key(self) -> Tuple[int, int]:
+        return self.device, self.inode
+
+
+class HashCache(SQLiteStore):
+    """
+    SQLite cache of file hashes, keyed by (device, inode) and only valid while size and mtime match.
+
+    Args:
+        path: Path of the SQLite database file (created if needed)
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._connection.execute(SCHEMA)
+
+    def get(self, file: LibraryFile) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Look up the cached hashes of a file.
+
+        Returns:
+            Tuple: (partial hash, full hash), None for hashes that are not cached or out of date
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT partial, full FROM hashes WHERE device = ? AND inode = ? AND size = ? AND mtime_ns = ?",
+                (file.device, file.inode, file.size, file.mtime_ns),
+            ).fetchone()
+        return row if row else (None, None)
+
+    def put(self, file: LibraryFile, partial: Optional[str], full: Optional[str] = None):
+        """
+        Store the hashes of a file, replacing any out of date entry for the same inode.
+        """
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO hashes (device, inode, size, mtime_ns, partial, full) VALUES (?, ?, ?, ?, ?, ?)",
+                (file.device, file.inode, file.size, file.mtime_ns, partial, full),
+            )
+
+
+def partial_digest(path: str, size: int = PARTIAL_HASH_SIZE) -> str:
+    """
+    Hash the first bytes of a file.
+
+    Args:
+        path: Path of the file
+        size: Number of bytes to hash
+
+    Returns:
+        str: Hex digest of the first size bytes
+    """
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read(size)).hexdigest()
+
+
+def collect_files(min_size: int) -> List[LibraryFile]:
+    """
+    List the regular files in the library of at least min_size bytes, one entry per inode.
+    Files that are already hardlinked to each other are only listed once.
+    """
+    def folder_files(folder: os.DirEntry) -> List[LibraryFile]:
+        files = []
+        for entry in walk_files(folder.path):
+            try:
+                if entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    if stat.st_size >= min_size:
+                        files.append(LibraryFile(entry.path, stat))
+            except OSError as e:
+                logger.error(f"Error reading {entry.path}: {e}")
+        return files
+
+    unique = {}
+    for files in map_folders(folder_files, library_folders()):
+        for file in files:
+            unique.setdefault(file.key, file)
+    return list(unique.values())
+
+
+def _groups(files: List[LibraryFile], key) -> List[List[LibraryFile]]:
+    """Group files by key, keeping only groups of two or more."""
+    groups = defaultdict(list)
+    for file in files:
+        value = key(file)
+        if value is not None:
+            groups[value].append(file)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def find_duplicates(files: List[LibraryFile], cache: HashCache,
+                    workers: int = DEDUPE_WORKERS) -> List[List[LibraryFile]]:
+    """
+    Find groups of files with identical contents.
+
+    Args:
+        files: Candidate files, one per inode
+        cache: Hash cache to read and update
+        workers: Number of processes used for full hashes
+
+    Returns:
+        List: Groups of identical files, largest reclaimable size first
+    """
+    partial = {}
+    full = {}
+
+    def hash_partial(file: LibraryFile) -> Optional[str]:
+        try:
+            return partial_digest(file.path)
+        except OSError as e:
+            logger.error(f"Error hashing {file.path}: {e}")
+            return None
+
+    # Same-size files by the hash of their first bytes, reading only what is not cached
+    same_size = [file for group in _groups(files, lambda file: file.size) for file in group]
+    cached = {file.key: cache.get(file) for file in same_size}
+    missing = []
+    for file in same_size:
+        if cached[file.key][0] is None:
+            missing.append(file)
+        else:
+            partial[file.key] = cached[file.key][0]
+    with ThreadPoolExecutor(max_workers=max(1, SCAN_WORKERS), thread_name_prefix='hash') as executor:
+        for file, digest in zip(missing, executor.map(hash_partial, missing)):
+            if digest is not None:
+                partial[file.key] = digest
+                cache.put(file, digest)
+
+    # Files that still collide, by a hash of their whole contents
+    by_partial = _groups(same_size, lambda file: (file.size, partial[file.key]) if file.key in partial else None)
+    candidates = [file for group in by_partial for file in group]
+    for file in candidates:
+        if file.size <= PARTIAL_HASH_SIZE:
+            # The partial hash already covered the whole file
+            full[file.key] = partial[file.key]
+        elif cached[file.key][1] is not None:
+            full[file.key] = cached[file.key][1]
+
+    missing = [file for file in candidates if file.key not in full]
+    if missing:
+        logger.info(f"Hashing {len(missing)} files ({format_size(sum(file.size for file in missing))}) "
+                    f"with {max(1, workers)} processes")
+        with ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = [(file, executor.submit(file_digest, file.path)) for file in missing]
+            for file, future in futures:
+                try:
+                    full[file.key] = future.result()
+                    cache.put(file, partial[file.key], full[file.key])
+                except OSError as e:
+                    logger.error(f"Error hashing {file.path}: {e}")
+
+    groups = _groups(candidates, lambda file: (file.size, full[file.key]) if file.key in full else None)
+    for group in groups:
+        group.sort(key=lambda file: file.path)
+    groups.sort(key=lambda group: group[0].size * (len(group) - 1), reverse=True)
+    return groups
+
+
+def _unchanged(file: LibraryFile) -> bool:
+    """Check that a file was not modified since it was hashed."""
+    try:
+        stat = os.stat(file.path, follow_symlinks=False)
+    except OSError:
+        return False
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns) == (file.inode, file.size, file.mtime_ns)
+
+
+def link_duplicate(original: LibraryFile, duplicate: LibraryFile, action: str) -> bool:
+    """
+    Replace a duplicate with a hardlink or reflink to the original, atomically.
+
+    Args:
+        original: The copy that is kept
+        duplicate: The copy that is replaced
+        action: 'hardlink' or 'reflink'
+
+    Returns:
+        bool: True if the duplicate was replaced
+    """
+    if not (_unchanged(original) and _unchanged(duplicate)):
+        logger.warning(f"Skipping {duplicate.path}: modified since it was hashed")
+        return False
+
+    temporary = os.path.join(os.path.dirname(duplicate.path), f".{os.path.basename(duplicate.path)}.dedupe")
+    try:
+        if action == 'hardlink':
+            os.link(original.path, temporary)
+        else:
+            with open(original.path, 'rb') as source, open(temporary, 'wb') as destination:
+                if not reflink(source.fileno(), destination.fileno()):
+                    raise OSError("reflinks are not supported here")
+            stat = os.stat(duplicate.path)
+            os.chmod(temporary, stat.st_mode)
+            os.utime(temporary, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.replace(temporary, duplicate.path)
+        return True
+    except OSError as e:
+        logger.error(f"Error replacing {duplicate.path} with a {action}: {e}")
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+        return False
+
+
+def run(action: str = DEDUPE_ACTION):
+    """
+    Find duplicate files in the game library, report them and optionally link them together.
+
+    Args:
+        action: 'report', 'hardlink' or 'reflink'
+    """
+    if action not in ACTIONS:
+        logger.error(f"Unknown dedupe action '{action}', expected one of: {', '.join(ACTIONS)}")
+        return
+
+    logger.info("Looking for duplicate files...")
+    started = time.monotonic()
+
+    cache = HashCache(DEDUPE_HASH_CACHE_FILE)
+    try:
+        files = collect_files(DEDUPE_MIN_SIZE)
+        groups = find_duplicates(files, cache)
+    finally:
+        cache.close()
+
+    reclaimable = 0
+    reclaimed = 0
+    for group in groups:
+        original, duplicates = group[0], group[1:]
+        reclaimable += original.size * len(duplicates)
+        logger.info(f"{len(group)} copies of {format_size(original.size)}: " + ", ".join(file.path for file in group))
+
+        if action == 'report':
+            continue
+        for duplicate in duplicates:
+            if duplicate.device != original.device:
+                logger.warning(f"Skipping {duplicate.path}: on a different filesystem than {original.path}")
+            elif link_duplicate(original, duplicate, action):
+                reclaimed += duplicate.size
+
+    logger.info(f"Scanned {len(files)} files in {time.monotonic() - started:.1f}s: "
+                f"{len(groups)} duplicate groups, {format_size(reclaimable)} reclaimable")
+    if action != 'report':
+        logger.info(f"Reclaimed {format_size(reclaimed)} with {action}s")
@@ -1,45 +1,222 @@
 # Misc Helper Functions
+import hashlib
 import json
 import logging
+import mmap
 import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from enum import IntEnum
 
 import requests
 
 logger = logging.getLogger(__name__)
 
+# Size of the chunks streamed to disk when downloading files
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# Size of the chunks fed to the hash when hashing files
+DIGEST_CHUNK_SIZE = 8 * 1024 * 1024
+# Permissions of files written by atomic_write(); mkstemp creates them readable by their owner only
+FILE_MODE = 0o644
+
+
+class FetchResult(IntEnum):
+    """
+    Outcome of fetch_json_data(). FAILED is falsy, so the result can still be tested as a bool.
+    """
+    FAILED = 0
+    UNCHANGED = 1
+    UPDATED = 2
+
+
+class SQLiteStore:
+    """
+    Base of the SQLite stores (journal, library index, manifests, dedupe hash cache).
+
+    Holds one connection in autocommit mode with WAL journaling, shared by threads under self._lock,
+    so readers are not blocked by a writer and every statement is durable once it returns.
+
+    Args:
+        path: Path of the SQLite database file (created if needed)
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
+
+
 def tag(value):
     """
     Function to apply tag to folder name consistently based on value passed to function.
     """
     return f" ({value})" if value else None
 
-def fetch_json_data(url, filename):
+@contextmanager
+def atomic_write(filename, mode='wb', validate=None):
+    """
+    Open a temporary file next to filename and atomically rename it into place on success.
+    The previous file is left untouched if writing or validation fails.
+    :param filename: Final path of the file.
+    :param mode: File mode for the temporary file ('wb' or 'w').
+    :param validate: Optional function called with the path of the complete temporary file before
+                     the rename, raising an exception if the contents must not replace the file.
+    """
+    directory = os.path.dirname(filename) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, mode, **({} if 'b' in mode else {'encoding': 'utf-8'})) as f:
+            os.fchmod(f.fileno(), FILE_MODE)
+            yield f
+        if validate is not None:
+            validate(temp_path)
+        os.replace(temp_path, filename)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _read_cache_meta(filename):
+    """
+    Read the validators and last check time stored next to a cached file.
+    :param filename: Path of the cached file.
+    :return: Dictionary with 'etag', 'last_modified' and 'checked_at' keys (possibly empty).
+    """
+    try:
+        with open(f"{filename}.meta", 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        return meta if isinstance(meta, dict) else {}
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _write_cache_meta(filename, meta):
+    """
+    Store the validators and last check time next to a cached file.
+    :param filename: Path of the cached file.
+    :param meta: Dictionary to store.
+    """
+    try:
+        with atomic_write(f"{filename}.meta", 'w') as f:
+            json.dump(meta, f)
+    except OSError as e:
+        logger.warning(f"Unable to save cache metadata for {filename}: {e}")
+
+
+def _validate_json(path):
+    """
+    Check that a downloaded file is a complete JSON document.
+    :param path: Path of the file.
+    :raises ValueError: If the file is not valid JSON.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        json.load(f)
+
+
+def fetch_json_data(url, filename, max_age_hours=0):
     """
     Fetch data from the given URL and save it to the specified file.
+
+    The download is skipped while the cached file is younger than max_age_hours. Once stale,
+    the request carries If-None-Match/If-Modified-Since validators so an unchanged resource
+    costs a 304, and a changed body is streamed to a temporary file and renamed into place once it
+    parses as JSON. A truncated or invalid download keeps the previous file and its validators.
     :param url: API endpoint to fetch data from.
     :param filename: File path to save the fetched data.
+    :param max_age_hours: Skip the request if the cache was checked within this many hours (0 = always check).
+    :return: FetchResult.UPDATED if a new file was saved, FetchResult.UNCHANGED if the cached file is
+             still current (fresh or 304), FetchResult.FAILED otherwise.
     """
+    cached = os.path.isfile(filename)
+    meta = _read_cache_meta(filename) if cached else {}
+
+    if cached and max_age_hours > 0:
+        age = time.time() - meta.get('checked_at', 0)
+        if age < max_age_hours * 3600:
+            logger.info(f"{filename} is fresh ({age / 3600:.1f}h old), skipping download")
+            return FetchResult.UNCHANGED
+
+    headers = {}
+    if cached and meta.get('etag'):
+        headers['If-None-Match'] = meta['etag']
+    if cached and meta.get('last_modified'):
+        headers['If-Modified-Since'] = meta['last_modified']
+
     try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()  # Raise exception for non-200 status codes
+        with requests.get(url, headers=headers, timeout=30, stream=True) as response:
+            if response.status_code == 304:
+                meta['checked_at'] = time.time()
+                _write_cache_meta(filename, meta)
+                logger.info(f"{filename} is unchanged on the server")
+                return FetchResult.UNCHANGED
+
+            response.raise_for_status()  # Raise exception for non-200 status codes
 
-        # Create directory structure if it doesn't exist
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
+            # Stream the body to disk so the whole response is never held in memory
+            written = 0
+            with atomic_write(filename, validate=_validate_json) as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+                    written += len(chunk)
 
-        # Save data to file
-        data = response.json()
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+                # Content-Length is only comparable when the body was not compressed in transit
+                expected = response.headers.get('Content-Length')
+                if expected and not response.headers.get('Content-Encoding') and written != int(expected):
+                    raise OSError(f"Incomplete download: received {written} of {expected} bytes")
+
+            _write_cache_meta(filename, {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'checked_at': time.time(),
+            })
 
         logger.info(f"Saved data to {filename}")
-        return True
+        return FetchResult.UPDATED
 
     except requests.RequestException as e:
         logger.error(f"Error fetching data from {url}: {e}")
-        return False
-    except (json.JSONDecodeError, OSError) as e:
+        return FetchResult.FAILED
+    except (ValueError, OSError) as e:
         logger.error(f"Error processing data from {url}: {e}")
-        return False
+        return FetchResult.FAILED
+
+
+def file_digest(path, algorithm='sha256', chunk_size=DIGEST_CHUNK_SIZE):
+    """
+    Hash a file using memory-mapped chunked reads.
+    :param path: Path of the file to hash.
+    :param algorithm: Name of the hashlib algorithm to use.
+    :param chunk_size: Number of bytes hashed per step.
+    :return: Hex digest of the file contents.
+    """
+    digest = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    for offset in range(0, size, chunk_size):
+                        digest.update(view[offset:offset + chunk_size])
+                finally:
+                    view.release()
+    return digest.hexdigest()
 
 
 def format_size(size, suffix="B"):
@@ -0,0 +1,138 @@
+"""
+Processed-torrent journal for Game Library Manager Scripts.
+
+A small SQLite database keyed by info-hash that remembers what happened to every torrent
+the torrent manager picked up, so later cycles can skip torrents that were already imported
+and stop retrying torrents that keep failing.
+"""
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.modules.helpers import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+# Torrent states recorded in the journal
+RESOLVED = 'resolved'
+MOVED = 'moved'
+DELETED = 'deleted'
+FAILED = 'failed'
+REJECTED = 'rejected'
+
+# States meaning the torrent's files are already in the game library
+IMPORTED_STATES = (MOVED, DELETED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS torrents (
+    hash TEXT PRIMARY KEY,
+    name TEXT,
+    state TEXT NOT NULL,
+    reason TEXT,
+    failures INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+class TorrentJournal(SQLiteStore):
+    """
+    Thread-safe journal of torrent import states.
+
+    Args:
+        path: Path of the SQLite database file (created if needed)
+        max_failures: Number of failed imports after which a torrent is no longer retried
+    """
+
+    def __init__(self, path: str, max_failures: int = 3):
+        super().__init__(path)
+        self.max_failures = max_failures
+        self._connection.execute(SCHEMA)
+
+    def record(self, torrent_hash: str, name: str, state: str, reason: Optional[str] = None):
+        """
+        Record the latest state of a torrent. Failures also increment its failure count.
+
+        Args:
+            torrent_hash: Info-hash of the torrent
+            name: Torrent name, for reference when inspecting the journal
+            state: One of RESOLVED, MOVED, DELETED, FAILED or REJECTED
+            reason: Why the torrent failed, if it did
+        """
+        failed = 1 if state == FAILED else 0
+        with self._lock:
+            self._connection.execute(
+                """
+                INSERT INTO torrents (hash, name, state, reason, failures, updated_at) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(hash) DO UPDATE SET
+                    name = excluded.name, state = excluded.state, reason = excluded.reason,
+                    failures = failures + excluded.failures, updated_at = excluded.updated_at
+                """,
+                (torrent_hash, name, state, reason, failed, time.time()),
+            )
+
+    def record_many(self, torrent_hashes: Iterable[str], state: str):
+        """
+        Update the state of several already journaled torrents at once.
+
+        Args:
+            torrent_hashes: Info-hashes of the torrents
+            state: The new state
+        """
+        with self._lock:
+            self._connection.executemany(
+                "UPDATE torrents SET state = ?, reason = NULL, updated_at = ? WHERE hash = ?",
+                [(state, time.time(), torrent_hash) for torrent_hash in torrent_hashes],
+            )
+
+    def states(self, torrent_hashes: Iterable[str]) -> Dict[str, Tuple[str, int, Optional[str]]]:
+        """
+        Look up the journal entries for a set of torrents.
+
+        Args:
+            torrent_hashes: Info-hashes to look up
+
+        Returns:
+            Dict: (state, failures, reason) by hash, for journaled torrents only
+        """
+        hashes = list(torrent_hashes)
+        rows = {}
+        with self._lock:
+            # Stay well below SQLite's bound parameter limit
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                cursor = self._connection.execute(
+                    f"SELECT hash, state, failures, reason FROM torrents WHERE hash IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+                for torrent_hash, state, failures, reason in cursor:
+                    rows[torrent_hash] = (state, failures, reason)
+        return rows
+
+    def pending(self, torrents: List) -> List:
+        """
+        Drop torrents that were already imported, failed validation or have failed too many times.
+
+        Args:
+            torrents: Candidate torrents (anything with a hash attribute)
+
+        Returns:
+            List: The torrents that still need importing, in their original order
+        """
+        states = self.states(torrent.hash for torrent in torrents)
+        pending = []
+        for torrent in torrents:
+            state, failures, reason = states.get(torrent.hash, (None, 0, None))
+            if state in IMPORTED_STATES:
+                logger.debug(f"Skipping already imported torrent {torrent.name}")
+            elif state == REJECTED:
+                logger.debug(f"Skipping rejected torrent {torrent.name}: {reason}")
+            elif self.max_failures > 0 and failures >= self.max_failures:
+                logger.debug(f"Skipping torrent {torrent.name} after {failures} failed imports: {reason}")
+            else:
+                pending.append(torrent)
+
+        skipped = len(torrents) - len(pending)
+        if skipped:
+            logger.info(f"Skipping {skipped} torrent(s) already imported, rejected or failing repeatedly (see journal)")
+        return pending
@@ -1,16 +1,29 @@
 # Game library cleanup module
+import fnmatch
+import hashlib
+import json
 import logging
 import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 # Load modules
 from src.modules.config_parse import (
-    GAME_PATH, REMOVE_EXTRAS, EXTRAS_PATTERNS,
-    REMOVE_EMPTY_DIRS, REMOVE_TEXT_FILES
+    GAME_PATH, REMOVE_EXTRAS, EXTRAS_PATTERNS, EXTRAS_EXTENSIONS, EXTRAS_GLOBS, EXTRAS_WHOLE_WORDS,
+    REMOVE_EMPTY_DIRS, REMOVE_TEXT_FILES, INCREMENTAL_CLEANUP, LIBRARY_INDEX_FILE,
+    SCAN_WORKERS, MANIFEST_ENABLED, MANIFEST_FULL_VERIFY_DAYS
 )
 from src.modules.helpers import format_size
+from src.modules.library_index import LibraryIndex
+from src.modules.manifest import Manifest
 
 logger = logging.getLogger(__name__)
 
+# Serialises cleanup passes from the scheduled cycle and the library watcher
+_cleanup_lock = threading.Lock()
+
 
 def run():
     """
@@ -19,75 +32,403 @@ def run():
     """
     logger.info("Post-library cleanup...")
 
+    with _cleanup_lock:
+        index = open_index()
+        manifest = open_manifest()
+        try:
+            folders = list(library_folders())
+
+            # Check every game folder against its manifest before the cleanup changes anything
+            if manifest is not None:
+                manifest.retain({folder.name for folder in folders})
+                verify_folders(manifest, folders, manifest.full_verify_due(MANIFEST_FULL_VERIFY_DAYS))
+
+            # Only descend into folders that changed since the last pass
+            if index is not None:
+                present = {folder.name for folder in folders}
+                index.remove([name for name in index.names() if name not in present])
+                changed = [folder for folder, is_changed in zip(folders, map_folders(index.changed, folders))
+                           if is_changed]
+                logger.info(f"{len(changed)} of {len(folders)} game folders changed since the last cleanup")
+                folders = changed
+
+            clean(folders, index, manifest)
+        finally:
+            if index is not None:
+                index.close()
+            if manifest is not None:
+                manifest.close()
+
+
+def run_folders(names: Iterable[str]) -> List[str]:
+    """
+    Perform the cleanup tasks on specific game folders only, e.g. the ones a watcher saw change.
+    :param names: Names of the game folders in the library root path.
+    :return: Paths of the files and directories removed by the cleanup.
+    """
+    names = set(names)
+    with _cleanup_lock:
+        index = open_index()
+        manifest = open_manifest()
+        try:
+            folders = [folder for folder in library_folders() if folder.name in names]
+            logger.info(f"Cleaning up {len(folders)} changed game folder(s)...")
+            if index is not None:
+                index.remove(names - {folder.name for folder in folders})
+            if manifest is not None:
+                for name in names - {folder.name for folder in folders}:
+                    manifest.remove(name)
+                verify_folders(manifest, folders)
+            return clean(folders, index, manifest)
+        finally:
+            if index is not None:
+                index.close()
+            if manifest is not None:
+                manifest.close()
+
+
+def open_index() -> Optional[LibraryIndex]:
+    """
+    Open the library index used to skip unchanged game folders.
+    The index is tied to the cleanup rules, so changing them cleans up every folder again.
+    :return: The index, or None if incremental cleanup is disabled or no cleanup task is enabled.
+    """
+    if not INCREMENTAL_CLEANUP or not (REMOVE_EXTRAS or REMOVE_EMPTY_DIRS):
+        return None
+    return LibraryIndex(LIBRARY_INDEX_FILE, rules_fingerprint())
+
+
+def open_manifest() -> Optional[Manifest]:
+    """
+    Open the checksum manifests of the game folders.
+    :return: The manifests, or None if they are disabled.
+    """
+    return Manifest() if MANIFEST_ENABLED else None
+
+
+def verify_folders(manifest: Manifest, folders: List[os.DirEntry], full: Set[str] = frozenset()):
+    """
+    Check game folders against their manifests, storing the results for the RomM fragment check.
+    Folders without a manifest are skipped, clean() creates it.
+    :param manifest: The checksum manifests.
+    :param folders: The game folders to check.
+    :param full: Names of the folders whose files are all re-hashed, not only the modified ones.
+    """
+    manifested = manifest.folders()
+    folders = [folder for folder in folders if folder.name in manifested]
+    due = full & {folder.name for folder in folders}
+    if due:
+        logger.info(f"Fully verifying {len(due)} game folder(s)...")
+
+    # Several folders are checked at a time, like the other scans; each hashes its files in parallel
+    results = map_folders(lambda folder: manifest.verify(folder.path, full=folder.name in due), folders)
+    damaged = 0
+    for folder, result in zip(folders, results):
+        if not result.ok:
+            damaged += 1
+            logger.warning(f"Damaged game folder: {folder.name} | {len(result.missing)} missing, "
+                           f"{len(result.corrupted)} corrupted of {result.files} files")
+    if damaged:
+        logger.warning(f"{damaged} of {len(folders)} verified game folders are damaged")
+
+
+def rules_fingerprint() -> str:
+    """
+    Fingerprint the cleanup rules a game folder is cleaned up with.
+    :return: A hex digest of the cleanup settings.
+    """
+    rules = {
+        'remove_extras': REMOVE_EXTRAS,
+        'extras_patterns': EXTRAS_PATTERNS,
+        'extras_extensions': EXTRAS_EXTENSIONS,
+        'extras_globs': EXTRAS_GLOBS,
+        'extras_whole_words': EXTRAS_WHOLE_WORDS,
+        'remove_text_files': REMOVE_TEXT_FILES,
+        'remove_empty_dirs': REMOVE_EMPTY_DIRS,
+    }
+    return hashlib.sha256(json.dumps(rules, sort_keys=True).encode()).hexdigest()
+
+
+def clean(folders: List[os.DirEntry], index: Optional[LibraryIndex],
+          manifest: Optional[Manifest] = None) -> List[str]:
+    """
+    Run the configured cleanup tasks on a set of game folders.
+    :param folders: The game folders to clean up.
+    :param index: The library index to update afterwards, if incremental cleanup is enabled.
+    :param manifest: The checksum manifests to update afterwards, if they are enabled. Folders must be verified
+        before, the files removed here are dropped from their manifest.
+    :return: Paths of the files and directories removed by the cleanup.
+    """
+    removed = []
+
     # Remove unnecessary files based on configuration
     if REMOVE_EXTRAS:
-        remove_extras()
+        removed.extend(remove_extras(folders))
     else:
         logger.info("Skipping extras removal.")
 
     if REMOVE_EMPTY_DIRS:
-        remove_empty()
+        removed.extend(remove_empty(folders))
     else:
         logger.info("Skipping empty directory removal.")
 
+    # Record the cleaned up state, so unchanged folders are skipped next time
+    if index is not None:
+        map_folders(lambda folder: index.update(folder.path), folders)
+
+    if manifest is not None:
+        update_manifests(manifest, folders, removed)
+
+    return removed
+
+
+def update_manifests(manifest: Manifest, folders: List[os.DirEntry], removed: List[str]):
+    """
+    Drop the files removed by the cleanup from the manifests, and create the manifest of folders that have none.
+    Existing manifests are never rebuilt here: they are the baseline written when the game was imported.
+    :param manifest: The checksum manifests.
+    :param folders: The cleaned up game folders.
+    :param removed: Paths removed by the cleanup.
+    """
+    paths = {folder.path: folder.name for folder in folders}
+    discarded: Dict[str, List[str]] = {}
+    for path in removed:
+        if path in paths:  # The whole game folder was removed
+            manifest.remove(paths[path])
+            continue
+        for folder_path, name in paths.items():
+            if path.startswith(folder_path + os.sep):
+                discarded.setdefault(name, []).append(os.path.relpath(path, folder_path))
+                break
+    for name, relpaths in discarded.items():
+        manifest.discard(name, relpaths)
+
+    # Folders are hashed one at a time, the files of each folder in parallel
+    manifested = manifest.folders()
+    created = [folder for folder in folders if folder.name not in manifested and os.path.isdir(folder.path)]
+    hashed = sum(manifest.create(folder.path) for folder in created)
+    if created:
+        logger.info(f"Created {len(created)} checksum manifest(s): {hashed} files hashed")
+
+
+def library_folders(path: str = GAME_PATH) -> Iterator[os.DirEntry]:
+    """
+    Yield the game folders in the library root path.
+    Hidden folders are imports being staged or old versions being deleted in the background, and are skipped.
+    :param path: The library root path.
+    :return: A DirEntry per game folder.
+    """
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if not entry.name.startswith('.') and entry.is_dir():
+                yield entry
+
+
+def walk_files(path: str) -> Iterator[os.DirEntry]:
+    """
+    Yield every file below a directory, at any depth, in a single pass.
+    Symlinked directories are not followed.
+    :param path: The directory to walk.
+    :return: A DirEntry per file.
+    """
+    stack = [path]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    else:
+                        yield entry
+        except OSError as e:
+            logger.error(f'Error listing {directory}: {e}')
+
+
+def compile_extras_matcher(patterns: List[str], extensions: List[str], globs: List[str],
+                           whole_words: bool = False) -> Optional[Callable[[str], Optional[re.Match]]]:
+    """
+    Compile the extras rules into one case-insensitive regular expression, so each file name is
+    matched once no matter how many patterns are configured.
+    A file matches if its name contains one of the patterns and ends with one of the extensions,
+    or if it matches one of the globs.
+    With whole_words, a pattern (or its plural) must not be touching other letters, so ost matches
+    game_ost.zip and OST2.zip but not host_data.zip or lost_levels.zip.
+    :param patterns: Words identifying extras, e.g. soundtrack.
+    :param extensions: Extensions the patterns apply to, e.g. .zip.
+    :param globs: Shell-style patterns that always match, e.g. *.nfo.
+    :param whole_words: Only match patterns as whole words.
+    :return: A function matching a file name, or None if there are no rules.
+    """
+    rules = []
+    if patterns and extensions:
+        words = '|'.join(map(re.escape, patterns))
+        if whole_words:
+            words = f"(?<![a-z])(?:{words})s?(?![a-z])"
+        rules.append(f"(?=.*(?:{words})).*(?:{'|'.join(map(re.escape, extensions))})")
+    rules.extend(fnmatch.translate(glob) for glob in globs)
+    if not rules:
+        return None
+    return re.compile('|'.join(f'(?:{rule})' for rule in rules), re.IGNORECASE | re.DOTALL).fullmatch
+
+
+def entry_size(entry: os.DirEntry) -> int:
+    """
+    Get the size of a directory entry, reusing the stat data cached on the entry.
+    :param entry: The directory entry.
+    :return: The size in bytes, 0 for anything that is not a regular file.
+    """
+    try:
+        return entry.stat().st_size if entry.is_file() else 0
+    except OSError:
+        return 0
+
+
+def remove_entry(entry: os.DirEntry) -> Optional[int]:
+    """
+    Remove a file.
+    :param entry: The directory entry of the file to remove.
+    :return: The size of the removed file, or None if it could not be removed.
+    """
+    size = entry_size(entry)
+    try:
+        os.remove(entry.path)
+        return size
+    except Exception as e:
+        logger.error(f'Error removing file {entry.path}: {e}')
+        return None
+
+
+def map_folders(function: Callable, folders: Iterable[os.DirEntry]) -> list:
+    """
+    Run a function on every game folder, one folder per task on a bounded thread pool.
+    On network mounts this overlaps the round trips of several folders instead of waiting on each in turn.
+    :param function: The function to run, taking a game folder.
+    :param folders: The game folders.
+    :return: The results, in the order of the folders.
+    """
+    folders = list(folders)
+    workers = max(1, min(SCAN_WORKERS, len(folders)))
+    if workers == 1:
+        return [function(folder) for folder in folders]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scan') as executor:
+        return list(executor.map(function, folders))
+
 
-def remove_extras():
+def clean_folder(folder: os.DirEntry, is_extra: Optional[Callable], debug: bool) -> List[Tuple[str, str, int]]:
+    """
+    Delete the extras and text files in a single game folder, at any depth.
+    :param folder: The game folder.
+    :param is_extra: Matcher from compile_extras_matcher(), or None to only remove text files.
+    :param debug: Whether to log skipped files.
+    :return: (kind, path, size) for every removed file.
+    """
+    removed = []
+    for entry in walk_files(folder.path):
+        file = entry.name
+
+        # Text file cleanup (if enabled in config)
+        if REMOVE_TEXT_FILES and file.endswith('gog-games.to.txt'):
+            kind = 'txt'
+        # Extras cleanup
+        elif is_extra is not None and is_extra(file):
+            kind = 'extras'
+        else:
+            if debug:
+                logger.debug(f'Skipped file: {trim_path(entry.path)} | Size: {format_size(entry_size(entry))}')
+            continue
+
+        size = remove_entry(entry)
+        if size is not None:
+            removed.append((kind, entry.path, size))
+    return removed
+
+
+def remove_extras(folders: Optional[Iterable[os.DirEntry]] = None) -> List[str]:
     """
     Delete the .zip files that are not needed such as,
     _soundtrack_, OST, FLAC, WAV, MP3, etc.
-    :return:
+    Game folders are searched at any depth, several folders at a time.
+    :param folders: The game folders to clean up, all of them if None.
+    :return: Paths of the removed files.
     """
     logger.info("Removing unnecessary files...")
 
-    # Use patterns from configuration
-    zip_strings = EXTRAS_PATTERNS
-
-    for folder in os.listdir(GAME_PATH):
-        folder_path = os.path.join(GAME_PATH, folder)
-        if os.path.isdir(folder_path):
-            for file in os.listdir(folder_path):
-                file_path = os.path.join(folder_path, file)
-
-                # calculate filesize
-                size = os.path.getsize(file_path) if os.path.isfile(file_path) else 0
-
-                # Text file cleanup (if enabled in config)
-                if REMOVE_TEXT_FILES and file.endswith('gog-games.to.txt'):
-                    try:
-                        os.remove(file_path)
-                        logger.info(f'Removed txt: {trim_path(file_path)} | Size: {format_size(size)}')
-                    except Exception as e:
-                        logger.error(f'Error removing file {file_path}: {e}')
-
-                # Zip file cleanup
-                if any(zip_string.lower() in file.lower() for zip_string in zip_strings) and file.endswith('.zip'):
-                    try:
-                        os.remove(file_path)
-                        # log which file was removed and the size of the file
-                        logger.info(f'Removed extras: {trim_path(file_path)} | Size: {format_size(size)}')
-                    except Exception as e:
-                        logger.error(f'Error removing file {file_path}: {e}')
-                else:
-                    logger.debug(f'Skipped file: {trim_path(file_path)} | Size: {format_size(size)}')
-
-
-def remove_empty():
-    """
-    Remove empty directories in the game library root path.
-    :return:
+    # Use rules from configuration
+    is_extra = compile_extras_matcher(EXTRAS_PATTERNS, EXTRAS_EXTENSIONS, EXTRAS_GLOBS, EXTRAS_WHOLE_WORDS)
+    # Only stat and format skipped files when they will actually be logged
+    debug = logger.isEnabledFor(logging.DEBUG)
+
+    results = map_folders(lambda folder: clean_folder(folder, is_extra, debug),
+                          library_folders() if folders is None else folders)
+
+    # Log in library order, whichever folder finished first
+    total = 0
+    paths = []
+    for removed in results:
+        for kind, path, size in removed:
+            logger.info(f'Removed {kind}: {trim_path(path)} | Size: {format_size(size)}')
+            total += size
+            paths.append(path)
+    if paths:
+        logger.info(f'Removed {len(paths)} files, {format_size(total)} freed')
+    return paths
+
+
+def prune_empty(path: str) -> Tuple[bool, List[str]]:
+    """
+    Remove every empty directory below and including path in one post-order walk.
+    Each directory is listed once; a directory whose subdirectories were all removed counts as empty
+    without listing it again, so whole empty subtrees disappear in a single pass.
+    :param path: The directory to prune.
+    :return: (whether path itself was removed, paths of all removed directories in removal order).
+    """
+    removed = []
+    remaining = 0
+    try:
+        with os.scandir(path) as entries:
+            children = list(entries)
+    except OSError as e:
+        logger.error(f'Error listing {path}: {e}')
+        return False, removed
+
+    for entry in children:
+        if entry.is_dir(follow_symlinks=False):
+            child_removed, child_paths = prune_empty(entry.path)
+            removed.extend(child_paths)
+            if child_removed:
+                continue
+        remaining += 1
+
+    if remaining:
+        return False, removed
+    try:
+        os.rmdir(path)
+    except OSError as e:
+        logger.error(f'Error removing empty directory {path}: {e}')
+        return False, removed
+    removed.append(path)
+    return True, removed
+
+
+def remove_empty(folders: Optional[Iterable[os.DirEntry]] = None) -> List[str]:
+    """
+    Remove empty directories in the game library root path, including nested ones and
+    game folders that only contain empty directories.
+    :param folders: The game folders to check, all of them if None.
+    :return: Paths of the removed directories.
     """
     logger.info("Removing empty directories...")
 
-    for folder in os.listdir(GAME_PATH):
-        folder_path = os.path.join(GAME_PATH, folder)
-        if os.path.isdir(folder_path):
-            # Check if the directory is empty
-            if not os.listdir(folder_path):
-                try:
-                    os.rmdir(folder_path)
-                    logger.info(f'Removed empty directory: {folder_path}')
-                except OSError as e:
-                    logger.error(f'Error removing empty directory {folder_path}: {e}')
+    results = map_folders(lambda folder: prune_empty(folder.path)[1],
+                          library_folders() if folders is None else folders)
+    paths = []
+    for removed in results:
+        for path in removed:
+            logger.info(f'Removed empty directory: {path}')
+            paths.append(path)
+    return paths
+
 
 def trim_path(path):
     """
@@ -0,0 +1,203 @@
+"""
+Incremental library index for Game Library Manager Scripts.
+
+A small SQLite database remembering the state of every game folder in the library (inode and
+directory mtimes of the folder and of each directory inside it) as of its last cleanup pass, so
+later passes only descend into folders that changed since. Imports replace a game folder with a
+rename, giving it a new inode, so freshly imported games are always picked up.
+
+The index is tied to a fingerprint of the cleanup rules: when the rules change, every folder is
+cleaned up again. Delete the index file to force a full scan.
+"""
+import logging
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.modules.helpers import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever the tables below change; an index with another version is rebuilt
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS index_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS folders (
+    name TEXT PRIMARY KEY,
+    inode INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    scanned_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS directories (
+    folder TEXT NOT NULL,
+    path TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    PRIMARY KEY (folder, path)
+);
+"""
+
+
+class LibraryIndex(SQLiteStore):
+    """
+    Thread-safe index of game folder states.
+
+    Args:
+        path: Path of the SQLite database file (created if needed)
+        rules: Fingerprint of the cleanup rules the indexed folders were cleaned up with
+    """
+
+    def __init__(self, path: str, rules: str = ''):
+        super().__init__(path)
+        self._prepare(rules)
+        self._folders = self._load()
+
+    def _meta(self, key: str) -> Optional[str]:
+        try:
+            row = self._connection.execute("SELECT value FROM index_meta WHERE key = ?", (key,)).fetchone()
+        except sqlite3.OperationalError:  # No meta table yet
+            return None
+        return row[0] if row else None
+
+    def _prepare(self, rules: str):
+        """Create the tables, dropping an index built by another schema version or with other cleanup rules."""
+        with self._lock:
+            version = self._meta('schema_version')
+            if version != str(SCHEMA_VERSION):
+                if version is not None or self._connection.execute(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'folders'").fetchone():
+                    logger.info("Library index was written by another version, rebuilding it")
+                self._connection.executescript("DROP TABLE IF EXISTS folders; DROP TABLE IF EXISTS directories;")
+            self._connection.executescript(SCHEMA)
+
+            if version == str(SCHEMA_VERSION) and self._meta('rules') != rules:
+                logger.info("Cleanup rules changed, every game folder will be cleaned up again")
+                self._connection.executescript("DELETE FROM folders; DELETE FROM directories;")
+
+            self._connection.executemany("INSERT OR REPLACE INTO index_meta (key, value) VALUES (?, ?)",
+                                         [('schema_version', str(SCHEMA_VERSION)), ('rules', rules)])
+
+    def _load(self) -> Dict[str, Tuple[int, int, Dict[str, int]]]:
+        with self._lock:
+            folders = {name: (inode, mtime_ns, {}) for name, inode, mtime_ns in
+                       self._connection.execute("SELECT name, inode, mtime_ns FROM folders")}
+            for folder, path, mtime_ns in self._connection.execute("SELECT folder, path, mtime_ns FROM directories"):
+                if folder in folders:
+                    folders[folder][2][path] = mtime_ns
+            return folders
+
+    def changed(self, folder: os.DirEntry) -> bool:
+        """
+        Check whether a game folder changed since it was last indexed.
+
+        Costs a stat of the folder and of each directory inside it, their contents are not listed.
+        Adding, removing or renaming an entry updates the mtime of the directory holding it.
+
+        Args:
+            folder: The game folder
+
+        Returns:
+            bool: True if the folder is new, was replaced, or a directory mtime inside it changed
+        """
+        try:
+            stat = folder.stat()
+        except OSError:
+            return True
+        known = self._folders.get(folder.name)
+        if known is None or known[0] != stat.st_ino or known[1] != stat.st_mtime_ns:
+            return True
+
+        for path, mtime_ns in known[2].items():
+            try:
+                if os.stat(os.path.join(folder.path, path), follow_symlinks=False).st_mtime_ns != mtime_ns:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def update(self, path: str) -> bool:
+        """
+        Re-index a game folder after it was cleaned up.
+
+        Args:
+            path: Path of the game folder
+
+        Returns:
+            bool: True if the folder was indexed, False if it no longer exists
+        """
+        name = os.path.basename(path)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self.remove([name])
+            return False
+        directories = subdirectory_mtimes(path)
+
+        with self._lock:
+            self._connection.execute("BEGIN")
+            self._connection.execute(
+                "INSERT OR REPLACE INTO folders (name, inode, mtime_ns, scanned_at) VALUES (?, ?, ?, ?)",
+                (name, stat.st_ino, stat.st_mtime_ns, time.time()),
+            )
+            self._connection.execute("DELETE FROM directories WHERE folder = ?", (name,))
+            self._connection.executemany("INSERT INTO directories (folder, path, mtime_ns) VALUES (?, ?, ?)",
+                                         [(name, relative, mtime_ns) for relative, mtime_ns in directories.items()])
+            self._connection.execute("COMMIT")
+            self._folders[name] = (stat.st_ino, stat.st_mtime_ns, directories)
+        return True
+
+    def remove(self, names: Iterable[str]):
+        """
+        Forget game folders that no longer exist.
+
+        Args:
+            names: Names of the game folders
+        """
+        names = [name for name in names if name in self._folders]
+        with self._lock:
+            self._connection.execute("BEGIN")
+            self._connection.executemany("DELETE FROM folders WHERE name = ?", [(name,) for name in names])
+            self._connection.executemany("DELETE FROM directories WHERE folder = ?", [(name,) for name in names])
+            self._connection.execute("COMMIT")
+            for name in names:
+                del self._folders[name]
+
+    def names(self) -> List[str]:
+        """
+        Returns:
+            List: Names of all indexed game folders
+        """
+        return list(self._folders)
+
+
+def subdirectory_mtimes(path: str) -> Dict[str, int]:
+    """
+    List the directories below a game folder with their mtimes. Symlinked directories are not followed.
+
+    Args:
+        path: The game folder
+
+    Returns:
+        Dict: mtime_ns by directory path relative to the game folder
+    """
+    directories = {}
+    stack = [path]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                        try:
+                            directories[os.path.relpath(entry.path, path)] = \
+                                entry.stat(follow_symlinks=False).st_mtime_ns
+                        except OSError:
+                            pass
+        except OSError as e:
+            logger.error(f"Error listing {directory}: {e}")
+    return directories
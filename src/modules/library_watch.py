@@ -0,0 +1,270 @@
+"""
+Library watcher for Game Library Manager Scripts.
+
+Watches the game library with Linux inotify (through ctypes, no extra dependency) and cleans up
+only the game folders that changed, a few seconds after they stop changing, instead of waiting
+for the next scheduled cycle. The library root and every game folder are watched; the thread
+sleeps in the kernel while nothing happens.
+"""
+import ctypes
+import errno
+import logging
+import os
+import select
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.modules import library_cleanup
+from src.modules.config_parse import GAME_PATH, LIBRARY_WATCH_DEBOUNCE
+
+logger = logging.getLogger(__name__)
+
+# inotify flags, see inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# Events on the library root and on game folders that mean a folder needs cleaning up
+ROOT_EVENTS = IN_CREATE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE | IN_ONLYDIR
+FOLDER_EVENTS = IN_CREATE | IN_MOVED_TO | IN_CLOSE_WRITE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+
+# struct inotify_event header: wd, mask, cookie, len
+EVENT_HEADER = struct.Struct('iIII')
+# Bytes read per read() call, enough for many events
+READ_SIZE = 64 * 1024
+# Longest time a busy folder waits for cleanup, even if it keeps changing
+MAX_DELAY_SECONDS = 300
+# How often an idle watcher wakes up to check whether it was stopped
+IDLE_TIMEOUT_SECONDS = 5
+
+try:
+    _libc = ctypes.CDLL(None, use_errno=True)
+    _inotify_init1 = _libc.inotify_init1
+    _inotify_add_watch = _libc.inotify_add_watch
+    _inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    _inotify_rm_watch = _libc.inotify_rm_watch
+    _inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+except (OSError, AttributeError, TypeError):  # Not Linux
+    _libc = None
+
+
+class LibraryWatcher:
+    """
+    Watch the game library and clean up changed game folders once they settle.
+
+    Args:
+        path: The library root path
+        debounce: Seconds without events before a changed folder is cleaned up
+    """
+
+    def __init__(self, path: str = GAME_PATH, debounce: float = LIBRARY_WATCH_DEBOUNCE):
+        self.path = path
+        self.debounce = debounce
+        self._fd: Optional[int] = None
+        self._watches: Dict[int, Optional[str]] = {}  # wd -> game folder name, None for the root
+        self._inodes: Dict[int, int] = {}  # wd -> inode of the watched game folder
+        self._pending: Dict[str, float] = {}  # game folder name -> time of the first unhandled event
+        self._expected: Set[Tuple[int, str, int]] = set()  # (wd, name, mask) of deletions made by the cleanup
+        self._last_event = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> bool:
+        """
+        Start watching in a background thread.
+
+        Returns:
+            bool: True if the watcher started, False if inotify is not available
+        """
+        if _libc is None:
+            logger.warning("Library watcher requires Linux inotify, falling back to scheduled cleanup only")
+            return False
+
+        fd = _inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            logger.error(f"Unable to start library watcher: {os.strerror(ctypes.get_errno())}")
+            return False
+        self._fd = fd
+
+        if self._add_watch(self.path, None, ROOT_EVENTS) is None:
+            os.close(fd)
+            self._fd = None
+            return False
+        for folder in library_cleanup.library_folders(self.path):
+            if self._add_watch(folder.path, folder.name, FOLDER_EVENTS) is None:
+                break
+
+        logger.info(f"Watching {self.path} ({len(self._watches) - 1} game folders) for changes")
+        self._thread = threading.Thread(target=self._run, name='library-watch', daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """Stop watching and wait for the background thread to exit."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _add_watch(self, path: str, name: Optional[str], mask: int) -> Optional[int]:
+        wd = _inotify_add_watch(self._fd, os.fsencode(path), mask)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error == errno.ENOSPC:
+                logger.warning("Out of inotify watches (raise fs.inotify.max_user_watches), "
+                               "changes inside some game folders will wait for the next cycle")
+            elif error != errno.ENOENT:
+                logger.error(f"Unable to watch {path}: {os.strerror(error)}")
+            return None
+        # Watching a folder that is already watched (e.g. renamed) returns its existing wd
+        self._watches[wd] = name
+        try:
+            self._inodes[wd] = os.stat(path).st_ino
+        except OSError:
+            pass
+        return wd
+
+    def _remove_watch(self, wd: int):
+        self._watches.pop(wd, None)
+        self._inodes.pop(wd, None)
+        # Fails harmlessly if the kernel already dropped the watch
+        _inotify_rm_watch(self._fd, wd)
+
+    def _watching(self, wd: int, name: str) -> bool:
+        """Check whether a watch still watches the game folder currently at name."""
+        try:
+            return os.stat(os.path.join(self.path, name)).st_ino == self._inodes.get(wd)
+        except OSError:
+            return False
+
+    def _queue(self, name: str):
+        # Hidden folders are imports being staged or old versions being deleted
+        if name and not name.startswith('.'):
+            now = time.monotonic()
+            self._pending.setdefault(name, now)
+            self._last_event = now
+
+    def _handle(self, data: bytes):
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode(errors='surrogateescape')
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                logger.warning("Library watcher missed events, the next scheduled cleanup will catch up")
+                continue
+            if mask & IN_IGNORED:
+                # The watch is gone (folder deleted or watch removed)
+                self._watches.pop(wd, None)
+                self._inodes.pop(wd, None)
+                continue
+            if wd not in self._watches:
+                continue
+            deleted = mask & (IN_DELETE | IN_DELETE_SELF)
+            if deleted and (wd, name, deleted) in self._expected:
+                self._expected.discard((wd, name, deleted))
+                continue
+
+            folder = self._watches[wd]
+            if folder is not None and mask & IN_MOVE_SELF:
+                # The game folder was renamed. A rename inside the library was already reported by the root
+                # watch, which re-pointed the watch to the new name. Otherwise the folder was moved away, e.g.
+                # swapped out by an import, and the watch would follow it, so it is dropped.
+                if not self._watching(wd, folder):
+                    self._remove_watch(wd)
+            elif folder is None:
+                # An event in the library root: a game folder was added, replaced or removed
+                self._queue(name)
+                if mask & (IN_CREATE | IN_MOVED_TO) and mask & IN_ISDIR and not name.startswith('.'):
+                    self._add_watch(os.path.join(self.path, name), name, FOLDER_EVENTS)
+            else:
+                self._queue(folder)
+
+    def _due(self) -> Set[str]:
+        """Pop the folders that stopped changing, or waited too long."""
+        now = time.monotonic()
+        if now - self._last_event >= self.debounce:
+            due = set(self._pending)
+        else:
+            due = {name for name, first in self._pending.items() if now - first >= MAX_DELAY_SECONDS}
+        for name in due:
+            del self._pending[name]
+        return due
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Block in the kernel until something happens, or until pending folders settle
+            if self._pending:
+                timeout = max(0.0, self._last_event + self.debounce - time.monotonic())
+            else:
+                timeout = IDLE_TIMEOUT_SECONDS
+            try:
+                readable, _, _ = select.select([self._fd], [], [], timeout)
+                if readable:
+                    self._handle(os.read(self._fd, READ_SIZE))
+            except BlockingIOError:
+                pass
+            except OSError as e:
+                logger.error(f"Library watcher error: {e}")
+                self._stop.wait(self.debounce)
+                continue
+
+            due = self._due()
+            if due:
+                removed = []
+                try:
+                    removed = library_cleanup.run_folders(due)
+                except Exception as e:
+                    logger.error(f"Unexpected error cleaning up {len(due)} changed game folder(s): {e}")
+                self._discard_own_events(removed)
+
+    def _expected_events(self, removed: List[str]) -> Set[Tuple[int, str, int]]:
+        """
+        The deletion events the watches report for paths removed by the cleanup. Only the library root and
+        game folders are watched, so only removed game folders and their direct children produce events.
+        """
+        watches = {name: wd for wd, name in self._watches.items()}
+        root = os.path.normpath(self.path)
+        expected = set()
+        for path in removed:
+            parent, name = os.path.split(os.path.normpath(path))
+            if parent == root:
+                expected.add((watches[None], name, IN_DELETE))
+                if name in watches:
+                    expected.add((watches[name], '', IN_DELETE_SELF))
+            elif os.path.dirname(parent) == root and os.path.basename(parent) in watches:
+                expected.add((watches[os.path.basename(parent)], name, IN_DELETE))
+        return expected
+
+    def _discard_own_events(self, removed: List[str]):
+        """
+        Handle the events queued while the cleanup ran, skipping the deletions made by the cleanup itself,
+        so cleaned folders are not cleaned again while changes made meanwhile are still picked up.
+        The kernel queues events as the changes happen, so the cleanup's own events are all queued by now.
+        """
+        self._expected = self._expected_events(removed)
+        try:
+            while True:
+                self._handle(os.read(self._fd, READ_SIZE))
+        except BlockingIOError:
+            pass
+        except OSError as e:
+            logger.error(f"Library watcher error: {e}")
+        finally:
+            self._expected = set()
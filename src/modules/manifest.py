@@ -0,0 +1,275 @@
+"""
+Checksum manifests for Game Library Manager Scripts.
+
+Records a SHA-256 digest of every file in a game folder, in the same SQLite database as the
+library index, so the integrity of imported games can be checked later:
+- create() writes the baseline of a folder: when a game is imported or replaced, or when a folder
+  has no manifest yet. Routine cleanup never rewrites it; discard() only forgets the files the
+  cleanup deliberately removed
+- verify() reports files that went missing, and re-hashes only files whose size or mtime changed
+  (or every file, with full=True) to detect changed contents. The outcome is stored, so later
+  checks (the RomM fragment check) read it without touching the files again
+
+Files are hashed on a thread pool with memory-mapped chunked reads; hashlib releases the GIL
+while hashing, so several files are hashed in parallel.
+"""
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Set, Tuple
+
+from src.modules.config_parse import LIBRARY_INDEX_FILE, MANIFEST_WORKERS
+from src.modules.helpers import SQLiteStore, file_digest, format_size
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS manifest (
+    folder TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (folder, path)
+);
+CREATE TABLE IF NOT EXISTS manifest_folders (
+    folder TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    verified_at REAL,
+    full_verified_at REAL,
+    files INTEGER NOT NULL DEFAULT 0,
+    hashed INTEGER NOT NULL DEFAULT 0,
+    missing TEXT NOT NULL DEFAULT '[]',
+    corrupted TEXT NOT NULL DEFAULT '[]'
+);
+"""
+
+
+class VerifyResult(NamedTuple):
+    """Outcome of verifying a game folder against its manifest."""
+    files: int
+    hashed: int
+    missing: List[str]
+    corrupted: List[str]
+
+    @property
+    def ok(self) -> bool:
+        return not self.missing and not self.corrupted
+
+
+class Manifest(SQLiteStore):
+    """
+    Thread-safe store of per-file checksums for game folders.
+
+    Args:
+        path: Path of the SQLite database file, shared with the library index
+        workers: Number of files hashed in parallel
+    """
+
+    def __init__(self, path: str = LIBRARY_INDEX_FILE, workers: int = MANIFEST_WORKERS):
+        super().__init__(path)
+        self.workers = max(1, workers)
+        self._connection.executescript(SCHEMA)
+        # Manifests written before folders were tracked count as baselines created now
+        self._connection.execute("INSERT OR IGNORE INTO manifest_folders (folder, created_at, full_verified_at) "
+                                 "SELECT DISTINCT folder, ?, ? FROM manifest", (time.time(), time.time()))
+
+    def folders(self) -> Set[str]:
+        """
+        Returns:
+            Set: Names of the game folders that have a manifest
+        """
+        with self._lock:
+            return {row[0] for row in self._connection.execute("SELECT folder FROM manifest_folders")}
+
+    def _entries(self, folder: str) -> Dict[str, Tuple[int, int, str]]:
+        with self._lock:
+            cursor = self._connection.execute("SELECT path, size, mtime_ns, digest FROM manifest WHERE folder = ?",
+                                              (folder,))
+            return {path: (size, mtime_ns, digest) for path, size, mtime_ns, digest in cursor}
+
+    def _hash(self, folder_path: str, paths: List[str]) -> Dict[str, str]:
+        """Hash files of a folder in parallel. Files that cannot be read are left out."""
+        def digest(path: str):
+            try:
+                return file_digest(os.path.join(folder_path, path))
+            except OSError as e:
+                logger.error(f"Error hashing {os.path.join(folder_path, path)}: {e}")
+                return None
+
+        if len(paths) <= 1 or self.workers == 1:
+            digests = map(digest, paths)
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(paths)), thread_name_prefix='manifest') as pool:
+                digests = list(pool.map(digest, paths))
+        return {path: value for path, value in zip(paths, digests) if value is not None}
+
+    def create(self, folder_path: str) -> int:
+        """
+        Write the baseline manifest of a game folder, replacing any previous one.
+
+        Only call this when the folder contents are known to be good: right after a game was imported
+        or replaced, or for a folder that has no manifest yet.
+
+        Args:
+            folder_path: Path of the game folder
+
+        Returns:
+            int: Number of files hashed
+        """
+        folder = os.path.basename(folder_path)
+        if not os.path.isdir(folder_path):
+            self.remove(folder)
+            return 0
+        current = scan(folder_path)
+        digests = self._hash(folder_path, list(current))
+        now = time.time()
+
+        with self._lock:
+            self._connection.execute("BEGIN")
+            self._connection.execute("DELETE FROM manifest WHERE folder = ?", (folder,))
+            self._connection.executemany(
+                "INSERT INTO manifest (folder, path, size, mtime_ns, digest) VALUES (?, ?, ?, ?, ?)",
+                [(folder, path, *current[path], digest) for path, digest in digests.items()],
+            )
+            self._connection.execute(
+                "INSERT OR REPLACE INTO manifest_folders (folder, created_at, verified_at, full_verified_at, files) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (folder, now, now, now, len(digests)),
+            )
+            self._connection.execute("COMMIT")
+
+        logger.info(f"Created checksum manifest of {folder}: {len(digests)} files "
+                    f"({format_size(sum(current[path][0] for path in digests))})")
+        return len(digests)
+
+    def discard(self, folder: str, paths: Iterable[str]):
+        """
+        Forget files that were deliberately removed from a game folder, e.g. extras removed by the cleanup.
+
+        Args:
+            folder: Name of the game folder
+            paths: Paths of the removed files, relative to the game folder
+        """
+        with self._lock:
+            self._connection.executemany("DELETE FROM manifest WHERE folder = ? AND path = ?",
+                                         [(folder, path) for path in paths])
+
+    def remove(self, folder: str):
+        """
+        Forget the manifest of a game folder.
+
+        Args:
+            folder: Name of the game folder
+        """
+        with self._lock:
+            self._connection.execute("BEGIN")
+            self._connection.execute("DELETE FROM manifest WHERE folder = ?", (folder,))
+            self._connection.execute("DELETE FROM manifest_folders WHERE folder = ?", (folder,))
+            self._connection.execute("COMMIT")
+
+    def retain(self, folders: Set[str]):
+        """
+        Forget the manifests of game folders that are no longer in the library.
+
+        Args:
+            folders: Names of the game folders that still exist
+        """
+        for folder in self.folders() - folders:
+            self.remove(folder)
+
+    def verify(self, folder_path: str, full: bool = False) -> VerifyResult:
+        """
+        Check a game folder against its manifest and store the outcome, see results().
+        Files added since the manifest was written are ignored.
+
+        Files whose size or mtime changed but whose contents still match keep their baseline digest,
+        with the new size and mtime recorded so they are not hashed again.
+
+        Args:
+            folder_path: Path of the game folder
+            full: Re-hash every file instead of only the ones whose size or mtime changed
+
+        Returns:
+            VerifyResult: Missing and corrupted files, relative to the game folder
+        """
+        folder = os.path.basename(folder_path)
+        known = self._entries(folder)
+        current = scan(folder_path) if os.path.isdir(folder_path) else {}
+
+        missing = sorted(path for path in known if path not in current)
+        suspect = [path for path in known if path in current and (full or current[path] != known[path][:2])]
+        digests = self._hash(folder_path, suspect)
+        corrupted = sorted(path for path in suspect if digests.get(path) != known[path][2])
+        touched = [path for path in suspect if path not in corrupted and current[path] != known[path][:2]]
+        result = VerifyResult(len(known), len(suspect), missing, corrupted)
+
+        now = time.time()
+        with self._lock:
+            self._connection.execute("BEGIN")
+            self._connection.executemany("UPDATE manifest SET size = ?, mtime_ns = ? WHERE folder = ? AND path = ?",
+                                         [(*current[path], folder, path) for path in touched])
+            self._connection.execute(
+                "UPDATE manifest_folders SET verified_at = ?, full_verified_at = CASE WHEN ? THEN ? "
+                "ELSE full_verified_at END, files = ?, hashed = ?, missing = ?, corrupted = ? WHERE folder = ?",
+                (now, full, now, result.files, result.hashed, json.dumps(missing), json.dumps(corrupted), folder),
+            )
+            self._connection.execute("COMMIT")
+        return result
+
+    def results(self) -> Dict[str, VerifyResult]:
+        """
+        Returns:
+            Dict: Outcome of the last verification by game folder name, for every folder with a manifest.
+            Folders not verified since their manifest was created count as intact.
+        """
+        with self._lock:
+            cursor = self._connection.execute(
+                "SELECT folder, files, hashed, missing, corrupted FROM manifest_folders")
+            return {folder: VerifyResult(files, hashed, json.loads(missing), json.loads(corrupted))
+                    for folder, files, hashed, missing, corrupted in cursor}
+
+    def full_verify_due(self, days: float) -> Set[str]:
+        """
+        Args:
+            days: Interval between full verifications of a folder, 0 disables them
+
+        Returns:
+            Set: Names of the game folders whose last full verification is older than days
+        """
+        if days <= 0:
+            return set()
+        with self._lock:
+            cursor = self._connection.execute(
+                "SELECT folder FROM manifest_folders WHERE COALESCE(full_verified_at, created_at) < ?",
+                (time.time() - days * 86400,))
+            return {row[0] for row in cursor}
+
+
+def scan(folder_path: str) -> Dict[str, Tuple[int, int]]:
+    """
+    List the files of a game folder at any depth.
+
+    Args:
+        folder_path: Path of the game folder
+
+    Returns:
+        Dict: (size, mtime_ns) by path relative to the folder
+    """
+    files = {}
+    stack = [folder_path]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        stat = entry.stat(follow_symlinks=False)
+                        files[os.path.relpath(entry.path, folder_path)] = (stat.st_size, stat.st_mtime_ns)
+        except OSError as e:
+            logger.error(f"Error listing {directory}: {e}")
+    return files
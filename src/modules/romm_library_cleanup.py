@@ -1,9 +1,12 @@
 # ROMM Library Cleanup Module
 import logging
+from typing import Dict, List, Optional
 
-from src.modules.api.romm import RommAPI
+from src.modules.api.romm import RommAPI, RommAPIError, get_romm_api
 from src.modules.config_parse import *
 from src.modules.config_parse import ROMM_EMPTY_DIRS_LIBRARY_SPECIFIC
+from src.modules.manifest import Manifest
+from src.modules.validation import dangerous_files, has_executable, is_fragmented
 
 logger = logging.getLogger(__name__)
 
@@ -12,17 +15,43 @@ def run():
     """
     Run the ROMM library cleanup process.
     This function will find and delete empty ROMMs.
+    The library is downloaded once and shared by every check.
     """
     if ROMM_ENABLE:
         logger.info("Starting ROMM library cleanup...")
         try:
+            romm_api = get_romm_api()
+
+            platform_id = romm_api.get_platform_by_slug()
+            if platform_id is None:
+                logger.warning("Could not retrieve platform ID, platform specific checks will be skipped")
+
+            # Only download other platforms when the empty checks are configured to look at them
+            all_platforms = ROMM_EMPTY_DIRS and (not ROMM_EMPTY_DIRS_LIBRARY_SPECIFIC or platform_id is None)
+            items = get_library(romm_api, None if all_platforms else platform_id)
+            if items is None:
+                logger.error("Failed to retrieve games from ROMM API")
+                return
+            logger.info(f"Checking {len(items)} ROMMs...")
+
             if ROMM_EMPTY_DIRS:
-                find_empty()
-                find_fragmented()
-            if ROMM_MISSING_EXE:
-                find_missing_exe()
-            if ROMM_SCAN_DANGEROUS_FILETYPES:
-                find_dangerous_filetypes()
+                items = without(items, find_empty(romm_api, items))
+                items = without(items, find_fragmented(romm_api, items))
+
+            # The remaining checks only apply to the configured platform
+            if platform_id is None:
+                platform_items = []
+                if ROMM_MISSING_EXE or ROMM_SCAN_DANGEROUS_FILETYPES:
+                    logger.error("Could not retrieve platform ID, skipping missing exe and dangerous filetype checks")
+            elif all_platforms:
+                platform_items = [item for item in items if item.get('platform_id') == platform_id]
+            else:
+                platform_items = items
+
+            if ROMM_MISSING_EXE and platform_id is not None:
+                platform_items = without(platform_items, find_missing_exe(romm_api, platform_items))
+            if ROMM_SCAN_DANGEROUS_FILETYPES and platform_id is not None:
+                find_dangerous_filetypes(platform_items)
             logger.info("ROMM library cleanup completed.")
         except Exception as e:
             logger.error(f"Error during ROMM library cleanup: {e}")
@@ -30,37 +59,68 @@ def run():
         logger.info("ROMM library cleanup is disabled in the configuration. Skipping...")
 
 
-def find_empty():
-    # Get the list of romms from the API
-    logger.info("Removing empty directories...")
+def get_library(romm_api: RommAPI, platform_id: Optional[int] = None) -> Optional[List[Dict]]:
+    """
+    Download the ROMM library listing once, for all checks of a run.
+    The listing is read page by page and only the fields used by the checks are kept,
+    so memory stays proportional to the number of games rather than the size of their metadata.
+    Pages are ordered by the unique game ID: with a shared sort key (e.g. size) the order between
+    pages is not stable, and games could be skipped or listed twice.
+    :param romm_api: The ROMM API client.
+    :param platform_id: Only list games of this platform, all platforms if None.
+    :return: The games, or None if the listing could not be retrieved.
+    """
     try:
-        romm_api = RommAPI()
-        platform_id = None
+        return [compact(item) for item in romm_api.iter_games(platform_id=platform_id, order_by="id",
+                                                               order_dir="asc", group_by_meta_id=True)]
+    except RommAPIError as e:
+        logger.error(f"Error listing ROMM library: {e}")
+        return None
 
-        if ROMM_EMPTY_DIRS_LIBRARY_SPECIFIC:
-            logger.info("Removing empty directories specific to the ROMM library...")
-            platform_id = RommAPI().get_platform_by_slug()
-            if platform_id is None:
-                logger.warning("Could not retrieve platform ID, continuing with all platforms")
 
-        data = romm_api.filter_games(platform_id=platform_id, offset=0, order_by="fs_size_bytes", order_dir="asc",
-                                     group_by_meta_id=True)
+def compact(item: Dict) -> Dict:
+    """
+    Keep only the fields of a game used by the cleanup checks.
+    :param item: Game details from the ROMM API.
+    :return: The trimmed game details.
+    """
+    return {
+        'id': item.get('id'),
+        'name': item.get('name'),
+        'platform_id': item.get('platform_id'),
+        'fs_name': item.get('fs_name'),
+        'fs_size_bytes': item.get('fs_size_bytes'),
+        'files': [{'file_name': file.get('file_name')} for file in item.get('files') or []],
+    }
+
 
-        if data is None:
-            logger.error("Failed to retrieve games from ROMM API")
-            return
+def without(items: List[Dict], game_ids: List[int]) -> List[Dict]:
+    """
+    Drop deleted games from the library listing, so later checks do not delete them again.
+    :param items: The games.
+    :param game_ids: IDs of the deleted games.
+    :return: The remaining games.
+    """
+    if not game_ids:
+        return items
+    deleted = set(game_ids)
+    return [item for item in items if item.get('id') not in deleted]
 
-        game_ids = []
-        items = []
 
-        if isinstance(data, dict):
-            items = data.get('items', [])
-        elif isinstance(data, list):
-            items = data
+def find_empty(romm_api: RommAPI, items: List[Dict]) -> List[int]:
+    """
+    Find and delete ROMMs with a size of 0 bytes.
+    :param romm_api: The ROMM API client.
+    :param items: The library listing.
+    :return: IDs of the deleted games.
+    """
+    logger.info("Removing empty directories...")
+    try:
+        game_ids = []
 
         if not items:
             logger.info("No ROMMs found to check for emptiness.")
-            return
+            return []
 
         for item in items:
             if item.get('fs_size_bytes') == 0:
@@ -73,162 +133,127 @@ def find_empty():
             result = romm_api.delete_games(game_ids)
             if result is None:
                 logger.error("Failed to delete empty ROMMs")
+                return []
+            return result['deleted']
         else:
             logger.info("No empty ROMMs found.")
+        return game_ids
     except Exception as e:
         logger.error(f"Error in find_empty: {e}")
+        return []
 
 
-def find_fragmented():
+def find_fragmented(romm_api: RommAPI, items: List[Dict]) -> List[int]:
     """
     Find ROMMs that are fragmented.
     This function will check each ROMM file for fragmentation and log the results.
+    :param romm_api: The ROMM API client.
+    :param items: The library listing.
+    :return: IDs of the deleted games.
     """
     logger.info("Finding ROMMs too small...")
     try:
-        romm_api = RommAPI()
-        platform_id = None
-
-        if ROMM_EMPTY_DIRS_LIBRARY_SPECIFIC:
-            logger.info("Removing fragmented directories specific to the ROMM library...")
-            platform_id = RommAPI().get_platform_by_slug()
-            if platform_id is None:
-                logger.warning("Could not retrieve platform ID, continuing with all platforms")
-
-        data = romm_api.filter_games(platform_id=platform_id, offset=0, order_by="fs_size_bytes", order_dir="asc",
-                                     group_by_meta_id=True)
-
-        if data is None:
-            logger.error("Failed to retrieve games from ROMM API")
-            return
-
         game_ids = []
-        items = []
-
-        if isinstance(data, dict):
-            items = data.get('items', [])
-        elif isinstance(data, list):
-            items = data
 
         if not items:
             logger.info("No ROMMs found to check for fragmentation.")
-            return
+            return []
+
+        # Games with a checksum manifest use the result of the last library cleanup check,
+        # the others fall back to the size check
+        results = {}
+        if MANIFEST_ENABLED:
+            manifest = Manifest()
+            try:
+                results = manifest.results()
+            finally:
+                manifest.close()
 
         for item in items:
-            if item.get(
-                    'fs_size_bytes') <= 1100:  # 1.1 KB, should be smaller than the smallest legitimate game file. This value specifically is what an XCI missing its actual game file is.
+            result = results.get(item.get('fs_name'))
+            if result is not None:
+                if not result.ok:
+                    logger.info(f"Found damaged ROMM: {item.get('name')} (ID: {item.get('id')}) | "
+                                f"{len(result.missing)} missing, {len(result.corrupted)} corrupted of "
+                                f"{result.files} files")
+                    game_ids.append(item.get('id'))
+            elif is_fragmented(item.get('fs_size_bytes')):
                 logger.info(f"Found fragmented ROMM: {item.get('name')} (ID: {item.get('id')})")
                 # add the game ID to the list for deletion
                 game_ids.append(item.get('id'))
 
         if game_ids:
             logger.info(f"Deleting empty ROMMs: {len(game_ids)} found.")
-            romm_api.delete_games(game_ids)
+            result = romm_api.delete_games(game_ids)
+            return result['deleted'] if result is not None else []
         else:
             logger.info("No empty ROMMs found.")
+        return game_ids
     except Exception as e:
         logger.error(f"Error in find_fragmented: {e}")
+        return []
 
 
-def find_missing_exe():
+def find_missing_exe(romm_api: RommAPI, items: List[Dict]) -> List[int]:
     """
     Find ROMMs that are missing the executable file.
     This function will check each ROMM file for the presence of an executable file.
+    :param romm_api: The ROMM API client.
+    :param items: The library listing of the configured platform.
+    :return: IDs of the deleted games.
     """
     logger.info("Finding ROMMs with missing executables...")
     try:
-        romm_api = RommAPI()
-
-        platform_id = RommAPI().get_platform_by_slug()  # Ensure platform is set
-        if platform_id is None:
-            logger.error("Could not retrieve platform ID, skipping missing exe check")
-            return
-
-        data = romm_api.filter_games(platform_id=platform_id, offset=0, order_by="fs_size_bytes", order_dir="asc",
-                                     group_by_meta_id=True)
-
-        if data is None:
-            logger.error("Failed to retrieve games from ROMM API")
-            return
-
         game_ids = []
-        items = []
-
-        if isinstance(data, dict):
-            items = data.get('items', [])
-        elif isinstance(data, list):
-            items = data
 
         if not items:
             logger.info("No ROMMs found to check for missing executables.")
-            return
+            return []
 
         for item in items:
-            is_exe_present = False
-
-            for file in item.get('files', []):
-                if file.get('file_name').endswith('.exe'):
-                    is_exe_present = True
-                    break
-
-            if not is_exe_present:
+            if not has_executable(file.get('file_name') for file in item.get('files', [])):
                 logger.info(f"Romm missing executable: {item.get('name')} (ID: {item.get('id')})")
                 game_ids.append(item.get('id'))
 
         if game_ids:
             logger.info(f"Deleting ROMMs with missing executables: {len(game_ids)} found.")
-            romm_api.delete_games(game_ids)
+            result = romm_api.delete_games(game_ids)
+            return result['deleted'] if result is not None else []
         else:
             logger.info("No ROMMs with missing executables found.")
+        return game_ids
     except Exception as e:
         logger.error(f"Error in find_missing_exe: {e}")
+        return []
 
 
-def find_dangerous_filetypes():
+def find_dangerous_filetypes(items: List[Dict]) -> List[int]:
     """
     Find ROMMs that contain dangerous file types.
     This function will check each ROMM file for the presence of dangerous file types.
     This is not an exhaustive list, but it includes common dangerous file types that should not exist with any legitimate game release like .bat and .cmd.
     It is recommended to add more file types as needed and to leverage a more comprehensive security solution like ClamAV.
+    :param items: The library listing of the configured platform.
+    :return: IDs of the games with dangerous files.
     """
     logger.info("Finding ROMMs with dangerous file types...")
     try:
-        romm_api = RommAPI()
-
-        platform_id = RommAPI().get_platform_by_slug()
-        if platform_id is None:
-            logger.error("Could not retrieve platform ID, skipping dangerous filetype check")
-            return
-
-        data = romm_api.filter_games(platform_id=platform_id, offset=0, order_by="fs_size_bytes", order_dir="asc",
-                                     group_by_meta_id=True)
-
-        if data is None:
-            logger.error("Failed to retrieve games from ROMM API")
-            return
-
         game_ids = []
-        items = []
-
-        if isinstance(data, dict):
-            items = data.get('items', [])
-        elif isinstance(data, list):
-            items = data
 
         if not items:
             logger.info("No ROMMs found to check for dangerous file types.")
-            return
+            return []
 
         for item in items:
-            for file in item.get('files', []):
-                if file.get('file_name').endswith(('.bat', '.cmd')):
-                    logger.warning(f"Romm has dangerous file: {item.get('name')} (ID: {item.get('id')})")
-                    game_ids.append(item.get('id'))
-                    break
+            if dangerous_files(file.get('file_name') for file in item.get('files', [])):
+                logger.warning(f"Romm has dangerous file: {item.get('name')} (ID: {item.get('id')})")
+                game_ids.append(item.get('id'))
 
         if game_ids:
             logger.info(f"ROMMs with dangerous files: {len(game_ids)} found.")
         else:
             logger.info("No ROMMs with dangerous files found.")
+        return game_ids
     except Exception as e:
         logger.error(f"Error in find_dangerous_filetypes: {e}")
+        return []
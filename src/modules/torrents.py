@@ -15,19 +15,30 @@ import json
 import logging
 import os
 import shutil
+import threading
 import time
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from typing import Dict, List, Optional, Tuple
 
 import qbittorrentapi
-from qbittorrentapi import Client
+from qbittorrentapi import Client, TorrentDictionary
 
 # Load modules with explicit imports
 from src.modules.config_parse import (
     GAME_PATH, conn_info, QBIT_CATEGORY,
-    GOG_ALL_GAMES_FILE, GOG_ALL_GAMES_URL,
-    MAX_TORRENTS_PER_RUN, DELETE_AFTER_PROCESSING, QBIT_ENABLE
+    GOG_ALL_GAMES_FILE, GOG_ALL_GAMES_INDEX, GOG_ALL_GAMES_URL, CACHE_REFRESH_HOURS,
+    GOG_RECENT_GAMES_FILE, GOG_RECENT_GAMES_URL, GOG_FUZZY_MATCH_THRESHOLD,
+    MAX_TORRENTS_PER_RUN, DELETE_AFTER_PROCESSING, QBIT_ENABLE,
+    IMPORT_WORKERS, IMPORT_WORKERS_PER_FILESYSTEM, FILESYSTEM_CONCURRENCY, STAGED_REPLACE, WATCH_INTERVAL,
+    JOURNAL_FILE, MAX_IMPORT_FAILURES, VALIDATE_BEFORE_IMPORT, QUARANTINE_CATEGORY, MANIFEST_ENABLED
 )
-from src.modules.helpers import fetch_json_data
+from src.modules.api.gog import FUZZY_MATCH, GogCatalog, catalog_items
+from src.modules.helpers import FetchResult, fetch_json_data
+from src.modules.journal import TorrentJournal, RESOLVED, MOVED, DELETED, FAILED, REJECTED
+from src.modules.manifest import Manifest
+from src.modules.transfer import copy_in_progress, copy_tree, delete_in_background, replace_directory
+from src.modules.validation import validate_release
 
 logger = logging.getLogger(__name__)
 
@@ -35,11 +46,33 @@ logger = logging.getLogger(__name__)
 MAX_RETRIES = 3
 # Delay between retries in seconds
 RETRY_DELAY = 5
+# Maximum number of torrents removed per torrents_delete call
+DELETE_CHUNK_SIZE = 100
+
+# Shared qBittorrent client, see get_qbittorrent_client()
+_client: Optional[Client] = None
+_client_lock = threading.Lock()
+
+# Shared processed-torrent journal, see get_journal()
+_journal: Optional[TorrentJournal] = None
+
+# Import slots per filesystem (keyed by device id) and locks per destination folder
+_filesystem_semaphores = {}
+_destination_locks = {}
+_slots_lock = threading.Lock()
+
+# Torrent names that already forced a catalog refresh and when the last one ran, see refresh_catalog_on_miss()
+_missed_names = set()
+_last_forced_refresh: Optional[float] = None
+_refresh_lock = threading.Lock()
 
 
 def get_qbittorrent_client() -> Client | bool:
     """
-    Initialize and return a qBittorrent client.
+    Return the shared, authenticated qBittorrent client, logging in on first use.
+
+    The client is reused for the whole run (and across runs), so its HTTP session and
+    login cookie are kept; qbittorrentapi logs in again by itself if the session expires.
     
     Returns:
         qbittorrentapi.Client: Initialized qBittorrent client
@@ -47,18 +80,52 @@ def get_qbittorrent_client() -> Client | bool:
     Raises:
         qbittorrentapi.LoginFailed: If authentication fails
     """
-    try:
-        client = qbittorrentapi.Client(**conn_info)
-        client.auth_log_in()
-        return client
-    except qbittorrentapi.APIConnectionError as e:
-        logger.error(f"Failed to connect to qBittorrent: {e}")
-        return False
+    global _client
+
+    with _client_lock:
+        if _client is not None:
+            return _client
+
+        try:
+            client = qbittorrentapi.Client(**conn_info)
+            client.auth_log_in()
+            _client = client
+            return client
+        except qbittorrentapi.APIConnectionError as e:
+            logger.error(f"Failed to connect to qBittorrent: {e}")
+            return False
+
+
+def get_journal() -> TorrentJournal:
+    """
+    Return the shared processed-torrent journal, opening it on first use.
+
+    Returns:
+        TorrentJournal: The journal stored at journal_file
+    """
+    global _journal
+
+    with _client_lock:
+        if _journal is None:
+            _journal = TorrentJournal(JOURNAL_FILE, MAX_IMPORT_FAILURES)
+        return _journal
+
+
+def reset_qbittorrent_client():
+    """
+    Drop the shared qBittorrent client so the next call to get_qbittorrent_client() connects again.
+    """
+    global _client
+
+    with _client_lock:
+        _client = None
 
 
 def qbit_preflight() -> bool:
     """
     Test Authentication with qBittorrent and log the app version and web API version.
+
+    If qBittorrent cannot be reached, the shared client is dropped so the next cycle connects again.
     
     Returns:
         bool: True if authentication was successful, False otherwise
@@ -75,6 +142,12 @@ def qbit_preflight() -> bool:
 
     except qbittorrentapi.LoginFailed as e:
         logger.error(f"qBittorrent Login failed: {e}")
+        reset_qbittorrent_client()
+        return False
+    except qbittorrentapi.APIConnectionError as e:
+        # The shared client outlives the connection, e.g. qBittorrent went down since the last cycle
+        logger.error(f"Failed to connect to qBittorrent: {e}")
+        reset_qbittorrent_client()
         return False
 
 
@@ -85,8 +158,8 @@ def torrent_manager():
     This function:
     1. Retrieves all completed torrents in the specified category
     2. Checks if they have finished seeding
-    3. Renames and moves them to the game library
-    4. Optionally deletes the torrent from qBittorrent based on configuration
+    3. Renames and moves them to the game library (see import_torrents)
+    4. Optionally deletes the imported torrents from qBittorrent in one batch, based on configuration
     
     Returns:
         None
@@ -95,43 +168,31 @@ def torrent_manager():
 
         client = get_qbittorrent_client()
 
-        # Get all completed torrents in the category
-        completed_torrents = client.torrents_info(category=QBIT_CATEGORY, limit=None, status_filter='completed')
-
-        # Apply limit if configured
-        if MAX_TORRENTS_PER_RUN > 0:
-            logger.info(
-                f"Limiting to {MAX_TORRENTS_PER_RUN} torrents per run (from {len(completed_torrents)} available)")
-            completed_torrents = completed_torrents[:MAX_TORRENTS_PER_RUN]
-        else:
-            logger.info(f"Processing all {len(completed_torrents)} available torrents")
+        # Get all completed torrents in the category, oldest first
+        completed_torrents = client.torrents_info(category=QBIT_CATEGORY, limit=None, status_filter='completed',
+                                                  sort='completion_on')
 
         # Filter for torrents in the specific category that are done seeding.
-        for torrent in completed_torrents:
-            # Validate the torrent state is "Stopped".  This means that the torrent has finished downloading AND seeding.
-            if torrent.state == 'stoppedUP':
-                # Log which torrents are in the category.  Includes the name, hash, and path.
-                logger.info(f'Torrent: {torrent.name} | Hash: {torrent.hash} | Path: {torrent.content_path}')
-
-                source = torrent.content_path
-                name = torrent.name
-                # Create new folder name based on the torrent name
-                new_name = new_folder(name)
-
-                # Skip if new_folder returned None (error occurred)
-                if new_name is None:
-                    logger.warning(f"Skipping torrent {name} due to error in new_folder()")
-                    continue
-
-                # Copy and Delete to the game library root path
-                destination = os.path.join(GAME_PATH, new_name)
-
-                if move_torrent_folder(source, destination):
-                    # Only delete torrent if configured to do so
-                    if DELETE_AFTER_PROCESSING:
-                        delete_torrent(torrent.hash)
-                    else:
-                        logger.info(f"Keeping torrent {name} (delete_after_processing is disabled)")
+        # Validate the torrent state is "Stopped".  This means that the torrent has finished downloading AND seeding.
+        ready = [torrent for torrent in completed_torrents if torrent.state == 'stoppedUP']
+        journal = get_journal()
+
+        # Retry removing torrents that were imported but could not be deleted from qBittorrent
+        if DELETE_AFTER_PROCESSING:
+            states = journal.states(torrent.hash for torrent in ready)
+            leftovers = [torrent.hash for torrent in ready if states.get(torrent.hash, (None,))[0] == MOVED]
+            if leftovers:
+                logger.info(f"Retrying deletion of {len(leftovers)} already imported torrent(s)")
+                failed = set(delete_torrents(leftovers))
+                journal.record_many([h for h in leftovers if h not in failed], DELETED)
+
+        # Skip torrents that were already imported or keep failing, then apply the limit
+        pending, deferred = select_pending(ready)
+        if not deferred:
+            logger.info(f"Processing all {len(pending)} pending torrents "
+                        f"({len(completed_torrents)} completed in category)")
+
+        import_torrents(pending)
     except qbittorrentapi.LoginFailed as e:
         logger.error(f"qBittorrent login failed: {e}")
     except qbittorrentapi.APIConnectionError as e:
@@ -140,12 +201,358 @@ def torrent_manager():
         logger.error(f"Unexpected error in torrent manager: {e}")
 
 
+def select_pending(ready: list) -> Tuple[list, list]:
+    """
+    Drop the torrents the journal says are done with, then apply max_torrents_per_run.
+
+    Args:
+        ready: Torrents that finished seeding, oldest first
+
+    Returns:
+        Tuple[list, list]: The torrents to import now, and the pending torrents left for later by the limit
+    """
+    pending = get_journal().pending(ready)
+    if MAX_TORRENTS_PER_RUN > 0 and len(pending) > MAX_TORRENTS_PER_RUN:
+        logger.info(f"Limiting to {MAX_TORRENTS_PER_RUN} torrents per run (from {len(pending)} pending)")
+        return pending[:MAX_TORRENTS_PER_RUN], pending[MAX_TORRENTS_PER_RUN:]
+    return pending, []
+
+
+def import_torrents(ready: list) -> list:
+    """
+    Import a batch of torrents that finished seeding.
+
+    This function:
+    1. Loads the GOG catalog once and resolves the folder names of the whole batch in one call
+    2. Imports the torrents on a bounded worker pool
+    3. Optionally deletes the imported torrents from qBittorrent in one batch
+
+    Args:
+        ready: The torrents to import
+
+    Returns:
+        list: The torrents that were moved into the game library
+    """
+    # Finish deleting old versions from replacements interrupted by a restart
+    purge_replaced_versions(GAME_PATH)
+
+    # Load the GOG catalog once for the whole batch
+    catalog = None
+    folders = {}
+    try:
+        catalog = load_catalog()
+        catalog = refresh_catalog_on_miss(catalog, [torrent.name for torrent in ready])
+        folders = resolve_folders([torrent.name for torrent in ready], catalog)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.error(f"Error loading {GOG_ALL_GAMES_FILE}: {e}")
+
+    # Import in parallel; per-filesystem limits are enforced inside import_torrent()
+    workers = max(1, min(IMPORT_WORKERS, len(ready)))
+    imported = []
+    try:
+        if workers > 1:
+            logger.info(f"Importing {len(ready)} torrents with {workers} workers")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='import') as executor:
+            futures = {executor.submit(import_torrent, torrent, catalog, folders.get(torrent.name)): torrent
+                       for torrent in ready}
+            for future, torrent in futures.items():
+                try:
+                    if future.result():
+                        imported.append(torrent)
+                except Exception as e:
+                    logger.error(f"Unexpected error importing torrent {torrent.name}: {e}")
+                    get_journal().record(torrent.hash, torrent.name, FAILED, f"Unexpected error: {e}")
+
+        # Only delete torrents if configured to do so, in one batch at the end
+        if DELETE_AFTER_PROCESSING:
+            hashes = [torrent.hash for torrent in imported]
+            failed = set(delete_torrents(hashes))
+            get_journal().record_many([h for h in hashes if h not in failed], DELETED)
+        else:
+            for torrent in imported:
+                logger.info(f"Keeping torrent {torrent.name} (delete_after_processing is disabled)")
+    finally:
+        if catalog is not None:
+            catalog.close()
+
+    return imported
+
+
+def watch(duration: float):
+    """
+    Import torrents as soon as they finish seeding, by polling qBittorrent's sync/maindata endpoint.
+
+    Each poll passes the rid of the previous response, so qBittorrent only returns what changed
+    since then instead of the full torrent list. A full response (the first one, or after a reconnect)
+    only seeds the state: torrents that are already done are left to the scheduled torrent_manager()
+    cycle. Torrents finishing afterwards go through the same journal filtering and max_torrents_per_run
+    limit as the cycle, and are dispatched once per appearance; torrents held back by the limit are
+    dispatched by a later poll, and a torrent whose import failed is retried by the next full cycle.
+
+    Args:
+        duration: Number of seconds to watch before returning
+    """
+    deadline = time.monotonic() + duration
+    rid = 0
+    torrents = {}
+    dispatched = set()
+
+    while time.monotonic() < deadline:
+        try:
+            client = get_qbittorrent_client()
+            if not client:
+                raise qbittorrentapi.APIConnectionError("qBittorrent client unavailable")
+
+            data = client.sync_maindata(rid=rid)
+            rid = data.get('rid', 0)
+
+            full_update = data.get('full_update')
+            if full_update:
+                torrents = {}
+                dispatched = set()
+            for torrent_hash, changes in (data.get('torrents') or {}).items():
+                torrents.setdefault(torrent_hash, {}).update(changes)
+            for torrent_hash in data.get('torrents_removed') or []:
+                torrents.pop(torrent_hash, None)
+                dispatched.discard(torrent_hash)
+
+            finished = sorted(
+                (torrent_hash for torrent_hash, info in torrents.items()
+                 if torrent_hash not in dispatched
+                 and info.get('category') == QBIT_CATEGORY and info.get('state') == 'stoppedUP'),
+                key=lambda torrent_hash: torrents[torrent_hash].get('completion_on', 0),
+            )
+            if full_update:
+                dispatched.update(finished)
+            elif finished:
+                ready, deferred = select_pending([TorrentDictionary(dict(torrents[torrent_hash], hash=torrent_hash),
+                                                                    client) for torrent_hash in finished])
+                # Torrents skipped by the journal are not looked at again until they reappear
+                dispatched.update(finished)
+                dispatched.difference_update(torrent.hash for torrent in deferred)
+                if ready:
+                    logger.info(f"{len(ready)} torrent(s) finished seeding, importing...")
+                    # Games released since the last cycle are only in the recent-torrents feed
+                    fetch_json_data(GOG_RECENT_GAMES_URL, GOG_RECENT_GAMES_FILE)
+                    import_torrents(ready)
+        except qbittorrentapi.LoginFailed as e:
+            logger.error(f"qBittorrent login failed: {e}")
+            reset_qbittorrent_client()
+            rid = 0
+        except qbittorrentapi.APIConnectionError as e:
+            logger.error(f"qBittorrent API connection error: {e}")
+            reset_qbittorrent_client()
+            rid = 0
+        except Exception as e:
+            logger.error(f"Unexpected error watching qBittorrent: {e}")
+
+        time.sleep(max(0.0, min(WATCH_INTERVAL, deadline - time.monotonic())))
+
+
+def import_torrent(torrent, catalog: Optional[GogCatalog],
+                   resolved: Optional[Tuple[str, Optional[str]]] = None) -> bool:
+    """
+    Resolve and move a single completed torrent. Deletion from qBittorrent is batched by the caller.
+
+    Safe to run from several worker threads at once: the move holds a slot on both the source and
+    destination filesystems, and imports resolving to the same destination are serialised.
+
+    Args:
+        torrent: The qBittorrent torrent to import
+        catalog: Preloaded GOG catalog used to resolve the folder name
+        resolved: Folder name and kind of match from resolve_folders(), resolved from the catalog when omitted
+
+    Returns:
+        bool: True if the torrent was moved into the game library, False otherwise
+    """
+    # Log which torrents are in the category.  Includes the name, hash, and path.
+    logger.info(f'Torrent: {torrent.name} | Hash: {torrent.hash} | Path: {torrent.content_path}')
+
+    source = torrent.content_path
+    name = torrent.name
+    journal = get_journal()
+
+    # Check the file list before touching anything on disk
+    if VALIDATE_BEFORE_IMPORT:
+        reason = validate_torrent(torrent)
+        if reason is not None:
+            logger.warning(f"Rejecting torrent {name}: {reason}")
+            journal.record(torrent.hash, name, REJECTED, reason)
+            quarantine_torrent(torrent)
+            return False
+
+    # Create new folder name based on the torrent name
+    if resolved is None:
+        resolved = resolve_folder(name, catalog)
+
+    # Skip if resolve_folder returned None (error occurred)
+    if resolved is None:
+        logger.warning(f"Skipping torrent {name} due to error in resolve_folder()")
+        journal.record(torrent.hash, name, FAILED, "Unable to resolve folder name")
+        return False
+    new_name, match = resolved
+    journal.record(torrent.hash, name, RESOLVED)
+
+    # Copy and Delete to the game library root path
+    destination = os.path.join(GAME_PATH, new_name)
+
+    with filesystem_slots(source, destination):
+        # A fuzzy match is a guess, it must not replace a game that is already in the library
+        if match == FUZZY_MATCH and os.path.lexists(destination):
+            logger.warning(f"Skipping torrent {name}: fuzzy match {new_name} already exists in the library, "
+                           f"rename it by hand or add an exact match")
+            journal.record(torrent.hash, name, FAILED, f"Fuzzy match {new_name} already exists")
+            return False
+        moved = move_torrent_folder(source, destination)
+        if moved and MANIFEST_ENABLED:
+            create_manifest(destination)
+
+    if moved:
+        journal.record(torrent.hash, name, MOVED)
+    else:
+        journal.record(torrent.hash, name, FAILED, f"Unable to move {source} to {destination}")
+    return moved
+
+
+def create_manifest(destination: str):
+    """
+    Write the checksum manifest baseline of a freshly imported game folder.
+    A failure is logged and does not fail the import; the next library cleanup creates the missing manifest.
+
+    Args:
+        destination: The game folder in the library
+    """
+    try:
+        manifest = Manifest()
+        try:
+            manifest.create(destination)
+        finally:
+            manifest.close()
+    except Exception as e:
+        logger.error(f"Unable to create the checksum manifest of {destination}: {e}")
+
+
+def validate_torrent(torrent) -> Optional[str]:
+    """
+    Run the release validation rules against a torrent's file list, as reported by qBittorrent.
+
+    Files that were not downloaded (priority 0) are ignored. If the file list cannot be retrieved,
+    the torrent is not rejected; the RomM cleanup still catches bad releases after import.
+
+    Args:
+        torrent: The qBittorrent torrent to check
+
+    Returns:
+        Optional[str]: The reason the torrent was rejected, or None if it passed
+    """
+    try:
+        client = get_qbittorrent_client()
+        files = client.torrents_files(torrent_hash=torrent.hash)
+    except Exception as e:
+        logger.warning(f"Unable to get the file list of {torrent.name}, skipping validation: {e}")
+        return None
+
+    return validate_release([(file.name, file.size) for file in files if file.get('priority', 1) != 0])
+
+
+def quarantine_torrent(torrent) -> bool:
+    """
+    Move a rejected torrent to the quarantine category, if one is configured.
+
+    Args:
+        torrent: The qBittorrent torrent to quarantine
+
+    Returns:
+        bool: True if the torrent was moved to the quarantine category, False otherwise
+    """
+    if not QUARANTINE_CATEGORY:
+        return False
+
+    try:
+        client = get_qbittorrent_client()
+        if QUARANTINE_CATEGORY not in client.torrents_categories():
+            try:
+                client.torrents_create_category(name=QUARANTINE_CATEGORY)
+            except qbittorrentapi.Conflict409Error:
+                pass  # Created concurrently by another import worker
+        client.torrents_set_category(category=QUARANTINE_CATEGORY, torrent_hashes=torrent.hash)
+        logger.info(f"Moved torrent {torrent.name} to category {QUARANTINE_CATEGORY}")
+        return True
+    except Exception as e:
+        logger.error(f"Error quarantining torrent {torrent.name}: {e}")
+        return False
+
+
+def _filesystem_id(path: str):
+    """
+    Identify the filesystem a path lives on, using the nearest existing parent for paths not yet created.
+    """
+    path = os.path.abspath(path)
+    while True:
+        try:
+            return os.stat(path).st_dev
+        except OSError:
+            parent = os.path.dirname(path)
+            if parent == path:
+                return path
+            path = parent
+
+
+def _filesystem_limit(device) -> int:
+    """
+    Return the concurrent import limit for a filesystem, honoring the filesystem_concurrency overrides.
+    """
+    for entry in FILESYSTEM_CONCURRENCY:
+        path, _, limit = entry.rpartition(':')
+        try:
+            if path and _filesystem_id(path) == device:
+                return max(1, int(limit))
+        except ValueError:
+            logger.warning(f"Ignoring invalid filesystem_concurrency entry: {entry}")
+    return max(1, IMPORT_WORKERS_PER_FILESYSTEM)
+
+
+@contextmanager
+def filesystem_slots(source: str, destination: str):
+    """
+    Hold an import slot on the source and destination filesystems, plus a lock on the destination.
+
+    Slots are always acquired in the same order so concurrent imports cannot deadlock.
+
+    Args:
+        source: The source path of the torrent folder
+        destination: The destination path in the game library
+    """
+    with _slots_lock:
+        semaphores = []
+        for device in sorted({_filesystem_id(source), _filesystem_id(destination)}, key=str):
+            if device not in _filesystem_semaphores:
+                _filesystem_semaphores[device] = threading.BoundedSemaphore(_filesystem_limit(device))
+            semaphores.append(_filesystem_semaphores[device])
+        destination_lock = _destination_locks.setdefault(os.path.normcase(os.path.abspath(destination)),
+                                                         threading.Lock())
+
+    with ExitStack() as stack:
+        stack.enter_context(destination_lock)
+        for semaphore in semaphores:
+            stack.enter_context(semaphore)
+        yield
+
+
 def move_torrent_folder(source: str, destination: str) -> bool:
     """
     Move a torrent folder from source to destination.
     
-    This function attempts to move a folder using os.rename first (which is faster),
-    and falls back to shutil.move if that fails.
+    The folder is first moved into a hidden staging folder next to the destination, using os.rename
+    (which is faster) and falling back to the resumable copy engine (see transfer.copy_tree) if that
+    fails, e.g. because source and destination are on different filesystems.
+
+    The staging folder then takes the place of the destination. With staged_replace enabled, an
+    existing version is swapped out with a rename and deleted in the background, so the library entry
+    is never missing; otherwise the existing version is deleted before the move.
+
+    A copied source is only deleted after the swap. If a previous run staged the folder but failed
+    before the swap, the complete staging folder is swapped in even though the source is gone.
     
     Args:
         source: The source path of the torrent folder.
@@ -154,18 +561,22 @@ def move_torrent_folder(source: str, destination: str) -> bool:
     Returns:
         bool: True if the folder was successfully moved, False otherwise.
     """
-    # Check if source exists
-    if not os.path.exists(source):
+    # The staging name is derived from the destination, so an interrupted copy is resumed by the next run
+    staging = staging_path(destination, 'importing')
+
+    # A previous run may have staged the folder (moving the source away) and failed before the swap
+    resume = not os.path.exists(source) and os.path.isdir(staging) and not copy_in_progress(staging)
+    if resume:
+        logger.info(f"Source {source} was already staged at {staging}, resuming the import")
+    elif not os.path.exists(source):
         logger.error(f"Source path does not exist: {source}")
         return False
-
-    # Check if source is a directory
-    if not os.path.isdir(source):
+    elif not os.path.isdir(source):
         logger.error(f"Source is not a directory: {source}")
         return False
 
     # Handle existing destination
-    if os.path.exists(destination):
+    if os.path.exists(destination) and not STAGED_REPLACE:
         try:
             logger.info(f'Deleting existing version: {destination}')
             shutil.rmtree(destination)
@@ -173,27 +584,86 @@ def move_torrent_folder(source: str, destination: str) -> bool:
             logger.error(f"Error deleting {destination}: {e}")
             return False
 
-    # Try to move using os.rename (fast)
+    if not resume and not stage_torrent_folder(source, staging):
+        return False
+
     try:
-        os.rename(source, destination)
+        if os.path.exists(destination):
+            old_version = replace_directory(staging, destination,
+                                            staging_path(destination, f'replaced-{time.time_ns()}'))
+            logger.info(f'Replaced existing version: {destination}')
+            delete_in_background(old_version)
+        else:
+            os.rename(staging, destination)
         logger.info(f'Moved {source} to {destination}')
-        return True
     except OSError as e:
-        logger.warning(f'Unable to use os.rename to move {source} to {destination}: {e}')
-        logger.warning('Attempting to use shutil.move instead (slower but more robust).')
+        logger.error(f'Error moving {staging} into place at {destination}: {e}')
+        return False
 
-        # Fall back to shutil.move (slower but more robust)
-        try:
-            shutil.move(source, destination)
-            logger.info(f'Moved {source} to {destination} using shutil.move')
-            return True
-        except (OSError, shutil.Error) as e:
-            logger.error(f'Error moving {source} using shutil.move: {e}')
-            return False
+    # A copied source is only removed once its copy is in the library
+    if os.path.exists(source):
+        delete_in_background(source)
+    return True
+
+
+def stage_torrent_folder(source: str, staging: str) -> bool:
+    """
+    Move a torrent folder into its staging folder, by rename if possible and by copying otherwise.
+
+    A copied source is left in place; move_torrent_folder() removes it once the staging folder was swapped in.
+
+    Args:
+        source: The source path of the torrent folder.
+        staging: The staging folder next to the destination.
+
+    Returns:
+        bool: True if the staging folder holds the complete torrent folder, False otherwise.
+    """
+    # Try to move using os.rename (fast)
+    try:
+        os.rename(source, staging)
+        return True
+    except OSError as e:
+        logger.warning(f'Unable to use os.rename to move {source} to {staging}: {e}')
+        logger.warning('Attempting to copy instead (slower, resumable).')
     except Exception as e:
         logger.error(f'Unexpected error moving {source}: {e}')
         return False
 
+    # Fall back to copying; the source is kept until the copy was swapped into the library
+    return copy_tree(source, staging)
+
+
+def purge_replaced_versions(path: str):
+    """
+    Delete old game versions left behind by replacements that were interrupted before their cleanup finished.
+
+    Args:
+        path: The game library root path
+    """
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.name.startswith('.') and '.replaced-' in entry.name and entry.is_dir(follow_symlinks=False):
+                    delete_in_background(entry.path)
+    except OSError as e:
+        logger.error(f"Error looking for replaced versions in {path}: {e}")
+
+
+def staging_path(destination: str, purpose: str) -> str:
+    """
+    Return the hidden sibling folder used while preparing a destination folder.
+
+    Args:
+        destination: The destination folder in the game library
+        purpose: Short label describing what the folder is used for
+
+    Returns:
+        str: Path of the staging folder
+    """
+    parent, name = os.path.split(os.path.normpath(destination))
+    return os.path.join(parent, f'.{name}.{purpose}')
+
 
 def delete_torrent(torrent_hash: str) -> bool:
     """
@@ -205,34 +675,185 @@ def delete_torrent(torrent_hash: str) -> bool:
     Returns:
         bool: True if the torrent was successfully deleted, False otherwise.
     """
+    return not delete_torrents([torrent_hash])
+
+
+def delete_torrents(torrent_hashes: List[str]) -> List[str]:
+    """
+    Delete torrents from qBittorrent in batches, keeping their files.
+
+    Hashes are sent DELETE_CHUNK_SIZE at a time in a single torrents_delete call each, retrying a
+    chunk on connection errors.
+
+    Args:
+        torrent_hashes: The hashes of the torrents to delete.
+
+    Returns:
+        List[str]: The hashes that could not be deleted (empty if all were deleted).
+    """
+    failed = []
+    for start in range(0, len(torrent_hashes), DELETE_CHUNK_SIZE):
+        chunk = torrent_hashes[start:start + DELETE_CHUNK_SIZE]
+        if not _delete_torrent_chunk(chunk):
+            failed.extend(chunk)
+
+    deleted = len(torrent_hashes) - len(failed)
+    if torrent_hashes:
+        logger.info(f"Deleted {deleted}/{len(torrent_hashes)} torrents from qBittorrent")
+    return failed
+
+
+def _delete_torrent_chunk(torrent_hashes: List[str]) -> bool:
+    """
+    Delete one chunk of torrents with a single API call, retrying on connection errors.
+
+    Returns:
+        bool: True if the chunk was deleted, False otherwise.
+    """
     for attempt in range(MAX_RETRIES):
         try:
             client = get_qbittorrent_client()
-            client.torrents_delete(torrent_hashes=torrent_hash, delete_files=False)
-            logger.info(f"Deleted torrent with hash: {torrent_hash}")
+            if not client:
+                raise qbittorrentapi.APIConnectionError("qBittorrent client unavailable")
+            client.torrents_delete(torrent_hashes=torrent_hashes, delete_files=False)
+            for torrent_hash in torrent_hashes:
+                logger.info(f"Deleted torrent with hash: {torrent_hash}")
             return True
         except qbittorrentapi.LoginFailed as e:
             logger.error(f"qBittorrent login failed: {e}")
             return False
         except qbittorrentapi.APIConnectionError as e:
             logger.error(
-                f"Failed to delete torrent with hash {torrent_hash} (attempt {attempt + 1}/{MAX_RETRIES}): {e}")
+                f"Failed to delete {len(torrent_hashes)} torrent(s) (attempt {attempt + 1}/{MAX_RETRIES}): {e}")
+            reset_qbittorrent_client()
             if attempt < MAX_RETRIES - 1:
                 logger.info(f"Retrying in {RETRY_DELAY} seconds...")
                 time.sleep(RETRY_DELAY)
             else:
-                logger.error(f"Max retries reached. Failed to delete torrent with hash {torrent_hash}")
+                logger.error(f"Max retries reached. Failed to delete torrents: {', '.join(torrent_hashes)}")
                 return False
         except Exception as e:
-            logger.error(f"Unexpected error deleting torrent with hash {torrent_hash}: {e}")
+            logger.error(f"Unexpected error deleting torrents {', '.join(torrent_hashes)}: {e}")
             return False
 
     return False
 
 
-def new_folder(torrent_name: str) -> Optional[str]:
+def load_catalog() -> GogCatalog:
+    """
+    Load the GOG games catalog, fetching it from the API if no cached copy exists.
+
+    Games from the cached recent-torrents feed that are not in the catalog yet are merged in as a delta,
+    so new releases resolve without downloading the full catalog.
+
+    Returns:
+        GogCatalog: The indexed catalog
+
+    Raises:
+        OSError: If the cached catalog cannot be read
+        json.JSONDecodeError: If the cached catalog is not valid JSON
+    """
+    if not os.path.isfile(GOG_ALL_GAMES_FILE):
+        logger.warning(f"{GOG_ALL_GAMES_FILE} not found. Fetching data from API...")
+        fetch_json_data(GOG_ALL_GAMES_URL, GOG_ALL_GAMES_FILE)
+
+    catalog = GogCatalog.open(GOG_ALL_GAMES_FILE, GOG_ALL_GAMES_INDEX)
+
+    if os.path.isfile(GOG_RECENT_GAMES_FILE):
+        try:
+            with open(GOG_RECENT_GAMES_FILE, 'r', encoding='utf-8') as f:
+                added = catalog.merge(catalog_items(json.load(f)))
+            logger.info(f"Merged {added} recent games from {GOG_RECENT_GAMES_FILE}")
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring recent games from {GOG_RECENT_GAMES_FILE}: {e}")
+
+    return catalog
+
+
+def refresh_catalog_on_miss(catalog: GogCatalog, torrent_names: List[str]) -> GogCatalog:
+    """
+    Force a full catalog refresh if any of the torrent names does not resolve.
+
+    Between refreshes the catalog only grows through the recent-torrents delta, so a miss is the
+    signal that the full catalog may be missing a game. Each name forces at most one refresh, and
+    forced refreshes run at most once per cache_refresh_hours, so torrents that are not GOG games
+    do not re-download the catalog every cycle.
+
+    Args:
+        catalog: The currently loaded catalog
+        torrent_names: Names of the torrents about to be processed
+
+    Returns:
+        GogCatalog: The reloaded catalog, or the original one if nothing missed, the refresh was
+        skipped or failed, or the catalog did not change on the server
+    """
+    global _last_forced_refresh
+
+    with _refresh_lock:
+        missing = {clean_torrent_name(name) for name in torrent_names} - _missed_names
+        missing = [name for name in missing if not catalog.has_match(name)]
+        if not missing:
+            return catalog
+
+        if _last_forced_refresh is not None and CACHE_REFRESH_HOURS > 0:
+            elapsed = time.monotonic() - _last_forced_refresh
+            if elapsed < CACHE_REFRESH_HOURS * 3600:
+                logger.info(f"{len(missing)} torrent(s) not found in the GOG catalog. Last forced refresh was "
+                            f"{elapsed / 3600:.1f}h ago, waiting for the next one")
+                return catalog
+
+        logger.info(f"{len(missing)} torrent(s) not found in the GOG catalog. Forcing a full refresh...")
+        _missed_names.update(missing)
+        _last_forced_refresh = time.monotonic()
+        result = fetch_json_data(GOG_ALL_GAMES_URL, GOG_ALL_GAMES_FILE)
+
+    if result != FetchResult.UPDATED:
+        if result:
+            logger.info("GOG catalog is unchanged, keeping the loaded catalog")
+        return catalog
+
+    catalog.close()
+    return load_catalog()
+
+
+def clean_torrent_name(torrent_name: str) -> str:
+    """
+    Strip the platform suffix from a torrent name so it can be matched against catalog slugs.
+
+    Example: stalker_2_heart_of_chornobyl_windows_gog_(83415) -> stalker_2_heart_of_chornobyl
+
+    Args:
+        torrent_name: The original torrent folder name
+
+    Returns:
+        str: The cleaned name
+    """
+    # Remove everything after the first underscore in _windows_gog_
+    if '_windows_gog_' in torrent_name:
+        cleaned = torrent_name.split('_windows_gog_')[0]
+        logger.debug(f"Removed platform suffix: {cleaned}")
+        return cleaned
+    return torrent_name
+
+
+def new_folder(torrent_name: str, catalog: Optional[GogCatalog] = None) -> Optional[str]:
     """
-    Rework the folder name based on the torrent name.
+    Rework the folder name based on the torrent name, see resolve_folder().
+
+    Args:
+        torrent_name: The original torrent folder name
+        catalog: Preloaded GOG catalog. Loaded from the cache file when omitted.
+
+    Returns:
+        Optional[str]: The new folder name, or None if an error occurred
+    """
+    resolved = resolve_folder(torrent_name, catalog)
+    return resolved[0] if resolved is not None else None
+
+
+def resolve_folder(torrent_name: str, catalog: Optional[GogCatalog] = None) -> Optional[Tuple[str, Optional[str]]]:
+    """
+    Rework the folder name based on the torrent name, reporting how the GOG title was matched.
     
     This function:
     1. Cleans up the torrent name by removing platform-specific parts
@@ -243,57 +864,28 @@ def new_folder(torrent_name: str) -> Optional[str]:
     
     Args:
         torrent_name: The original torrent folder name
+        catalog: Preloaded GOG catalog. Loaded from the cache file when omitted.
         
     Returns:
-        Optional[str]: The new folder name, or None if an error occurred
+        Optional[Tuple]: The new folder name and the kind of catalog match (see GogCatalog.resolve(),
+        None if the name was not found in the catalog), or None if an error occurred
     """
     if not torrent_name:
         logger.error("Empty torrent name provided")
         return None
 
     logger.info(f"Processing torrent name: {torrent_name}")
-    new_name = torrent_name
-
-    # Remove everything after the first underscore in _windows_gog_
-    if '_windows_gog_' in new_name:
-        new_name = torrent_name.split('_windows_gog_')[0]
-        logger.debug(f"Removed platform suffix: {new_name}")
+    new_name = clean_torrent_name(torrent_name)
+    match = None
 
     # Search for the game in the GOG games database
     try:
-        # Check if the GOG games file exists
-        if not os.path.isfile(GOG_ALL_GAMES_FILE):
-            logger.warning(f"{GOG_ALL_GAMES_FILE} not found. Fetching data from API...")
-            fetch_json_data(GOG_ALL_GAMES_URL, GOG_ALL_GAMES_FILE)
-            
-        with open(GOG_ALL_GAMES_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            logger.info(f"Loaded {GOG_ALL_GAMES_FILE} with {len(data)} games.")
-
-        # First try to find an exact match
-        exact_match = False
-        for item in data:
-            if new_name == item.get('slug'):
-                new_name = item.get('title')
-                logger.info(f'Found exact match: {item.get("slug")} for title: {new_name}')
-                exact_match = True
-                break
-
-        # Only try partial matches if no exact match was found
-        if not exact_match:
-            # Sort items by slug length to prefer shorter/closer matches
-            # This helps avoid matching with DLCs or similar named games
-            sorted_items = sorted(data, key=lambda x: len(x.get('slug', '')))
-
-            for item in sorted_items:
-                slug = item.get('slug', '')
-                if slug and new_name in slug:
-                    # Check if it's a reasonable match (avoid matching with DLCs)
-                    # For example, if new_name is "witcher", don't match with "witcher-3-dlc"
-                    if len(slug) <= len(new_name) + 10:  # Allow some flexibility
-                        new_name = item.get('title')
-                        logger.info(f'Found partial match: {slug} for title: {new_name}')
-                        break
+        if catalog is None:
+            catalog = load_catalog()
+
+        resolved = catalog.resolve(new_name, GOG_FUZZY_MATCH_THRESHOLD)
+        if resolved is not None:
+            new_name, match = resolved
     except json.JSONDecodeError as e:
         logger.error(f"Error parsing {GOG_ALL_GAMES_FILE}: {e}")
         return None
@@ -304,6 +896,47 @@ def new_folder(torrent_name: str) -> Optional[str]:
         logger.error(f"Error processing {GOG_ALL_GAMES_FILE}: {e}")
         return None
 
+    return folder_name(torrent_name, new_name, match)
+
+
+def resolve_folders(torrent_names: List[str], catalog: GogCatalog) -> Dict[str, Tuple[str, Optional[str]]]:
+    """
+    Rework the folder names of a batch of torrents, resolving them against the catalog in one call.
+
+    Args:
+        torrent_names: The original torrent folder names
+        catalog: Preloaded GOG catalog
+
+    Returns:
+        Dict: New folder name and kind of catalog match (see resolve_folder()) by torrent name.
+        Names that could not be resolved are left out, so they are resolved one at a time on import.
+    """
+    cleaned = {name: clean_torrent_name(name) for name in torrent_names if name}
+    try:
+        matches = catalog.resolve_many(cleaned.values(), GOG_FUZZY_MATCH_THRESHOLD)
+    except Exception as e:
+        logger.error(f"Error resolving {len(cleaned)} torrent names in {GOG_ALL_GAMES_FILE}: {e}")
+        return {}
+
+    folders = {}
+    for name, new_name in cleaned.items():
+        match = matches[new_name]
+        folders[name] = folder_name(name, *(match if match is not None else (new_name, None)))
+    return folders
+
+
+def folder_name(torrent_name: str, new_name: str, match: Optional[str]) -> Tuple[str, Optional[str]]:
+    """
+    Turn a resolved GOG title into a folder name.
+
+    Args:
+        torrent_name: The original torrent folder name
+        new_name: The GOG title, or the cleaned torrent name if it was not found in the catalog
+        match: The kind of catalog match, None if the name was not found
+
+    Returns:
+        Tuple: The new folder name and the kind of catalog match
+    """
     # Remove copyright characters and other unwanted characters that may appear in the metadata.
     for char in '©®™':
         new_name = new_name.replace(char, '')
@@ -317,7 +950,7 @@ def new_folder(torrent_name: str) -> Optional[str]:
         new_name = torrent_name
 
     logger.info(f'Renamed folder: {torrent_name} to {new_name}')
-    return new_name
+    return new_name, match
 
 
 def run():
@@ -340,10 +973,13 @@ def run():
             logger.error("qBittorrent preflight check failed. Exiting torrent manager.")
             return
 
-        # Ensure we have the latest game data
+        # Ensure we have the latest game data (skipped while the cache is younger than cache_refresh_hours).
+        # The small recent-torrents feed is checked every cycle and merged into the catalog as a delta.
         try:
-            logger.info(f"Fetching latest game data from {GOG_ALL_GAMES_URL}")
-            fetch_json_data(GOG_ALL_GAMES_URL, GOG_ALL_GAMES_FILE)
+            logger.info(f"Refreshing game data from {GOG_ALL_GAMES_URL}")
+            fetch_json_data(GOG_ALL_GAMES_URL, GOG_ALL_GAMES_FILE, CACHE_REFRESH_HOURS)
+            logger.info(f"Fetching recent games from {GOG_RECENT_GAMES_URL}")
+            fetch_json_data(GOG_RECENT_GAMES_URL, GOG_RECENT_GAMES_FILE)
         except Exception as e:
             logger.error(f"Error fetching game data: {e}")
             logger.warning("Continuing with existing game data if available...")
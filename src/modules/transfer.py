@@ -0,0 +1,463 @@
+"""
+Cross-device copy engine for Game Library Manager Scripts.
+
+Used when a torrent folder cannot simply be renamed into the game library because
+the torrent and library paths are on different filesystems. The engine:
+- Tries a reflink (copy-on-write clone) first where the filesystem supports it
+- Copies file data in the kernel with copy_file_range/sendfile, falling back to large buffered reads
+- Copies several files in parallel
+- Writes each file to a ".part" file, so an interrupted copy resumes where it stopped
+- Records the source files in a plan file, so a resumed copy discards ".part" files whose source
+  changed and removes files that are no longer part of the source
+- Verifies sizes (and optionally checksums) before the source is removed
+
+It also swaps prepared folders into place and deletes replaced folders in the background.
+"""
+import ctypes
+import errno
+import json
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Set
+
+from src.modules.config_parse import COPY_WORKERS, COPY_VERIFY
+from src.modules.helpers import atomic_write, file_digest, format_size
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ioctl request to clone a whole file (Linux FICLONE), supported by btrfs, XFS and others
+FICLONE = 0x40049409
+# Maximum bytes requested per copy_file_range/sendfile call
+KERNEL_CHUNK_SIZE = 1024 * 1024 * 1024
+# Buffer size for the userspace fallback
+BUFFER_SIZE = 8 * 1024 * 1024
+# Suffix of files that are still being copied
+PART_SUFFIX = '.part'
+# File in the destination root describing the source of a copy in progress, removed once the copy completes
+PLAN_FILE = '.copy-plan.json'
+# Errors meaning the kernel copy method is not available for this pair of files
+UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF}
+# renameat2() arguments for atomically exchanging two paths (Linux 3.15+)
+AT_FDCWD = -100
+RENAME_EXCHANGE = 2
+
+try:
+    _renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+except (OSError, AttributeError, TypeError):  # Not Linux, or glibc older than 2.28
+    _renameat2 = None
+
+# Single background worker deleting replaced folders, so deletions never block imports
+_deleter = ThreadPoolExecutor(max_workers=1, thread_name_prefix='delete')
+
+
+class VerificationError(OSError):
+    """Raised when a copied file does not match its source."""
+
+
+class CopyPlan(NamedTuple):
+    """Contents of a source directory tree, as paths relative to its root."""
+    files: Dict[str, List[int]]  # path -> [size, mtime_ns]
+    links: Set[str]
+    directories: Set[str]
+    total: int
+
+
+def reflink(source_fd: int, destination_fd: int) -> bool:
+    """
+    Try to clone the source file into the destination file.
+
+    Returns:
+        bool: True if the file was cloned, False if reflinks are not supported here
+    """
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(destination_fd, FICLONE, source_fd)
+        return True
+    except OSError:
+        return False
+
+
+def _copy_range(source_fd: int, destination_fd: int, offset: int, size: int):
+    """
+    Copy bytes [offset, size) from source to destination, using the fastest method available.
+    """
+    copy_file_range = getattr(os, 'copy_file_range', None)
+    if copy_file_range is not None:
+        try:
+            while offset < size:
+                copied = copy_file_range(source_fd, destination_fd, min(KERNEL_CHUNK_SIZE, size - offset),
+                                         offset, offset)
+                if copied == 0:
+                    break
+                offset += copied
+            if offset >= size:
+                return
+        except OSError as e:
+            if e.errno not in UNSUPPORTED_ERRNOS:
+                raise
+
+    sendfile = getattr(os, 'sendfile', None)
+    if sendfile is not None:
+        try:
+            os.lseek(destination_fd, offset, os.SEEK_SET)
+            while offset < size:
+                sent = sendfile(destination_fd, source_fd, offset, min(KERNEL_CHUNK_SIZE, size - offset))
+                if sent == 0:
+                    break
+                offset += sent
+            if offset >= size:
+                return
+        except OSError as e:
+            if e.errno not in UNSUPPORTED_ERRNOS:
+                raise
+
+    os.lseek(source_fd, offset, os.SEEK_SET)
+    os.lseek(destination_fd, offset, os.SEEK_SET)
+    while offset < size:
+        data = os.read(source_fd, min(BUFFER_SIZE, size - offset))
+        if not data:
+            break
+        view = memoryview(data)
+        while view:
+            written = os.write(destination_fd, view)
+            view = view[written:]
+        offset += len(data)
+
+    if offset < size:
+        raise OSError(f"Source shrank while copying: expected {size} bytes, got {offset}")
+
+
+def _is_complete(source_stat: os.stat_result, destination: str) -> bool:
+    """
+    Check whether a destination file was already fully copied by a previous run.
+
+    Finished copies get the source mtime, while ".part" files never reach the final name.
+    """
+    try:
+        destination_stat = os.stat(destination)
+    except OSError:
+        return False
+    return (destination_stat.st_size == source_stat.st_size
+            and destination_stat.st_mtime_ns == source_stat.st_mtime_ns)
+
+
+def copy_file(source: str, destination: str, verify: str = 'size') -> int:
+    """
+    Copy a single file, resuming from an existing ".part" file if one is present.
+
+    Args:
+        source: Path of the file to copy
+        destination: Final path of the copy
+        verify: 'size' to compare sizes, 'checksum' to also compare SHA-256 digests
+
+    Returns:
+        int: Number of bytes copied by this call (0 if the file was already complete)
+
+    Raises:
+        OSError: If the copy fails
+        VerificationError: If the copy does not match the source
+    """
+    source_stat = os.stat(source)
+    size = source_stat.st_size
+
+    if _is_complete(source_stat, destination):
+        logger.debug(f"Already copied: {destination}")
+        return 0
+
+    partial = destination + PART_SUFFIX
+    try:
+        offset = os.path.getsize(partial)
+    except OSError:
+        offset = 0
+    if offset > size:
+        offset = 0
+
+    with open(source, 'rb') as source_file, open(partial, 'r+b' if offset else 'wb') as destination_file:
+        source_fd = source_file.fileno()
+        destination_fd = destination_file.fileno()
+
+        if offset:
+            logger.info(f"Resuming {destination} at {format_size(offset)} of {format_size(size)}")
+            os.ftruncate(destination_fd, offset)
+
+        if offset or size == 0 or not reflink(source_fd, destination_fd):
+            _copy_range(source_fd, destination_fd, offset, size)
+        # The copy must be on disk before it gets its final name and the source is deleted
+        os.fsync(destination_fd)
+
+    copied = os.path.getsize(partial)
+    if copied != size:
+        raise VerificationError(f"Size mismatch for {destination}: expected {size} bytes, got {copied}")
+    if verify == 'checksum' and file_digest(source) != file_digest(partial):
+        os.remove(partial)
+        raise VerificationError(f"Checksum mismatch for {destination}")
+
+    os.replace(partial, destination)
+    shutil.copystat(source, destination)
+    return size - offset
+
+
+def _plan(source: str) -> CopyPlan:
+    """
+    List the files, symlinks and directories below source.
+
+    Returns:
+        CopyPlan: The source tree, with the size and mtime of every file
+    """
+    files = {}
+    links = set()
+    directories = set()
+    total = 0
+    for root, dirs, names in os.walk(source):
+        relative_root = os.path.relpath(root, source)
+
+        # os.walk does not descend into symlinked directories, they are recreated as links
+        for name in dirs:
+            relative = os.path.normpath(os.path.join(relative_root, name))
+            if os.path.islink(os.path.join(root, name)):
+                links.add(relative)
+            else:
+                directories.add(relative)
+
+        for name in names:
+            relative = os.path.normpath(os.path.join(relative_root, name))
+            path = os.path.join(root, name)
+            if os.path.islink(path):
+                links.add(relative)
+            else:
+                stat = os.stat(path)
+                files[relative] = [stat.st_size, stat.st_mtime_ns]
+                total += stat.st_size
+
+    return CopyPlan(files, links, directories, total)
+
+
+def _read_plan(destination: str) -> Dict:
+    """Read the plan file left in destination by an interrupted copy, empty if there is none."""
+    try:
+        with open(os.path.join(destination, PLAN_FILE), 'r', encoding='utf-8') as f:
+            plan = json.load(f)
+        return plan if isinstance(plan, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def copy_in_progress(destination: str) -> bool:
+    """
+    Check whether destination holds an incomplete copy made by copy_tree().
+
+    Args:
+        destination: Target directory of the copy
+
+    Returns:
+        bool: True if a copy into destination was started and has not completed
+    """
+    return os.path.isfile(os.path.join(destination, PLAN_FILE))
+
+
+def _prepare_destination(source: str, destination: str, plan: CopyPlan):
+    """
+    Make destination ready to receive the planned copy of source, keeping what a previous attempt copied.
+
+    ".part" files are only resumed if the previous attempt copied the same source file (path, size and mtime),
+    and entries that are not part of the source tree are removed, so the finished copy matches the source.
+    """
+    previous = _read_plan(destination)
+    resumable = previous.get('files', {}) if previous.get('source') == os.path.abspath(source) else {}
+
+    os.makedirs(destination, exist_ok=True)
+    with atomic_write(os.path.join(destination, PLAN_FILE), 'w') as f:
+        json.dump({'source': os.path.abspath(source), 'files': plan.files}, f)
+
+    expected = set(plan.files) | {path + PART_SUFFIX for path, identity in plan.files.items()
+                                  if resumable.get(path) == identity}
+    expected |= plan.links
+    expected.add(PLAN_FILE)
+
+    removed = 0
+    for root, dirs, names in os.walk(destination):
+        relative_root = os.path.relpath(root, destination)
+        for name in list(dirs):
+            relative = os.path.normpath(os.path.join(relative_root, name))
+            path = os.path.join(root, name)
+            if os.path.islink(path):
+                dirs.remove(name)
+                if relative not in plan.links:
+                    os.remove(path)
+                    removed += 1
+            elif relative not in plan.directories:
+                dirs.remove(name)
+                shutil.rmtree(path)
+                removed += 1
+        for name in names:
+            relative = os.path.normpath(os.path.join(relative_root, name))
+            if relative not in expected:
+                os.remove(os.path.join(root, name))
+                removed += 1
+    if removed:
+        logger.info(f"Removed {removed} stale entries from the earlier partial copy in {destination}")
+
+    for directory in sorted(plan.directories):
+        os.makedirs(os.path.join(destination, directory), exist_ok=True)
+
+
+def copy_tree(source: str, destination: str, workers: int = COPY_WORKERS, verify: str = COPY_VERIFY) -> bool:
+    """
+    Copy a directory tree with several files in flight, resuming any earlier partial copy into destination.
+
+    Until the copy completes, destination holds a plan file recording the source files; see copy_in_progress().
+
+    Args:
+        source: Directory to copy
+        destination: Target directory (created if needed)
+        workers: Number of files copied in parallel
+        verify: 'size' or 'checksum', see copy_file()
+
+    Returns:
+        bool: True if every file was copied and verified, False otherwise
+    """
+    try:
+        plan = _plan(source)
+        _prepare_destination(source, destination, plan)
+    except OSError as e:
+        logger.error(f"Error preparing copy of {source}: {e}")
+        return False
+
+    files = [(os.path.join(source, path), os.path.join(destination, path)) for path in plan.files]
+    links = [(os.path.join(source, path), os.path.join(destination, path)) for path in plan.links]
+    total = plan.total
+
+    logger.info(f"Copying {len(files)} files ({format_size(total)}) from {source} to {destination} "
+                f"with {max(1, workers)} workers")
+
+    started = time.monotonic()
+    copied = 0
+    failures = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='copy') as executor:
+        futures = {executor.submit(copy_file, src, dst, verify): dst for src, dst in files}
+        for done, (future, path) in enumerate(futures.items(), start=1):
+            try:
+                copied += future.result()
+            except OSError as e:
+                failures += 1
+                logger.error(f"Error copying {path}: {e}")
+            else:
+                logger.debug(f"Copied {path} ({done}/{len(files)})")
+
+    for link_source, link_destination in links:
+        try:
+            if os.path.lexists(link_destination):
+                os.remove(link_destination)
+            os.symlink(os.readlink(link_source), link_destination)
+        except OSError as e:
+            failures += 1
+            logger.error(f"Error copying symlink {link_source}: {e}")
+
+    if failures:
+        logger.error(f"{failures} file(s) failed to copy from {source}. Partial copy kept for resuming.")
+        return False
+
+    try:
+        os.remove(os.path.join(destination, PLAN_FILE))
+    except OSError as e:
+        logger.error(f"Error completing copy of {source}: {e}")
+        return False
+
+    # Directory timestamps last, after their contents stopped changing
+    for root, dirs, _ in os.walk(source, topdown=False):
+        try:
+            shutil.copystat(root, os.path.normpath(os.path.join(destination, os.path.relpath(root, source))))
+        except OSError as e:
+            logger.debug(f"Unable to copy directory timestamps for {root}: {e}")
+
+    elapsed = max(time.monotonic() - started, 1e-6)
+    logger.info(f"Copied {format_size(copied)} in {elapsed:.1f}s ({format_size(copied / elapsed)}/s), "
+                f"{format_size(total - copied)} already present")
+    return True
+
+
+def exchange_paths(first: str, second: str) -> bool:
+    """
+    Atomically swap two paths with renameat2(RENAME_EXCHANGE).
+
+    Returns:
+        bool: True if the paths were swapped, False if the platform or filesystem does not support it
+    """
+    if _renameat2 is None:
+        return False
+    result = _renameat2(AT_FDCWD, os.fsencode(first), AT_FDCWD, os.fsencode(second), RENAME_EXCHANGE)
+    if result != 0:
+        logger.debug(f"renameat2 exchange not available: {os.strerror(ctypes.get_errno())}")
+        return False
+    return True
+
+
+def replace_directory(new: str, destination: str, old: str) -> str:
+    """
+    Put the new directory in place of destination, moving the previous version out of the way.
+
+    The swap is a single atomic exchange where supported, otherwise two renames that are rolled back
+    if the second one fails. Either way the destination is only briefly (or never) missing.
+
+    Args:
+        new: Fully prepared directory on the same filesystem as destination
+        destination: Existing directory to replace
+        old: Path to move the previous version to (must not exist)
+
+    Returns:
+        str: Where the previous version ended up: old, or new if the exchange succeeded but the
+        previous version could not be moved on to old
+
+    Raises:
+        OSError: If the replacement fails; destination is left unchanged
+    """
+    if exchange_paths(new, destination):
+        # The new version is in place from here on, so failing to park the old one is not a failure
+        try:
+            os.rename(new, old)
+        except OSError as e:
+            logger.warning(f"Replaced {destination}, but the previous version stays at {new}: {e}")
+            return new
+        return old
+
+    os.rename(destination, old)
+    try:
+        os.rename(new, destination)
+    except OSError:
+        os.rename(old, destination)
+        raise
+    return old
+
+
+def _delete_tree(path: str):
+    started = time.monotonic()
+    try:
+        shutil.rmtree(path)
+        logger.info(f"Deleted {path} in {time.monotonic() - started:.1f}s")
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.error(f"Error deleting {path}: {e}")
+
+
+def delete_in_background(path: str) -> Future:
+    """
+    Queue a directory tree for deletion on the background worker.
+
+    Args:
+        path: Directory to delete
+
+    Returns:
+        Future: Completes when the directory has been deleted
+    """
+    logger.info(f"Queued {path} for background deletion")
+    return _deleter.submit(_delete_tree, path)
@@ -0,0 +1,67 @@
+# Game release validation rules
+import logging
+from typing import Iterable, List, Optional, Tuple
+
+from src.modules.config_parse import ROMM_EMPTY_DIRS, ROMM_MISSING_EXE, ROMM_SCAN_DANGEROUS_FILETYPES
+
+logger = logging.getLogger(__name__)
+
+# File types that should not exist with any legitimate game release
+DANGEROUS_EXTENSIONS = ('.bat', '.cmd')
+# File types a playable release must contain at least one of
+EXECUTABLE_EXTENSIONS = ('.exe',)
+# 1.1 KB, should be smaller than the smallest legitimate game file.
+# This value specifically is what an XCI missing its actual game file is.
+FRAGMENT_SIZE_BYTES = 1100
+
+
+def has_executable(file_names: Iterable[str]) -> bool:
+    """
+    Check whether a release contains an executable.
+    :param file_names: Names (or paths) of the files in the release.
+    :return: True if at least one executable is present.
+    """
+    return any(name.lower().endswith(EXECUTABLE_EXTENSIONS) for name in file_names)
+
+
+def dangerous_files(file_names: Iterable[str]) -> List[str]:
+    """
+    List the files of a release with a dangerous file type.
+    :param file_names: Names (or paths) of the files in the release.
+    :return: The dangerous files, empty if there are none.
+    """
+    return [name for name in file_names if name.lower().endswith(DANGEROUS_EXTENSIONS)]
+
+
+def is_fragmented(total_size: int) -> bool:
+    """
+    Check whether a release is too small to be a complete game.
+    :param total_size: Total size of the release in bytes.
+    :return: True if the release is a fragment.
+    """
+    return total_size <= FRAGMENT_SIZE_BYTES
+
+
+def validate_release(files: List[Tuple[str, int]]) -> Optional[str]:
+    """
+    Run the enabled rules against a release's file manifest.
+
+    Uses the same rules (and the same romm toggles) as the RomM library cleanup, so a release that
+    would be removed after import can be rejected before it is imported.
+    :param files: (path, size) for every file in the release.
+    :return: The reason the release was rejected, or None if it passed.
+    """
+    names = [name for name, _ in files]
+
+    if ROMM_EMPTY_DIRS and is_fragmented(sum(size for _, size in files)):
+        return "Release is empty or fragmented"
+
+    if ROMM_MISSING_EXE and not has_executable(names):
+        return "Release has no executable"
+
+    if ROMM_SCAN_DANGEROUS_FILETYPES:
+        dangerous = dangerous_files(names)
+        if dangerous:
+            return f"Release contains dangerous files: {', '.join(dangerous[:5])}"
+
+    return None
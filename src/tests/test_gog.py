@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+from src.modules.api import gog
+from src.modules.api.gog import (
+    EXACT_MATCH, FUZZY_MATCH, PARTIAL_MATCH, GogCatalog, MappedGogCatalog
+)
+
+ITEMS = [
+    {'slug': 'portal', 'title': 'Portal'},
+    {'slug': 'portal_2', 'title': 'Portal 2'},
+    {'slug': 'the_witcher_3_wild_hunt', 'title': 'The Witcher 3: Wild Hunt'},
+    {'slug': 'the_witcher_3_wild_hunt_game_of_the_year_edition', 'title': 'The Witcher 3: Wild Hunt - GOTY'},
+    {'slug': 'stalker_2_heart_of_chornobyl', 'title': 'S.T.A.L.K.E.R. 2: Heart of Chornobyl'},
+    {'slug': 'heroes_of_might_and_magic_3_complete', 'title': 'Heroes of Might and Magic 3: Complete'},
+    {'slug': 'duplicate', 'title': 'First'},
+    {'slug': 'duplicate', 'title': 'Second'},
+]
+
+NAMES = [
+    'portal', 'portal_2', 'witcher_3_wild', 'stalker_2_heart_of_chornobyl', 'duplicate',
+    'might_and_magic_heroes_3_complete', 'heroes_of_might_and_magic_4', 'unknown_game', '',
+]
+
+
+@pytest.fixture
+def catalogs(tmp_path):
+    catalog = GogCatalog(ITEMS)
+    index = tmp_path / 'games.idx'
+    catalog.save_index(str(index), 123, 456)
+    mapped = MappedGogCatalog(str(index))
+    yield catalog, mapped
+    mapped.close()
+
+
+def test_resolve_reports_match_kind():
+    catalog = GogCatalog(ITEMS)
+
+    assert catalog.resolve('portal') == ('Portal', EXACT_MATCH)
+    assert catalog.resolve('witcher_3_wild') == ('The Witcher 3: Wild Hunt', PARTIAL_MATCH)
+    assert catalog.resolve('might_and_magic_heroes_3_complete', 0.6) == \
+        ('Heroes of Might and Magic 3: Complete', FUZZY_MATCH)
+    assert catalog.resolve('might_and_magic_heroes_3_complete') is None
+    assert catalog.lookup('portal_2') == 'Portal 2'
+
+
+def test_fuzzy_match_requires_matching_numbers():
+    catalog = GogCatalog(ITEMS)
+
+    assert catalog.resolve('heroes_of_might_and_magic_4', 0.5) is None
+
+
+def test_mapped_catalog_matches_in_memory_catalog(catalogs):
+    catalog, mapped = catalogs
+
+    assert len(mapped) == len(catalog)
+    assert (mapped.source_size, mapped.source_mtime_ns) == (123, 456)
+    assert sorted(mapped.slugs()) == sorted(catalog.slugs())
+    for threshold in (0.0, 0.6):
+        for name in NAMES:
+            assert mapped.resolve(name, threshold) == catalog.resolve(name, threshold), name
+
+
+def test_mapped_catalog_merges_delta(catalogs):
+    catalog, mapped = catalogs
+    recent = [{'slug': 'portal', 'title': 'Ignored'}, {'slug': 'new_release', 'title': 'New Release'}]
+
+    assert catalog.merge(recent) == mapped.merge(recent) == 1
+    for name in ('portal', 'new_release', 'new_rel'):
+        assert mapped.resolve(name) == catalog.resolve(name)
+    assert mapped.get('new_release') == 'New Release'
+
+
+def test_resolve_many_matches_resolve():
+    catalog = GogCatalog(ITEMS)
+
+    resolved = catalog.resolve_many(NAMES + ['portal'], 0.6)
+
+    assert list(resolved) == NAMES
+    assert resolved == {name: catalog.resolve(name, 0.6) for name in NAMES}
+    assert catalog.lookup_many(['portal', 'unknown_game']) == {'portal': 'Portal', 'unknown_game': None}
+
+
+def test_trigram_index_is_shared_by_catalogs_of_the_same_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(gog, '_trigram_cache', None)
+    filename = tmp_path / 'games.json'
+    filename.write_text(json.dumps(ITEMS))
+    index = str(tmp_path / 'games.idx')
+
+    first = GogCatalog.open(str(filename), index)
+    second = GogCatalog.open(str(filename), index)
+    try:
+        assert isinstance(second, MappedGogCatalog)
+        first.fuzzy_match('might_and_magic_heroes_3_complete', 0.6)
+        second.merge([{'slug': 'brand_new_release', 'title': 'Brand New Release'}])
+        assert second.resolve('release_brand_new', 0.6) == ('Brand New Release', FUZZY_MATCH)
+        assert second._trigrams is first._trigrams
+    finally:
+        first.close()
+        second.close()
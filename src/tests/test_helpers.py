@@ -0,0 +1,84 @@
+import json
+import os
+import time
+from unittest import mock
+
+from src.modules import helpers
+
+
+class FakeResponse:
+    def __init__(self, body, status_code=200, headers=None):
+        self.body = body
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        yield self.body
+
+
+def fetch(filename, response):
+    with mock.patch('requests.get', return_value=response):
+        return helpers.fetch_json_data('https://example.invalid/games.json', str(filename))
+
+
+def test_fetch_json_data_saves_valid_json(tmp_path):
+    filename = tmp_path / 'games.json'
+    assert fetch(filename, FakeResponse(b'{"games": []}', headers={'ETag': '"v1"'})) == helpers.FetchResult.UPDATED
+
+    assert json.loads(filename.read_text()) == {'games': []}
+    assert json.loads((tmp_path / 'games.json.meta').read_text())['etag'] == '"v1"'
+    assert os.stat(filename).st_mode & 0o777 == helpers.FILE_MODE
+
+
+def test_fetch_json_data_keeps_previous_file_on_invalid_json(tmp_path):
+    filename = tmp_path / 'games.json'
+    filename.write_text('{"games": [1]}')
+
+    assert fetch(filename, FakeResponse(b'{"games": [', headers={'ETag': '"v2"'})) == helpers.FetchResult.FAILED
+
+    assert filename.read_text() == '{"games": [1]}'
+    assert not (tmp_path / 'games.json.meta').exists()
+    assert sorted(os.listdir(tmp_path)) == ['games.json']
+
+
+def test_fetch_json_data_keeps_previous_file_on_truncated_body(tmp_path):
+    filename = tmp_path / 'games.json'
+    filename.write_text('{"games": [1]}')
+
+    assert not fetch(filename, FakeResponse(b'{"games": []}', headers={'Content-Length': '100'}))
+
+    assert filename.read_text() == '{"games": [1]}'
+
+
+def test_fetch_json_data_reports_not_modified_as_unchanged(tmp_path):
+    filename = tmp_path / 'games.json'
+    filename.write_text('{"games": [1]}')
+    (tmp_path / 'games.json.meta').write_text(json.dumps({'etag': '"v1"', 'checked_at': 0}))
+
+    with mock.patch('requests.get', return_value=FakeResponse(b'', status_code=304)) as get:
+        result = helpers.fetch_json_data('https://example.invalid/games.json', str(filename))
+
+    assert result == helpers.FetchResult.UNCHANGED
+    assert get.call_args.kwargs['headers']['If-None-Match'] == '"v1"'
+    assert filename.read_text() == '{"games": [1]}'
+
+
+def test_fetch_json_data_skips_request_while_fresh(tmp_path):
+    filename = tmp_path / 'games.json'
+    filename.write_text('{}')
+    (tmp_path / 'games.json.meta').write_text(json.dumps({'checked_at': time.time()}))
+
+    with mock.patch('requests.get') as get:
+        result = helpers.fetch_json_data('https://example.invalid/games.json', str(filename), max_age_hours=1)
+
+    assert result == helpers.FetchResult.UNCHANGED
+    get.assert_not_called()
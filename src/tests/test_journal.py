@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.modules.journal import DELETED, FAILED, MOVED, REJECTED, RESOLVED, TorrentJournal
+
+
+def torrent(torrent_hash):
+    return SimpleNamespace(hash=torrent_hash, name=f"game_{torrent_hash}")
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = TorrentJournal(str(tmp_path / 'journal.db'), max_failures=2)
+    yield journal
+    journal.close()
+
+
+def test_pending_skips_imported_rejected_and_repeatedly_failing_torrents(journal):
+    journal.record('moved', 'game_moved', MOVED)
+    journal.record('deleted', 'game_deleted', RESOLVED)
+    journal.record_many(['deleted'], DELETED)
+    journal.record('rejected', 'game_rejected', REJECTED, "missing executable")
+    journal.record('failing', 'game_failing', FAILED, "disk full")
+    journal.record('failing', 'game_failing', FAILED, "disk full")
+    journal.record('failed_once', 'game_failed_once', FAILED, "disk full")
+    journal.record('resolved', 'game_resolved', RESOLVED)
+
+    candidates = [torrent(h) for h in ('new', 'moved', 'failed_once', 'deleted', 'rejected', 'failing', 'resolved')]
+
+    assert [t.hash for t in journal.pending(candidates)] == ['new', 'failed_once', 'resolved']
+
+
+def test_failures_accumulate_across_states(journal):
+    journal.record('abc', 'game', FAILED, "first")
+    journal.record('abc', 'game', RESOLVED)
+    journal.record('abc', 'game', FAILED, "second")
+
+    assert journal.states(['abc', 'unknown']) == {'abc': (FAILED, 2, "second")}
+
+
+def test_unlimited_failures_never_skip(tmp_path):
+    journal = TorrentJournal(str(tmp_path / 'journal.db'), max_failures=0)
+    for _ in range(5):
+        journal.record('abc', 'game', FAILED, "again")
+
+    assert [t.hash for t in journal.pending([torrent('abc')])] == ['abc']
+    journal.close()
+
+
+def test_states_handles_more_hashes_than_one_query(journal):
+    hashes = [f"{n:040x}" for n in range(1200)]
+    for torrent_hash in hashes[::100]:
+        journal.record(torrent_hash, 'game', MOVED)
+
+    assert sorted(journal.states(hashes)) == hashes[::100]
+    assert len(journal.pending([torrent(h) for h in hashes])) == 1188
@@ -0,0 +1,54 @@
+import pytest
+
+from src.modules.library_cleanup import compile_extras_matcher
+
+PATTERNS = ['soundtrack', 'ost', 'flac', 'wav', 'mp3', 'artbook', 'booklet', 'wallpaper']
+
+
+GOG_EXTRAS = [
+    'witcher_3_soundtracks.zip', 'cyberpunk_2077_wallpapers_4k.zip', 'artbooks_hd.zip', 'GameOST.zip',
+]
+
+
+@pytest.fixture
+def is_extra():
+    return compile_extras_matcher(PATTERNS, ['.zip'], ['*.nfo'])
+
+
+@pytest.fixture
+def is_extra_word():
+    return compile_extras_matcher(PATTERNS, ['.zip'], ['*.nfo'], whole_words=True)
+
+
+@pytest.mark.parametrize('name', GOG_EXTRAS + [
+    'game_soundtrack.zip', 'Game OST.ZIP', 'ost.zip', 'game_ost_2.zip', 'OST2.zip',
+    'artbook-hd.zip', 'game.wav.zip', 'release.nfo', 'RELEASE.NFO',
+])
+def test_extras_match(is_extra, name):
+    assert is_extra(name)
+
+
+@pytest.mark.parametrize('name', ['game_soundtrack.exe', 'soundtrack.zip.part', 'setup.exe', 'data.zip'])
+def test_game_files_do_not_match(is_extra, name):
+    assert not is_extra(name)
+
+
+@pytest.mark.parametrize('name', [
+    'witcher_3_soundtracks.zip', 'cyberpunk_2077_wallpapers_4k.zip', 'artbooks_hd.zip',
+    'game_soundtrack.zip', 'Game OST.ZIP', 'ost.zip', 'game_ost_2.zip', 'OST2.zip', 'release.nfo',
+])
+def test_whole_word_extras_match(is_extra_word, name):
+    assert is_extra_word(name)
+
+
+@pytest.mark.parametrize('name', [
+    'host_data.zip', 'lost_levels.zip', 'wavebank.zip', 'costume_pack.zip', 'postal.zip', 'GameOST.zip',
+    'game_soundtrack.exe', 'setup.exe',
+])
+def test_whole_words_do_not_match_inside_words(is_extra_word, name):
+    assert not is_extra_word(name)
+
+
+def test_no_rules():
+    assert compile_extras_matcher([], ['.zip'], []) is None
+    assert compile_extras_matcher(['ost'], [], []) is None
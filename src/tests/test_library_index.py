@@ -0,0 +1,95 @@
+import os
+import sqlite3
+
+import pytest
+
+from src.modules.library_index import LibraryIndex
+
+
+def folder_entry(library, name):
+    return next(entry for entry in os.scandir(library) if entry.name == name)
+
+
+@pytest.fixture
+def library(tmp_path):
+    game = tmp_path / 'library' / 'Game'
+    (game / 'data' / 'levels').mkdir(parents=True)
+    (game / 'data' / 'levels' / 'one.pak').write_bytes(b'1')
+    return tmp_path / 'library'
+
+
+def test_unchanged_folder_is_skipped(tmp_path, library):
+    index = LibraryIndex(str(tmp_path / 'index.db'), 'rules')
+    assert index.changed(folder_entry(library, 'Game'))
+    assert index.update(str(library / 'Game'))
+
+    assert not index.changed(folder_entry(library, 'Game'))
+    index.close()
+
+
+def test_nested_change_is_detected(tmp_path, library):
+    index = LibraryIndex(str(tmp_path / 'index.db'), 'rules')
+    index.update(str(library / 'Game'))
+    levels = library / 'Game' / 'data' / 'levels'
+    stat = os.stat(levels)
+
+    (levels / 'two.zip').write_bytes(b'2')
+    os.utime(levels, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    # The index survives reopening
+    index.close()
+    index = LibraryIndex(str(tmp_path / 'index.db'), 'rules')
+    assert index.changed(folder_entry(library, 'Game'))
+    index.close()
+
+
+def test_replaced_folder_is_detected(tmp_path, library):
+    index = LibraryIndex(str(tmp_path / 'index.db'), 'rules')
+    index.update(str(library / 'Game'))
+    os.rename(library / 'Game', library / '.Game.old')
+    (library / 'Game').mkdir()
+
+    assert index.changed(folder_entry(library, 'Game'))
+    index.close()
+
+
+def test_changed_rules_invalidate_the_index(tmp_path, library):
+    index = LibraryIndex(str(tmp_path / 'index.db'), 'rules')
+    index.update(str(library / 'Game'))
+    index.close()
+
+    index = LibraryIndex(str(tmp_path / 'index.db'), 'other rules')
+    assert index.names() == []
+    assert index.changed(folder_entry(library, 'Game'))
+    index.close()
+
+
+def test_index_from_an_older_schema_is_rebuilt(tmp_path, library):
+    path = tmp_path / 'index.db'
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE folders (name TEXT PRIMARY KEY, inode INTEGER, mtime_ns INTEGER, "
+                       "entries INTEGER, size INTEGER, scanned_at REAL)")
+    connection.execute("INSERT INTO folders VALUES ('Game', 1, 1, 1, 1, 0)")
+    connection.execute("CREATE TABLE manifest (folder TEXT)")
+    connection.commit()
+    connection.close()
+
+    index = LibraryIndex(str(path), 'rules')
+    assert index.names() == []
+    assert index.update(str(library / 'Game'))
+    index.close()
+
+    # Tables of other stores in the same database are left alone
+    connection = sqlite3.connect(path)
+    assert connection.execute("SELECT name FROM sqlite_master WHERE name = 'manifest'").fetchone()
+    connection.close()
+
+
+def test_removed_folders_are_forgotten(tmp_path, library):
+    index = LibraryIndex(str(tmp_path / 'index.db'), 'rules')
+    index.update(str(library / 'Game'))
+    index.remove(['Game', 'Unknown'])
+
+    assert index.names() == []
+    assert not index.update(str(library / 'Missing'))
+    index.close()
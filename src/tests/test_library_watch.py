@@ -0,0 +1,105 @@
+import os
+
+import pytest
+
+from src.modules import library_watch
+from src.modules.library_watch import FOLDER_EVENTS, IN_CLOEXEC, IN_NONBLOCK, ROOT_EVENTS, LibraryWatcher
+
+pytestmark = pytest.mark.skipif(library_watch._libc is None, reason="requires Linux inotify")
+
+
+@pytest.fixture
+def watcher(tmp_path):
+    library = tmp_path / 'library'
+    for name in ('Game', 'Other'):
+        (library / name / 'data').mkdir(parents=True)
+        (library / name / 'game_ost.zip').write_bytes(b'ost')
+
+    watcher = LibraryWatcher(str(library), debounce=0)
+    watcher._fd = library_watch._inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    watcher._add_watch(str(library), None, ROOT_EVENTS)
+    for name in ('Game', 'Other'):
+        watcher._add_watch(str(library / name), name, FOLDER_EVENTS)
+    yield watcher
+    os.close(watcher._fd)
+
+
+def drain(watcher):
+    try:
+        while True:
+            watcher._handle(os.read(watcher._fd, library_watch.READ_SIZE))
+    except BlockingIOError:
+        pass
+
+
+def watched(watcher):
+    return sorted(name for name in watcher._watches.values() if name is not None)
+
+
+def cleanup(watcher, removed, changed=()):
+    for path in removed:
+        (os.rmdir if os.path.isdir(path) else os.remove)(path)
+    # Changes made by someone else while the cleanup runs
+    for path in changed:
+        open(path, 'w').close()
+    watcher._discard_own_events(removed)
+
+
+def test_events_of_the_cleanup_itself_are_ignored(watcher):
+    library = watcher.path
+    cleanup(watcher, [os.path.join(library, 'Game', 'game_ost.zip'), os.path.join(library, 'Game', 'data')])
+
+    assert watcher._pending == {}
+    assert watcher._expected == set()
+
+
+def test_changes_made_during_the_cleanup_are_kept(watcher):
+    library = watcher.path
+    cleanup(watcher, [os.path.join(library, 'Game', 'game_ost.zip')],
+            [os.path.join(library, 'Game', 'patch.exe'), os.path.join(library, 'Other', 'new.exe')])
+
+    assert set(watcher._pending) == {'Game', 'Other'}
+
+
+def test_removed_game_folder_is_not_queued_again(watcher):
+    library = watcher.path
+    os.remove(os.path.join(library, 'Game', 'game_ost.zip'))
+    os.rmdir(os.path.join(library, 'Game', 'data'))
+    drain(watcher)
+    watcher._pending.clear()
+
+    cleanup(watcher, [os.path.join(library, 'Game')])
+
+    assert watcher._pending == {}
+    assert watched(watcher) == ['Other']
+
+
+def test_replaced_game_folder_is_watched_again(watcher):
+    library = watcher.path
+    os.rename(os.path.join(library, 'Game'), os.path.join(library, '.Game.replaced-1'))
+    os.mkdir(os.path.join(library, 'Game'))
+    drain(watcher)
+    watcher._pending.clear()
+
+    # Changes to the old version being deleted do not queue the game folder
+    os.remove(os.path.join(library, '.Game.replaced-1', 'game_ost.zip'))
+    drain(watcher)
+    assert watcher._pending == {}
+
+    open(os.path.join(library, 'Game', 'setup.exe'), 'w').close()
+    drain(watcher)
+    assert set(watcher._pending) == {'Game'}
+    assert watched(watcher) == ['Game', 'Other']
+
+
+def test_renamed_game_folder_keeps_its_watch(watcher):
+    library = watcher.path
+    os.rename(os.path.join(library, 'Game'), os.path.join(library, 'Renamed'))
+    drain(watcher)
+    watcher._pending.clear()
+
+    open(os.path.join(library, 'Renamed', 'setup.exe'), 'w').close()
+    drain(watcher)
+
+    assert set(watcher._pending) == {'Renamed'}
+    assert watched(watcher) == ['Other', 'Renamed']
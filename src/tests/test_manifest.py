@@ -0,0 +1,162 @@
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from src.modules import library_cleanup
+from src.modules.manifest import Manifest
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    manifest = Manifest(str(tmp_path / 'library.db'), workers=2)
+    yield manifest
+    manifest.close()
+
+
+@pytest.fixture
+def game(tmp_path):
+    folder = tmp_path / 'games' / 'Game'
+    (folder / 'data').mkdir(parents=True)
+    (folder / 'setup.exe').write_bytes(b'exe')
+    (folder / 'data' / 'pak0.bin').write_bytes(b'pak0')
+    (folder / 'game_soundtrack.zip').write_bytes(b'ost')
+    return folder
+
+
+def touch(path, seconds):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 10 ** 9))
+
+
+def test_verify_reports_missing_and_corrupted_files(manifest, game):
+    assert manifest.create(str(game)) == 3
+    (game / 'setup.exe').unlink()
+    (game / 'data' / 'pak0.bin').write_bytes(b'PAK0')
+    touch(game / 'data' / 'pak0.bin', 1)
+    (game / 'readme.txt').write_text('added later')
+
+    result = manifest.verify(str(game))
+
+    assert result.missing == ['setup.exe']
+    assert result.corrupted == [os.path.join('data', 'pak0.bin')]
+    assert manifest.results() == {'Game': result}
+
+
+def test_verify_keeps_baseline_of_touched_files(manifest, game):
+    manifest.create(str(game))
+    touch(game / 'setup.exe', 10)
+
+    assert manifest.verify(str(game)).hashed == 1
+    # The new mtime was recorded, the file is not hashed again
+    assert manifest.verify(str(game)).hashed == 0
+
+    # A later modification is still compared with the original contents
+    (game / 'setup.exe').write_bytes(b'EXE')
+    touch(game / 'setup.exe', 20)
+    assert manifest.verify(str(game)).corrupted == ['setup.exe']
+
+
+def test_full_verify_hashes_every_file(manifest, game):
+    manifest.create(str(game))
+
+    assert manifest.verify(str(game)).hashed == 0
+    assert manifest.verify(str(game), full=True).hashed == 3
+
+
+def test_full_verify_due(manifest, game, monkeypatch):
+    manifest.create(str(game))
+
+    assert manifest.full_verify_due(30) == set()
+    assert manifest.full_verify_due(0) == set()
+
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 31 * 86400)
+    assert manifest.full_verify_due(30) == {'Game'}
+    manifest.verify(str(game), full=True)
+    assert manifest.full_verify_due(30) == set()
+
+
+def test_discard_remove_and_retain(manifest, game):
+    manifest.create(str(game))
+    (game / 'game_soundtrack.zip').unlink()
+
+    manifest.discard('Game', ['game_soundtrack.zip'])
+    assert manifest.verify(str(game)).ok
+
+    manifest.retain({'Other'})
+    assert manifest.folders() == set()
+    assert manifest.results() == {}
+
+
+def test_existing_manifests_are_migrated(tmp_path):
+    path = str(tmp_path / 'library.db')
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE manifest (folder TEXT NOT NULL, path TEXT NOT NULL, size INTEGER NOT NULL, "
+                       "mtime_ns INTEGER NOT NULL, digest TEXT NOT NULL, PRIMARY KEY (folder, path))")
+    connection.execute("INSERT INTO manifest VALUES ('Game', 'setup.exe', 3, 0, 'digest')")
+    connection.commit()
+    connection.close()
+
+    manifest = Manifest(path)
+    try:
+        assert manifest.folders() == {'Game'}
+    finally:
+        manifest.close()
+
+
+@pytest.fixture
+def cleanup(monkeypatch):
+    monkeypatch.setattr(library_cleanup, 'REMOVE_EXTRAS', True)
+    monkeypatch.setattr(library_cleanup, 'EXTRAS_PATTERNS', ['soundtrack'])
+    monkeypatch.setattr(library_cleanup, 'EXTRAS_EXTENSIONS', ['.zip'])
+    monkeypatch.setattr(library_cleanup, 'EXTRAS_GLOBS', [])
+    monkeypatch.setattr(library_cleanup, 'REMOVE_EMPTY_DIRS', True)
+    monkeypatch.setattr(library_cleanup, 'SCAN_WORKERS', 1)
+
+
+def test_cleanup_creates_missing_manifest(cleanup, manifest, game):
+    library_cleanup.clean(list(library_cleanup.library_folders(str(game.parent))), None, manifest)
+
+    assert manifest.folders() == {'Game'}
+    assert manifest.verify(str(game)).files == 2
+
+
+def test_cleanup_does_not_overwrite_baseline(cleanup, manifest, game):
+    manifest.create(str(game))
+    (game / 'data' / 'pak0.bin').write_bytes(b'PAK0')
+    touch(game / 'data' / 'pak0.bin', 1)
+
+    folders = list(library_cleanup.library_folders(str(game.parent)))
+    library_cleanup.verify_folders(manifest, folders)
+    library_cleanup.clean(folders, None, manifest)
+
+    assert manifest.results()['Game'].corrupted == [os.path.join('data', 'pak0.bin')]
+    # The removed extra is forgotten, the damaged file still is
+    result = manifest.verify(str(game))
+    assert result.files == 2
+    assert result.missing == []
+    assert result.corrupted == [os.path.join('data', 'pak0.bin')]
+
+
+def test_verify_folders_checks_folders_concurrently(manifest, game, monkeypatch):
+    monkeypatch.setattr(library_cleanup, 'SCAN_WORKERS', 4)
+    for name in ('Second', 'Third'):
+        other = game.parent / name
+        other.mkdir()
+        (other / 'setup.exe').write_bytes(name.encode())
+        manifest.create(str(other))
+    manifest.create(str(game))
+    (game.parent / 'Third' / 'setup.exe').unlink()
+
+    threads = set()
+    verify = manifest.verify
+    monkeypatch.setattr(manifest, 'verify', lambda *args, **kwargs: threads.add(threading.get_ident()) or
+                        verify(*args, **kwargs))
+    library_cleanup.verify_folders(manifest, list(library_cleanup.library_folders(str(game.parent))))
+
+    assert threading.get_ident() not in threads
+    assert {folder: result.ok for folder, result in manifest.results().items()} == \
+        {'Game': True, 'Second': True, 'Third': False}
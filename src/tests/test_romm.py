@@ -0,0 +1,213 @@
+import json
+
+import pytest
+import requests
+
+from src.modules import romm_library_cleanup
+from src.modules.api import romm
+from src.modules.api.romm import RommAPI, RommAPIError
+
+
+class FakeResponse:
+    def __init__(self, data, status_code=200):
+        self.status_code = status_code
+        self.content = json.dumps(data).encode() if data is not None else b''
+        self._data = data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error")
+
+    def json(self):
+        return self._data
+
+
+class StubSession:
+    """Serves /api/roms from a list of games, optionally misbehaving like some servers do."""
+
+    def __init__(self, games, paginated=True, honour_offset=True, honour_limit=True, fail_offset=None):
+        self.games = games
+        self.paginated = paginated
+        self.honour_offset = honour_offset
+        self.honour_limit = honour_limit
+        self.fail_offset = fail_offset
+        self.after_first_page = None
+        self.requests = []
+        # Delete behaviour: games ignored by the server, and whether the response fails after deleting
+        self.undeletable = set()
+        self.fail_deletes = 0
+        self.deletes = []
+
+    def get(self, url, **kwargs):
+        game_id = int(url.rsplit('/', 1)[1])
+        return FakeResponse({}, 200 if any(game['id'] == game_id for game in self.games) else 404)
+
+    def request(self, method, url, params=None, json=None, **kwargs):
+        if method == 'POST':
+            return self.delete(json['roms'])
+        params = params or {}
+        self.requests.append(params)
+        offset = params.get('offset', 0) if self.honour_offset else 0
+        if offset == self.fail_offset:
+            return FakeResponse(None, 500)
+        limit = params.get('limit', len(self.games)) if self.honour_limit else len(self.games)
+        items = self.games[offset:offset + limit]
+        total = len(self.games)
+        if offset == 0 and self.after_first_page is not None:
+            self.after_first_page(self.games)
+        if self.paginated:
+            return FakeResponse({'items': items, 'total': total})
+        return FakeResponse(items)
+
+
+    def delete(self, game_ids):
+        self.deletes.append(list(game_ids))
+        deleted = set(game_ids) - self.undeletable
+        self.games = [game for game in self.games if game['id'] not in deleted]
+        if self.fail_deletes:
+            self.fail_deletes -= 1
+            return FakeResponse(None, 504)
+        return FakeResponse({'msg': 'deleted'})
+
+
+def api(session):
+    api = RommAPI(cache_ttl=0)
+    api.session = session
+    api.delete_session = session
+    return api
+
+
+def games(count):
+    return [{'id': game_id, 'name': f'Game {game_id}'} for game_id in range(1, count + 1)]
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+@pytest.mark.parametrize('count', [0, 5, 10, 23])
+def test_iter_games_yields_every_game_in_order(workers, count):
+    session = StubSession(games(count))
+
+    listed = list(api(session).iter_games(page_size=5, workers=workers))
+
+    assert [game['id'] for game in listed] == list(range(1, count + 1))
+    assert all(request['limit'] == 5 for request in session.requests)
+
+
+def test_iter_games_without_total_walks_pages_until_a_short_page():
+    session = StubSession(games(12), paginated=False)
+
+    listed = list(api(session).iter_games(page_size=5, workers=3))
+
+    assert [game['id'] for game in listed] == list(range(1, 13))
+    assert [request['offset'] for request in session.requests] == [0, 5, 10]
+
+
+def test_iter_games_stops_when_server_ignores_offset():
+    session = StubSession(games(12), paginated=False, honour_offset=False)
+
+    listed = list(api(session).iter_games(page_size=5, workers=1))
+
+    assert [game['id'] for game in listed] == [1, 2, 3, 4, 5]
+    assert len(session.requests) == 2
+
+
+def test_iter_games_stops_when_server_ignores_limit():
+    session = StubSession(games(12), paginated=False, honour_limit=False)
+
+    listed = list(api(session).iter_games(page_size=5, workers=1))
+
+    assert [game['id'] for game in listed] == list(range(1, 13))
+    assert len(session.requests) == 1
+
+
+def test_iter_games_raises_when_a_page_fails():
+    session = StubSession(games(12), fail_offset=5)
+
+    with pytest.raises(RommAPIError):
+        list(api(session).iter_games(page_size=5, workers=2))
+
+
+def test_iter_games_skips_games_shifted_into_the_next_page(caplog):
+    session = StubSession(games(12))
+    session.after_first_page = lambda listing: listing.insert(0, {'id': 100, 'name': 'New game'})
+
+    listed = list(api(session).iter_games(page_size=5, workers=2))
+
+    assert [game['id'] for game in listed] == list(range(1, 13))
+    assert 'ROMM library changed during the listing (1 duplicate games skipped)' in caplog.text
+
+
+def test_iter_games_warns_when_games_were_removed_during_the_listing(caplog):
+    session = StubSession(games(12))
+    session.after_first_page = lambda listing: listing.pop(0)
+
+    listed = list(api(session).iter_games(page_size=5, workers=2))
+
+    # Game 6 moved to the first page after it was fetched
+    assert [game['id'] for game in listed] == [1, 2, 3, 4, 5] + list(range(7, 13))
+    assert 'ROMM library changed during the listing' in caplog.text
+
+
+@pytest.fixture
+def no_delay(monkeypatch):
+    monkeypatch.setattr(romm, 'DELETE_RETRY_DELAY', 0)
+
+
+def test_delete_session_does_not_retry():
+    adapter = RommAPI(cache_ttl=0).delete_session.get_adapter('http://localhost')
+
+    assert adapter.max_retries.total == 0
+
+
+def test_delete_games_in_chunks(no_delay, caplog):
+    session = StubSession(games(25))
+
+    result = api(session).delete_games(list(range(1, 21)), chunk_size=6, workers=2)
+
+    assert result == {'deleted': list(range(1, 21)), 'failed': []}
+    assert sorted(map(len, session.deletes)) == [2, 6, 6, 6]
+    assert [game['id'] for game in session.games] == list(range(21, 26))
+    assert 'games may have been added or removed' not in caplog.text
+
+
+def test_delete_games_retries_games_left_after_a_successful_request(no_delay):
+    session = StubSession(games(10))
+    session.undeletable = {1}
+
+    result = api(session).delete_games([1, 2, 3, 4], chunk_size=4, retries=1)
+
+    assert result == {'deleted': [2, 3, 4], 'failed': [1]}
+    assert session.deletes == [[1, 2, 3, 4], [1]]
+
+
+def test_delete_games_reconciles_a_failed_request(no_delay):
+    session = StubSession(games(10))
+    session.fail_deletes = 1
+
+    result = api(session).delete_games([1, 2, 3], chunk_size=3)
+
+    # The server deleted the games before the request failed, so nothing is sent again
+    assert result == {'deleted': [1, 2, 3], 'failed': []}
+    assert session.deletes == [[1, 2, 3]]
+
+
+def test_delete_games_warns_when_the_total_does_not_add_up(no_delay, caplog):
+    session = StubSession(games(10))
+    real_delete = session.delete
+
+    def delete(game_ids):
+        session.games.append({'id': 100, 'name': 'Imported meanwhile'})
+        return real_delete(game_ids)
+
+    session.delete = delete
+    api(session).delete_games([1, 2])
+
+    assert 'ROMM library went from 10 to 9 games while 2 were deleted' in caplog.text
+
+
+def test_get_library_pages_by_unique_id():
+    session = StubSession([dict(game, fs_size_bytes=0, files=[]) for game in games(12)])
+
+    library = romm_library_cleanup.get_library(api(session))
+
+    assert [game['id'] for game in library] == list(range(1, 13))
+    assert {request['order_by'] for request in session.requests} == {'id'}
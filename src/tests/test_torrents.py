@@ -0,0 +1,261 @@
+import itertools
+
+import pytest
+import qbittorrentapi
+
+from src.modules import torrents
+from src.modules.api.gog import EXACT_MATCH, GogCatalog
+from src.modules.helpers import FetchResult
+
+
+class FakeCatalog:
+    def __init__(self, known=()):
+        self.known = set(known)
+        self.closed = False
+
+    def has_match(self, name):
+        return name in self.known
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def refresh_state(monkeypatch):
+    monkeypatch.setattr(torrents, '_missed_names', set())
+    monkeypatch.setattr(torrents, '_last_forced_refresh', None)
+    monkeypatch.setattr(torrents, 'CACHE_REFRESH_HOURS', 24)
+
+
+def fake_fetch(monkeypatch, result):
+    calls = []
+
+    def fetch(url, filename, max_age_hours=0):
+        calls.append(url)
+        return result
+
+    monkeypatch.setattr(torrents, 'fetch_json_data', fetch)
+    return calls
+
+
+def test_refresh_catalog_on_miss_keeps_catalog_when_all_names_resolve(monkeypatch):
+    calls = fake_fetch(monkeypatch, FetchResult.UPDATED)
+    catalog = FakeCatalog({'portal'})
+
+    assert torrents.refresh_catalog_on_miss(catalog, ['portal_windows_gog_(1)']) is catalog
+    assert calls == []
+
+
+def test_refresh_catalog_on_miss_reloads_only_when_catalog_changed(monkeypatch):
+    calls = fake_fetch(monkeypatch, FetchResult.UNCHANGED)
+    monkeypatch.setattr(torrents, 'load_catalog', lambda: pytest.fail("catalog reloaded after a 304"))
+    catalog = FakeCatalog()
+
+    assert torrents.refresh_catalog_on_miss(catalog, ['unknown_windows_gog_(1)']) is catalog
+    assert len(calls) == 1
+    assert not catalog.closed
+
+
+def test_refresh_catalog_on_miss_reloads_changed_catalog(monkeypatch):
+    fake_fetch(monkeypatch, FetchResult.UPDATED)
+    reloaded = FakeCatalog({'unknown'})
+    monkeypatch.setattr(torrents, 'load_catalog', lambda: reloaded)
+    catalog = FakeCatalog()
+
+    assert torrents.refresh_catalog_on_miss(catalog, ['unknown_windows_gog_(1)']) is reloaded
+    assert catalog.closed
+
+
+def test_refresh_catalog_on_miss_forces_one_refresh_per_name_and_period(monkeypatch):
+    calls = fake_fetch(monkeypatch, FetchResult.UNCHANGED)
+    catalog = FakeCatalog()
+
+    torrents.refresh_catalog_on_miss(catalog, ['first_windows_gog_(1)'])
+    torrents.refresh_catalog_on_miss(catalog, ['first_windows_gog_(1)'])
+    assert len(calls) == 1
+
+    # A new name misses, but the last forced refresh is too recent
+    torrents.refresh_catalog_on_miss(catalog, ['second_windows_gog_(2)'])
+    assert len(calls) == 1
+
+    monkeypatch.setattr(torrents, '_last_forced_refresh', torrents.time.monotonic() - 25 * 3600)
+    torrents.refresh_catalog_on_miss(catalog, ['second_windows_gog_(2)'])
+    assert len(calls) == 2
+
+
+class FakeJournal:
+    def __init__(self):
+        self.records = []
+
+    def record(self, torrent_hash, name, state, reason=None):
+        self.records.append((state, reason))
+
+
+class FakeTorrent:
+    name = 'hommm_3_windows_gog_(1)'
+    hash = 'abc'
+
+    def __init__(self, content_path):
+        self.content_path = content_path
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    journal = FakeJournal()
+    monkeypatch.setattr(torrents, 'GAME_PATH', str(tmp_path / 'games'))
+    monkeypatch.setattr(torrents, 'VALIDATE_BEFORE_IMPORT', False)
+    monkeypatch.setattr(torrents, 'get_journal', lambda: journal)
+    monkeypatch.setattr(torrents, 'resolve_folder', lambda name, catalog: ('Heroes 3', torrents.FUZZY_MATCH))
+    (tmp_path / 'games').mkdir()
+    source = tmp_path / 'downloads' / 'hommm_3'
+    source.mkdir(parents=True)
+    (source / 'setup.exe').write_text('new')
+    return tmp_path, journal
+
+
+def test_import_torrent_never_replaces_a_folder_with_a_fuzzy_match(library, monkeypatch):
+    tmp_path, journal = library
+    existing = tmp_path / 'games' / 'Heroes 3'
+    existing.mkdir()
+    (existing / 'setup.exe').write_text('old')
+    monkeypatch.setattr(torrents, 'move_torrent_folder', lambda *args: pytest.fail("folder moved"))
+
+    assert not torrents.import_torrent(FakeTorrent(str(tmp_path / 'downloads' / 'hommm_3')), None)
+
+    assert (existing / 'setup.exe').read_text() == 'old'
+    assert journal.records[-1][0] == torrents.FAILED
+
+
+def test_import_torrent_moves_a_fuzzy_match_into_a_free_folder(library, monkeypatch):
+    tmp_path, journal = library
+    moves = []
+    monkeypatch.setattr(torrents, 'move_torrent_folder', lambda source, destination: moves.append(destination) or True)
+
+    assert torrents.import_torrent(FakeTorrent(str(tmp_path / 'downloads' / 'hommm_3')), None)
+
+    assert moves == [str(tmp_path / 'games' / 'Heroes 3')]
+    assert journal.records[-1][0] == torrents.MOVED
+
+
+def test_move_torrent_folder_resumes_from_complete_staging_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(torrents, 'STAGED_REPLACE', True)
+    destination = tmp_path / 'games' / 'Portal'
+    (destination).mkdir(parents=True)
+    (destination / 'version.txt').write_text('old')
+    staging = tmp_path / 'games' / '.Portal.importing'
+    staging.mkdir()
+    (staging / 'version.txt').write_text('new')
+
+    assert torrents.move_torrent_folder(str(tmp_path / 'downloads' / 'portal'), str(destination))
+
+    assert (destination / 'version.txt').read_text() == 'new'
+    assert not staging.exists()
+
+
+def test_move_torrent_folder_keeps_copied_source_until_swapped_in(tmp_path, monkeypatch):
+    source = tmp_path / 'downloads' / 'portal'
+    source.mkdir(parents=True)
+    (source / 'version.txt').write_text('new')
+    destination = tmp_path / 'games' / 'Portal'
+    destination.parent.mkdir()
+    deleted = []
+    monkeypatch.setattr(torrents, 'delete_in_background', deleted.append)
+    monkeypatch.setattr(torrents.os, 'rename', lambda *args: (_ for _ in ()).throw(OSError("cross-device")))
+
+    # The swap fails, the source must survive for the next attempt
+    assert not torrents.move_torrent_folder(str(source), str(destination))
+    assert (source / 'version.txt').read_text() == 'new'
+    assert deleted == []
+
+
+class FakeSyncClient:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.rids = []
+
+    def sync_maindata(self, rid=0):
+        self.rids.append(rid)
+        if self.responses:
+            return self.responses.pop(0)
+        return {'rid': rid}
+
+
+def seeding(state='uploading', completion_on=0, category=None):
+    return {'category': category or torrents.QBIT_CATEGORY, 'state': state, 'name': 'game',
+            'completion_on': completion_on}
+
+
+def run_watch(monkeypatch, responses, polls, max_per_run=0, journal_pending=lambda ready: ready):
+    client = FakeSyncClient(responses)
+    batches = []
+    fetched = []
+    clock = itertools.count()
+
+    class Journal:
+        pending = staticmethod(journal_pending)
+
+    monkeypatch.setattr(torrents, 'get_qbittorrent_client', lambda: client)
+    monkeypatch.setattr(torrents, 'get_journal', lambda: Journal)
+    monkeypatch.setattr(torrents, 'MAX_TORRENTS_PER_RUN', max_per_run)
+    monkeypatch.setattr(torrents, 'import_torrents', lambda ready: batches.append([t.hash for t in ready]))
+    monkeypatch.setattr(torrents, 'fetch_json_data', lambda url, filename, max_age_hours=0: fetched.append(url))
+    monkeypatch.setattr(torrents.time, 'sleep', lambda seconds: None)
+    monkeypatch.setattr(torrents.time, 'monotonic', lambda: next(clock))
+    # Two clock reads per poll: the loop condition and the sleep
+    torrents.watch(polls * 2)
+    return batches, fetched
+
+
+def test_watch_seeds_state_from_full_update_without_importing(monkeypatch):
+    responses = [
+        {'rid': 1, 'full_update': True, 'torrents': {'done': seeding('stoppedUP'), 'busy': seeding()}},
+        {'rid': 2, 'torrents': {'busy': {'state': 'stoppedUP'}}},
+    ]
+
+    batches, fetched = run_watch(monkeypatch, responses, polls=3)
+
+    assert batches == [['busy']]
+    assert fetched == [torrents.GOG_RECENT_GAMES_URL]
+
+
+def test_watch_applies_journal_and_run_limit(monkeypatch):
+    responses = [
+        {'rid': 1, 'full_update': True, 'torrents': {h: seeding(completion_on=n) for n, h in enumerate('abcd')}},
+        {'rid': 2, 'torrents': {h: {'state': 'stoppedUP'} for h in 'dcba'}},
+    ]
+    journal_pending = lambda ready: [torrent for torrent in ready if torrent.hash != 'a']
+
+    batches, _ = run_watch(monkeypatch, responses, polls=4, max_per_run=2, journal_pending=journal_pending)
+
+    assert batches == [['b', 'c'], ['d']]
+
+
+def test_resolve_folders_matches_resolve_folder(monkeypatch):
+    monkeypatch.setattr(torrents, 'GOG_FUZZY_MATCH_THRESHOLD', 0.6)
+    catalog = GogCatalog([
+        {'slug': 'portal_2', 'title': 'Portal 2™'},
+        {'slug': 'heroes_of_might_and_magic_3_complete', 'title': 'Heroes of Might and Magic 3: Complete'},
+    ])
+    names = ['portal_2_windows_gog_(1)', 'might_and_magic_heroes_3_complete_windows_gog_(2)', 'unknown_game', '']
+
+    folders = torrents.resolve_folders(names, catalog)
+
+    assert folders['portal_2_windows_gog_(1)'] == ('Portal 2', EXACT_MATCH)
+    assert folders == {name: torrents.resolve_folder(name, catalog) for name in names if name}
+
+
+class StaleApp:
+    @property
+    def version(self):
+        raise qbittorrentapi.APIConnectionError("Connection refused")
+
+
+class StaleClient:
+    app = StaleApp()
+
+
+def test_qbit_preflight_drops_unreachable_shared_client(monkeypatch):
+    monkeypatch.setattr(torrents, '_client', StaleClient())
+
+    assert torrents.qbit_preflight() is False
+    assert torrents._client is None
@@ -0,0 +1,168 @@
+import os
+
+import pytest
+
+from src.modules import transfer
+from src.modules.transfer import PART_SUFFIX, PLAN_FILE, VerificationError, copy_file, copy_tree
+
+
+def write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
+def test_copy_file_copies_contents_and_timestamps(tmp_path):
+    source = write(tmp_path / 'source.bin', os.urandom(300_000))
+    destination = tmp_path / 'copy.bin'
+
+    assert copy_file(str(source), str(destination), 'checksum') == 300_000
+
+    assert destination.read_bytes() == source.read_bytes()
+    assert os.stat(destination).st_mtime_ns == os.stat(source).st_mtime_ns
+    assert not os.path.exists(str(destination) + PART_SUFFIX)
+    # A complete copy is recognised and not copied again
+    assert copy_file(str(source), str(destination)) == 0
+
+
+def test_copy_file_resumes_from_part_file(tmp_path):
+    data = os.urandom(100_000)
+    source = write(tmp_path / 'source.bin', data)
+    destination = tmp_path / 'copy.bin'
+    write(tmp_path / ('copy.bin' + PART_SUFFIX), data[:40_000])
+
+    assert copy_file(str(source), str(destination), 'checksum') == 60_000
+
+    assert destination.read_bytes() == data
+
+
+def test_copy_file_checksum_rejects_corrupt_part_file(tmp_path):
+    data = os.urandom(100_000)
+    source = write(tmp_path / 'source.bin', data)
+    destination = tmp_path / 'copy.bin'
+    write(tmp_path / ('copy.bin' + PART_SUFFIX), b'\0' * 40_000)
+
+    with pytest.raises(VerificationError):
+        copy_file(str(source), str(destination), 'checksum')
+
+    assert not destination.exists()
+    assert not os.path.exists(str(destination) + PART_SUFFIX)
+
+
+def test_copy_tree_copies_files_links_and_directories(tmp_path):
+    source = tmp_path / 'source'
+    write(source / 'game.exe', b'exe')
+    write(source / 'data' / 'nested' / 'level.pak', b'pak' * 1000)
+    (source / 'empty').mkdir()
+    os.symlink('game.exe', source / 'launcher')
+    destination = tmp_path / 'copy'
+
+    assert copy_tree(str(source), str(destination), workers=2, verify='checksum')
+
+    assert (destination / 'game.exe').read_bytes() == b'exe'
+    assert (destination / 'data' / 'nested' / 'level.pak').read_bytes() == b'pak' * 1000
+    assert (destination / 'empty').is_dir()
+    assert os.readlink(destination / 'launcher') == 'game.exe'
+    assert not (destination / PLAN_FILE).exists()
+    assert not transfer.copy_in_progress(str(destination))
+
+
+def test_copy_tree_discards_stale_entries_from_an_earlier_attempt(tmp_path, monkeypatch):
+    source = tmp_path / 'source'
+    write(source / 'kept.bin', b'a' * 50_000)
+    write(source / 'changed.bin', b'b' * 50_000)
+    destination = tmp_path / 'copy'
+
+    # Interrupt a first attempt right after the plan was written
+    failing = lambda *args: (_ for _ in ()).throw(OSError("interrupted"))
+    monkeypatch.setattr(transfer, 'copy_file', failing)
+    assert not copy_tree(str(source), str(destination))
+    assert transfer.copy_in_progress(str(destination))
+    monkeypatch.undo()
+
+    write(destination / ('kept.bin' + PART_SUFFIX), b'a' * 20_000)
+    write(destination / ('changed.bin' + PART_SUFFIX), b'x' * 20_000)
+    write(destination / 'removed.bin', b'gone')
+    write(destination / 'old_dir' / 'file.txt', b'gone')
+
+    # The source file changes between attempts, so its partial copy must not be resumed
+    write(source / 'changed.bin', b'c' * 60_000)
+
+    assert copy_tree(str(source), str(destination), verify='size')
+
+    assert (destination / 'kept.bin').read_bytes() == b'a' * 50_000
+    assert (destination / 'changed.bin').read_bytes() == b'c' * 60_000
+    assert sorted(os.listdir(destination)) == ['changed.bin', 'kept.bin']
+
+
+def test_copy_tree_does_not_resume_part_files_of_another_source(tmp_path):
+    source = tmp_path / 'source'
+    write(source / 'file.bin', b'a' * 50_000)
+    destination = tmp_path / 'copy'
+    write(destination / ('file.bin' + PART_SUFFIX), b'z' * 20_000)
+
+    assert copy_tree(str(source), str(destination), verify='size')
+
+    assert (destination / 'file.bin').read_bytes() == b'a' * 50_000
+
+
+def make_version(path, contents):
+    write(path / 'version.txt', contents)
+    return path
+
+
+@pytest.mark.parametrize('exchange', [True, False])
+def test_replace_directory_swaps_versions(tmp_path, monkeypatch, exchange):
+    if not exchange:
+        monkeypatch.setattr(transfer, 'exchange_paths', lambda first, second: False)
+    new = make_version(tmp_path / '.game.importing', b'new')
+    destination = make_version(tmp_path / 'game', b'old')
+    old = tmp_path / '.game.replaced-1'
+
+    assert transfer.replace_directory(str(new), str(destination), str(old)) == str(old)
+
+    assert (destination / 'version.txt').read_bytes() == b'new'
+    assert (old / 'version.txt').read_bytes() == b'old'
+    assert not new.exists()
+
+
+def test_replace_directory_rolls_back_when_second_rename_fails(tmp_path, monkeypatch):
+    monkeypatch.setattr(transfer, 'exchange_paths', lambda first, second: False)
+    new = make_version(tmp_path / '.game.importing', b'new')
+    destination = make_version(tmp_path / 'game', b'old')
+    old = tmp_path / '.game.replaced-1'
+    rename = os.rename
+
+    def failing_rename(source, target):
+        if source == str(new):
+            raise OSError("rename failed")
+        rename(source, target)
+
+    monkeypatch.setattr(transfer.os, 'rename', failing_rename)
+    with pytest.raises(OSError):
+        transfer.replace_directory(str(new), str(destination), str(old))
+
+    assert (destination / 'version.txt').read_bytes() == b'old'
+    assert (new / 'version.txt').read_bytes() == b'new'
+    assert not old.exists()
+
+
+def test_replace_directory_succeeds_when_old_version_cannot_be_parked(tmp_path, monkeypatch):
+    new = make_version(tmp_path / '.game.importing', b'new')
+    destination = make_version(tmp_path / 'game', b'old')
+    rename = os.rename
+
+    def exchange(first, second):
+        temporary = str(tmp_path / 'swap')
+        rename(first, temporary)
+        rename(second, first)
+        rename(temporary, second)
+        return True
+
+    monkeypatch.setattr(transfer, 'exchange_paths', exchange)
+    monkeypatch.setattr(transfer.os, 'rename', lambda *args: (_ for _ in ()).throw(OSError("busy")))
+    leftover = transfer.replace_directory(str(new), str(destination), str(tmp_path / '.game.replaced-1'))
+
+    assert leftover == str(new)
+    assert (destination / 'version.txt').read_bytes() == b'new'
+    assert (new / 'version.txt').read_bytes() == b'old'
@@ -0,0 +1,42 @@
+import pytest
+
+from src.modules import validation
+from src.modules.validation import dangerous_files, has_executable, is_fragmented, validate_release
+
+
+def test_extension_checks_ignore_case():
+    assert has_executable(['data/GAME.EXE'])
+    assert not has_executable(['readme.txt', 'exe/notes.txt'])
+    assert dangerous_files(['setup.exe', 'SETUP.BAT', 'run.Cmd']) == ['SETUP.BAT', 'run.Cmd']
+
+
+def test_is_fragmented():
+    assert is_fragmented(0)
+    assert is_fragmented(validation.FRAGMENT_SIZE_BYTES)
+    assert not is_fragmented(validation.FRAGMENT_SIZE_BYTES + 1)
+
+
+@pytest.fixture
+def all_rules(monkeypatch):
+    for rule in ('ROMM_EMPTY_DIRS', 'ROMM_MISSING_EXE', 'ROMM_SCAN_DANGEROUS_FILETYPES'):
+        monkeypatch.setattr(validation, rule, True)
+
+
+def test_validate_release_accepts_a_complete_release(all_rules):
+    assert validate_release([('game/setup.exe', 5_000_000), ('game/data.bin', 10)]) is None
+
+
+@pytest.mark.parametrize('files', [
+    [('game/setup.exe', 100)],
+    [('game/data.bin', 5_000_000)],
+    [('game/setup.exe', 5_000_000), ('game/install.bat', 10)],
+])
+def test_validate_release_rejects_bad_releases(all_rules, files):
+    assert validate_release(files) is not None
+
+
+def test_validate_release_respects_disabled_rules(monkeypatch):
+    for rule in ('ROMM_EMPTY_DIRS', 'ROMM_MISSING_EXE', 'ROMM_SCAN_DANGEROUS_FILETYPES'):
+        monkeypatch.setattr(validation, rule, False)
+
+    assert validate_release([('game/install.bat', 10)]) is None